@@ -8,7 +8,7 @@ def main():
     # Basic Simulation
     width = 300
     height = 300
-    lb.set_random_seed(randint(0, 65535))  # Set the random seed of C/C++ standard library
+    lb.set_random_seed(randint(0, 65535))  # Seeds the models created after this call
     sim = lb.Simulator(width, height)
     sim.breakdown(150, 150)  # First broken cell is (x,y)=(150, 150)
     sim.simulate(max_loop=2000)
@@ -1,7 +1,7 @@
 import lichtenberg as lb
 from lichtenberg.archive import save
 from pathlib import Path
-import math
+import numpy as np
 
 
 def main():
@@ -22,32 +22,25 @@ def main():
         print(f'loop:{current_loop}/{max_loop}')
         return False
 
-    # Initialize the field of simulation (width+2) x (height+2)
-    grid = []
-    for y in range(height+2):
-        row = []
-        for x in range(width+2):
-            c = lb.DBMCell()
-            c.potential = 0.0
-            c.lock = False
-            row.append(c)
-        grid.append(row)
+    # Initialize the field of simulation (height+2) x (width+2)
+    potential = np.zeros((height + 2, width + 2))
+    lock = np.zeros((height + 2, width + 2), dtype=bool)
     n = width * height // 2
     cx, cy = width // 2, height // 2
     R = radius - 2
-    for i in range(n):
-        # Put potential-1.0 on the circle (x-xc)^2+(y-yc)^2=R^2
-        t = 2 * math.pi * (i / n)
-        x = int(R * math.cos(t)) + cx
-        y = int(R * math.sin(t)) + cy
-        grid[y][x].lock = True
-        grid[y][x].potential = 1.0
+    # Put potential-1.0 on the circle (x-xc)^2+(y-yc)^2=R^2
+    t = 2 * np.pi * (np.arange(n) / n)
+    x = (R * np.cos(t)).astype(int) + cx
+    y = (R * np.sin(t)).astype(int) + cy
+    lock[y, x] = True
+    potential[y, x] = 1.0
 
     # Initialize a break model
     eta = 2.0  # Detail level of branching
     min_guarantee = 0.001
-    model = lb.DielectricBreakModel(width, height, grid,
-                                    min_guarantee=min_guarantee, eta=eta)
+    model = lb.DielectricBreakModel(width, height, potential, lock,
+                                    min_guarantee=min_guarantee, eta=eta,
+                                    solver=lb.DBMSolver.Multigrid)
 
     # Simulate
     sim = lb.Simulator(width, height, model)
@@ -11,8 +11,7 @@ def main():
 
     lb.set_random_seed(randint(0, 32768))
     
-    def end_condition(ix, iy):
-        return iy == height - 1
+    end_condition = lb.ReachRow(height - 1)
 
     def loop(current_loop, max_loop, cells):
         if current_loop % 100 == 0:
@@ -28,7 +27,7 @@ def main():
     # Simulate
     sim = lb.Simulator(width, height, model)
     sim.breakdown(width//2, 0)
-    sim.simulate(max_loop=20000, callback_on_break=end_condition, callback_on_loop=loop)
+    sim.simulate(max_loop=20000, callback_on_loop=loop, stop_condition=end_condition)
 
     # Output
     save(sim.cells, Path(__file__).stem,
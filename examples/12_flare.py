@@ -2,6 +2,7 @@ from typing import Tuple, List
 from PIL import Image, ImageDraw
 from pathlib import Path
 import lichtenberg as lb
+from lichtenberg.field import ElectricField
 from scipy.interpolate import Akima1DInterpolator
 import numpy as np
 
@@ -33,17 +34,11 @@ def main():
     sim.breakdown(10, 10)
     sim.simulate(max_loop=2000)
 
-    # Get Longest Path
-    tree = lb.Tree(sim.cells)
-    leaves = tree.get_leaves()
-    leaves = sorted(leaves, key=lambda lf: lf.count, reverse=True)
-    longest_leaf = leaves[0]
-    longest_points = []
-    node = longest_leaf.node
-    while node is not None:
-        x, y, _ = node.point
-        longest_points.append((x, y))
-        node = node.parent
+    # Get Longest Path(from the deepest cell to the root)
+    tree = lb.CompactTree(sim.cells)
+    longest_leaf = int(np.argmax(tree.depth))
+    path = tree.path_to_root(longest_leaf)
+    longest_points = list(zip(tree.x[path].tolist(), tree.y[path].tolist()))
 
     # Generate Potential-Points on the path
     n = len(longest_points)
@@ -61,21 +56,23 @@ def main():
     field_width = width + margin * 2
     field_height = height + margin * 2
     time_factors = [1.0, 0.5, 0.1]
+
+    # Simulate potential field(once, the field is proportional to the potentials)
+    flares: List[FlarePoint] = []
+    for x, y, p in potentials:
+        flares.append((margin + x, margin + y, p))
+    base_field = ElectricField(field_width, field_height, flares)
+
     for i, t in enumerate(time_factors):
         print(f"{i + 1}/{len(time_factors)}")
-
-        # Simulate potential field
-        flares: List[FlarePoint] = []
-        for x, y, p in potentials:
-            flares.append((margin + x, margin + y, p * t))
-        field = lb.make_electric_field(field_width, field_height, flares)
+        field = (base_field * t).potential
 
         # Make Images
         gamma = 1.0
         img = Image.new("L", (width, height))
         for y in range(height):
             for x in range(width):
-                p = field[margin + y][margin + x]
+                p = float(field[margin + y, margin + x])
                 p = p ** gamma
                 c = int(p * 255)
                 img.putpixel((x, y), (c,))
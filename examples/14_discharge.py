@@ -1,4 +1,4 @@
-from lichtenberg.util import draw_blur
+from lichtenberg.util import get_path, draw_blur_batch
 from PIL import Image
 from random import randint
 from pathlib import Path
@@ -12,11 +12,15 @@ def main():
     color = (1.2, 1.0, 1.0)
 
     num_line = 50
+    strokes = []
     for i in range(num_line):
         print(f"{i+1}/{num_line}")
         sx, sy = randint(100, 500), 50
         ex, ey = sx + randint(-50, 50), 550
-        draw_blur(img, [(sx, sy), (ex, ey)], blur_params, 0.3, color)
+        strokes.append(get_path((sx, sy), (ex, ey))[:-1])
+
+    # all strokes are blurred and composited at once
+    draw_blur_batch(img, strokes, blur_params, 0.3, color)
 
     img.save(Path(__file__).stem + ".png")
 
@@ -10,8 +10,7 @@ def main():
     img = Image.new("RGB", (width, height))
 
     # Using FastDBM(see also 10_fastdbm_top.py)
-    def end_condition(ix, iy):
-        return iy == height - 1
+    end_condition = lb.ReachRow(height - 1)
 
     def loop(current_loop, max_loop, cells):
         if current_loop % 100 == 0:
@@ -24,7 +23,7 @@ def main():
     model = lb.FastDBM(width, height, min_guarantee=min_guarantee, eta=eta, bias=bias)
     sim = lb.Simulator(width, height, model)
     sim.breakdown(width//2, 0)
-    sim.simulate(max_loop=40000, callback_on_break=end_condition, callback_on_loop=loop)
+    sim.simulate(max_loop=40000, callback_on_loop=loop, stop_condition=end_condition)
 
     # Trimming short tree branches
     min_count = 50
@@ -1,13 +1,14 @@
-from typing import List, Tuple, Callable
+from typing import List, Tuple, Callable, Union, overload
 from enum import Enum
+import numpy as np
 
 def set_random_seed(seed: int) -> None: ...
-def make_electric_field(width: int, height: int, points: List[Tuple[int, int, float]]) -> List[List[float]]: ...
 
 
 class BreakModel:
     def test(self, x: int, y:int) -> bool: ...
     def update(self, cells: CellList2D, broken_list: List[Tuple[int, int]]) -> None: ...
+    def set_seed(self, seed: int) -> None: ...
 
 
 class DefaultBreakModel(BreakModel):
@@ -39,13 +40,40 @@ class DBMCell:
 DBMGrid = List[List[DBMCell]]
 
 
+class DBMSolver(Enum):
+    SOR = 0
+    Multigrid = 1
+    RedBlackSOR = 2
+
+
+def make_electric_field(width: int, height: int, points: List[Tuple[int, int, float]],
+                        max_loop: int = 1000, eps: float = 1.0e-6, sor_coef: float = 1.5,
+                        num_threads: int = 1, solver: DBMSolver = DBMSolver.SOR,
+                        as_array: bool = False) -> Union[List[List[float]], np.ndarray]: ...
+
+
 class DielectricBreakModel(BreakModel):
-    def __init__(self, width: int, height: int, initial_state: DBMGrid, min_guarantee: float = 0.0, eta: float = 1.0) -> None: ...
+    @overload
+    def __init__(self, width: int, height: int, initial_state: DBMGrid, min_guarantee: float = 0.0, eta: float = 1.0,
+                 solver: DBMSolver = DBMSolver.SOR, num_threads: int = 1, incremental: bool = False) -> None: ...
+    @overload
+    def __init__(self, width: int, height: int, potential: np.ndarray, lock: np.ndarray,
+                 min_guarantee: float = 0.0, eta: float = 1.0,
+                 solver: DBMSolver = DBMSolver.SOR, num_threads: int = 1, incremental: bool = False) -> None: ...
     def get_potential(self, x: int, y: int) -> float: ...
+    @property
+    def potentials(self) -> np.ndarray: ...  # (height+2, width+2) float64, read-only view
+    @property
+    def lock(self) -> np.ndarray: ...  # (height+2, width+2) bool, read-only view
+    @property
+    def last_iterations(self) -> int: ...
+    @property
+    def last_residual(self) -> float: ...
 
 
 class FastDBM(BreakModel):
-    def __init__(self, width: int, height: int, min_guarantee: float = 0.0, eta: float = 1.0, bias: List[float] = None) -> None: ...
+    def __init__(self, width: int, height: int, min_guarantee: float = 0.0, eta: float = 1.0, bias: np.ndarray = None,
+                 theta: float = 0.0, num_threads: int = 1) -> None: ...
 
 
 class DLABreakModel(BreakModel):
@@ -81,19 +109,125 @@ class CellList2D:
     def get_insulated(self, x: int, y: int) -> bool: ...
     def set_insulated(self, x: int, y: int) -> None: ...
     def get_max_count(self) -> int: ...
+    # cells from (x, y) to its base cell along the directions, empty if (x, y) is not broken
+    def trace(self, x: int, y: int) -> List[Tuple[int, int]]: ...
+
+    # Zero-copy (height, width) views of the cell buffer.
+    # np.asarray(cells) returns a read-only structured array of all fields.
+    # The views are invalidated by load().
+    @property
+    def broken(self) -> np.ndarray: ...  # bool, writeable
+    @property
+    def insulated(self) -> np.ndarray: ...  # bool, writeable
+    @property
+    def count(self) -> np.ndarray: ...  # int32, writeable
+    @property
+    def direction(self) -> np.ndarray: ...  # int32(Direction), read-only
+
+
+class StopCondition:
+    def __or__(self, other: StopCondition) -> StopCondition: ...  # AnyOf
+    def __and__(self, other: StopCondition) -> StopCondition: ...  # AllOf
+
+
+class ReachRow(StopCondition):
+    def __init__(self, y: int) -> None: ...
+
+
+class ReachColumn(StopCondition):
+    def __init__(self, x: int) -> None: ...
+
+
+class ReachCell(StopCondition):
+    def __init__(self, x: int, y: int) -> None: ...
+
+
+class EnterMask(StopCondition):
+    def __init__(self, mask: np.ndarray) -> None: ...  # bool array (height, width)
+
+
+class MaxBroken(StopCondition):
+    def __init__(self, limit: int) -> None: ...
+
+
+class MaxDepth(StopCondition):
+    def __init__(self, limit: int) -> None: ...
+
+
+class AnyOf(StopCondition):
+    def __init__(self, conditions: List[StopCondition]) -> None: ...
+
+
+class AllOf(StopCondition):
+    def __init__(self, conditions: List[StopCondition]) -> None: ...
+
+
+class FrameMode(Enum):
+    Mask = 0
+    Delta = 1
+
+
+Mask = FrameMode.Mask
+Delta = FrameMode.Delta
+
+
+class FrameRecorder:
+    def __init__(self, interval: int, capacity: int, mode: FrameMode = FrameMode.Mask,
+                 with_field: bool = False) -> None: ...
+    def __len__(self) -> int: ...
+    @property
+    def interval(self) -> int: ...
+    @property
+    def mode(self) -> FrameMode: ...
+    @property
+    def with_field(self) -> bool: ...
+    @property
+    def dropped(self) -> int: ...
+    def clear(self) -> None: ...
+    def loops(self) -> np.ndarray: ...  # (n,) int32
+    def masks(self) -> np.ndarray: ...  # (n, height, width) bool
+    def deltas(self) -> List[np.ndarray]: ...  # (k, 2) int32 of (x, y)
+    def fields(self) -> np.ndarray: ...  # (n, field_height, field_width) float32
+
+
+class GrowthMode(Enum):
+    Test = 0
+    Weighted = 1
 
 
 class Simulator:
     def __init__(self, width: int, height: int, model: BreakModel = None,
-                 up: bool = True, down: bool = True, left: bool = True, right: bool = True) -> None: ...
+                 up: bool = True, down: bool = True, left: bool = True, right: bool = True,
+                 growth: GrowthMode = GrowthMode.Test) -> None: ...
     def breakdown(self, x: int, y: int) -> None: ...
+    def set_seed(self, seed: int) -> None: ...
     def insulate(self, x: int, y: int) -> None: ...
     def insulate_square(self, x1: int, y1: int, x2: int, y2: int, fill: bool = False) -> None: ...
     def insulate_circle(self, x: int, y: int, radius: int, fill: bool = False) -> None: ...
     def simulate(self, max_loop: int = 50000, callback_on_break: Callable[[int, int], bool] = None,
-                 callback_on_loop: Callable[[int, int, CellList2D], bool] = None) -> None: ...
+                 callback_on_loop: Callable[[int, int, CellList2D], bool] = None,
+                 stop_condition: StopCondition = None, recorder: FrameRecorder = None) -> None: ...
+    def step(self, num_loop: int = 1, recorder: FrameRecorder = None) -> int: ...
+    def run_until(self, max_loop: int = 50000, callback_on_break: Callable[[int, int], bool] = None,
+                  callback_on_loop: Callable[[int, int, CellList2D], bool] = None,
+                  stop_condition: StopCondition = None, recorder: FrameRecorder = None) -> int: ...
+    @property
+    def finished(self) -> bool: ...
+    @property
+    def loop_count(self) -> int: ...
     @property
     def cells(self) -> CellList2D: ...
+    @cells.setter
+    def cells(self, cells: CellList2D) -> None: ...
+
+
+# Run independent simulators on a native thread pool(num_threads=0: all hardware threads).
+# The GIL is released while running. Simulators must not share a model.
+@overload
+def simulate_many(simulators: List[Simulator], max_loop: int = 50000, num_threads: int = 0) -> List[CellList2D]: ...
+@overload
+def simulate_many(factory: Callable[[int], Simulator], seeds: List[int],
+                  max_loop: int = 50000, num_threads: int = 0) -> List[CellList2D]: ...
 
 
 class TreeNode:
@@ -133,3 +267,29 @@ class Tree:
     def get_node(self, x: int, y: int) -> TreeNode: ...
     def get_path(self, x1: int, y1: int, x2: int, y2: int) -> List[Tuple[int, int]]: ...
     def get_leaves(self) -> List[Leaf]: ...
+
+
+class CompactTree:
+    def __init__(self, cells: CellList2D) -> None: ...
+    def __len__(self) -> int: ...
+    def find(self, x: int, y: int) -> int: ...  # -1 if (x, y) is not broken
+    def leaves(self) -> np.ndarray: ...  # int32
+    def path_to_root(self, i: int) -> np.ndarray: ...  # int32, [i, parent of i, ..., root]
+    def get_path(self, x1: int, y1: int, x2: int, y2: int) -> List[Tuple[int, int]]: ...
+
+    # Read-only int32 arrays of the nodes in breadth-first order(roots first).
+    # The children of node i are children[child_offset[i]:child_offset[i + 1]].
+    @property
+    def x(self) -> np.ndarray: ...
+    @property
+    def y(self) -> np.ndarray: ...
+    @property
+    def parent(self) -> np.ndarray: ...  # -1 for roots
+    @property
+    def depth(self) -> np.ndarray: ...
+    @property
+    def subtree_size(self) -> np.ndarray: ...
+    @property
+    def child_offset(self) -> np.ndarray: ...  # len(tree) + 1
+    @property
+    def children(self) -> np.ndarray: ...
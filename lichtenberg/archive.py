@@ -1,5 +1,26 @@
 import lichtenberg as lb
 from PIL import Image
+import numpy as np
+
+
+def _gray_lut(c_max: int, gamma: float, scale: float) -> np.ndarray:
+    """
+    Make the table which maps count to luminance
+    """
+    c = np.arange(c_max + 1, dtype=np.float64)
+    k = (c / max(c_max, 1)) ** gamma * scale
+    return np.minimum((255 * k).astype(np.int64), 255).astype(np.uint8)
+
+
+def _gray_image(broken: np.ndarray, count: np.ndarray, gamma: float, scale: float) -> Image:
+    c_max = int(count.max()) if count.size else 0
+    lut = _gray_lut(c_max, gamma, scale)
+    lum = np.where(broken, lut[np.clip(count, 0, c_max)], 0).astype(np.uint8)
+    return Image.fromarray(lum, 'L')
+
+
+def _mono_image(broken: np.ndarray) -> Image:
+    return Image.fromarray(np.where(broken, 255, 0).astype(np.uint8), 'L')
 
 
 def gray(cells: lb.CellList2D, **kwargs) -> Image:
@@ -10,19 +31,9 @@ def gray(cells: lb.CellList2D, **kwargs) -> Image:
         gamma: float: gamma value (default is 1.0)
         scale: float: scaling value(default is 1.0)
     """
-    width, height = cells.width, cells.height
-    image = Image.new('L', (width, height))
     gamma = kwargs.get("gamma", 1.0)  # to remove short branches
     scale = kwargs.get("scale", 1.0)  # darken branches to emphasis return stroke
-    c_max = cells.get_max_count()
-    for y in range(height):
-        for x in range(width):
-            if cells.get_broken(x, y):
-                c = cells.get_count(x, y)
-                k = (c / c_max) ** gamma * scale
-                lm = min(int(255 * k), 255)
-                image.putpixel((x, y), (lm,))
-    return image
+    return _gray_image(cells.broken, cells.count, gamma, scale)
 
 
 def mono(cells: lb.CellList2D) -> Image:
@@ -30,14 +41,7 @@ def mono(cells: lb.CellList2D) -> Image:
     Output image which draw broken cells
     :param cells: Result of the simulation(Simulator.cells)
     """
-    width, height = cells.width, cells.height
-    image = Image.new('L', (width, height))
-    for y in range(height):
-        for x in range(width):
-            if cells.get_broken(x, y):
-                lm = 255
-                image.putpixel((x, y), (lm,))
-    return image
+    return _mono_image(cells.broken)
 
 
 def save(cells: lb.CellList2D, prefix: str, **kwargs) -> None:
@@ -57,12 +61,17 @@ def save(cells: lb.CellList2D, prefix: str, **kwargs) -> None:
     if kwargs.get("output_binary", False):
         cells.save(prefix + '.bin')
 
+    # extract once, share with all images
+    broken = cells.broken
+
     # output mono
     if kwargs.get("output_mono", False):
-        image = mono(cells)
+        image = _mono_image(broken)
         image.save(prefix + '_mono.png')
 
     # output grayscale
     if kwargs.get("output_gray", False):
-        image = gray(cells, **kwargs)
+        gamma = kwargs.get("gamma", 1.0)
+        scale = kwargs.get("scale", 1.0)
+        image = _gray_image(broken, cells.count, gamma, scale)
         image.save(prefix + '_gray.png')
@@ -0,0 +1,283 @@
+from collections import OrderedDict, namedtuple
+from enum import Enum
+from typing import Any, Hashable, List, Optional, Tuple
+import numpy as np
+import lichtenberg as lb
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class _LRUCache:
+    """
+    Mapping which drops the least recently used entry when it exceeds *maxsize*
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        self._shrink()
+
+    def resize(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._shrink()
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = self.misses = 0
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def _shrink(self) -> None:
+        while len(self._data) > max(self.maxsize, 0):
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# solved fields and the scale of their potentials, a field of 400x400 takes 640KB
+_cache = _LRUCache(16)
+
+
+def set_cache_size(size: int) -> None:
+    """
+    Set the number of solutions kept by ElectricField(0 disables the cache)
+    """
+    _cache.resize(size)
+
+
+def clear_cache() -> None:
+    _cache.clear()
+
+
+def cache_info() -> CacheInfo:
+    """
+    Statistics of the cache of ElectricField(hits, misses, maxsize, currsize)
+    """
+    return _cache.info()
+
+
+class FieldMethod(Enum):
+    Solve = 1  # make_electric_field, the border is 0
+    FFT = 2  # convolution with a free-space kernel, the potential is 0 beyond `radius`
+
+
+def _free_space_kernel(shape: Tuple[int, int], radius: float) -> np.ndarray:
+    """
+    Potential of a unit charge at (0, 0) on a periodic grid of *shape*
+    The 2D free-space potential log(1/r) shifted to be 0 at *radius*
+    """
+    h, w = shape
+    dy = np.fft.fftfreq(h, 1.0 / h)[:, np.newaxis]
+    dx = np.fft.fftfreq(w, 1.0 / w)
+    r = np.maximum(np.hypot(dx, dy), 0.5)  # the charge spreads over its cell
+    return np.maximum(np.log(radius / r), 0.0)
+
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+class ElectricField:
+    """
+    Potential of a field where some cells have a fixed potential
+    FieldMethod.Solve fixes the border to 0, FieldMethod.FFT approximates the potential
+    by point charges in free space, which is 0 farther than `radius` from the cells.
+
+    The solution is linear in the fixed potentials(the tolerance of the solver is relative to
+    the largest one), so `field * k` and the sum of fields over the same fixed cells and options
+    are made from solved fields without solving again.
+    Solutions are kept in an LRU cache keyed by the size, the fixed cells, their potentials
+    divided by the largest absolute one and the solver options, so the same field is solved once
+    and a field which only differs in scale is made by rescaling the cached solution.
+    """
+    def __init__(self, width: int, height: int, points: List[Tuple[int, int, float]],
+                 max_loop: int = 1000, eps: float = 1.0e-6, sor_coef: float = 1.5,
+                 num_threads: int = 1, solver: lb.DBMSolver = lb.DBMSolver.Multigrid,
+                 method: FieldMethod = FieldMethod.Solve, radius: float = None):
+        """
+        :param width: Width of the field
+        :param height: Height of the field
+        :param points: Cells of fixed potential. [(x, y, potential), ...]
+        :param max_loop: See make_electric_field
+        :param eps: See make_electric_field
+        :param sor_coef: See make_electric_field
+        :param num_threads: See make_electric_field
+        :param solver: See make_electric_field(Multigrid by default, SOR does not converge in max_loop on large fields)
+        :param method: FieldMethod.Solve runs make_electric_field,
+                       FieldMethod.FFT convolves the cells with a free-space kernel in O(N log N)
+        :param radius: The distance where the potential of a cell reaches 0(only for FieldMethod.FFT)
+                       It must be greater than 0.5, max(width, height) / 2 if None is specified
+        """
+        if width <= 0 or height <= 0:
+            raise ValueError("width and height must be positive")
+        if radius is None:
+            radius = max(width, height) / 2
+        # a charge spreads over its cell, the potential is 0 everywhere within radius 0.5
+        if method == FieldMethod.FFT and radius <= 0.5:
+            raise ValueError("radius must be greater than 0.5")
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        xs = points[:, 0].astype(np.int64)
+        ys = points[:, 1].astype(np.int64)
+        if ((xs < 0) | (xs >= width) | (ys < 0) | (ys >= height)).any():
+            raise ValueError("points must be inside the field")
+        # a cell given twice takes the last potential, as make_electric_field does
+        index = ys * width + xs
+        index, last = np.unique(index[::-1], return_index=True)
+        self.width = width
+        self.height = height
+        self._index = index
+        self._values = points[::-1, 2][last]
+        self._options = (max_loop, eps, sor_coef, num_threads, solver)
+        self.method = method
+        self.radius = float(radius)
+        self._terms = None  # [(field, factor), ...] if it is made from other fields
+        self._potential = None
+
+    @property
+    def points(self) -> List[Tuple[int, int, float]]:
+        """
+        Cells of fixed potential(each cell once, in row-major order)
+        """
+        xs, ys = self._index % self.width, self._index // self.width
+        return list(zip(xs.tolist(), ys.tolist(), self._values.tolist()))
+
+    @property
+    def potential(self) -> np.ndarray:
+        """
+        Read-only float32 array of shape (height, width)
+        """
+        if self._potential is None:
+            if self._terms is None:
+                self._potential = self._solve()
+            else:
+                potential = np.zeros((self.height, self.width), dtype=np.float32)
+                for field, factor in self._terms:
+                    potential += field.potential * np.float32(factor)
+                self._potential = _readonly(potential)
+        return self._potential
+
+    def __array__(self, dtype=None):
+        return np.asarray(self.potential, dtype=dtype)
+
+    def __mul__(self, factor: float) -> 'ElectricField':
+        factor = float(factor)
+        return self._derive(self._values * factor, [(self, factor)])
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, divisor: float) -> 'ElectricField':
+        return self * (1.0 / divisor)
+
+    def __neg__(self) -> 'ElectricField':
+        return self * -1.0
+
+    def __add__(self, other: 'ElectricField') -> 'ElectricField':
+        self._check_geometry(other)
+        return self._derive(self._values + other._values, [(self, 1.0), (other, 1.0)])
+
+    def __sub__(self, other: 'ElectricField') -> 'ElectricField':
+        self._check_geometry(other)
+        return self._derive(self._values - other._values, [(self, 1.0), (other, -1.0)])
+
+    def _check_geometry(self, other: 'ElectricField') -> None:
+        if not isinstance(other, ElectricField):
+            raise TypeError("ElectricField can be added only to ElectricField")
+        # the sum is a solution only if the fixed cells are the same
+        if (self.width, self.height) != (other.width, other.height) \
+                or not np.array_equal(self._index, other._index):
+            raise ValueError("fields must have the same size and the same fixed cells")
+        if (self.method, self.radius) != (other.method, other.radius):
+            raise ValueError("fields must have the same method and radius")
+        if self.method == FieldMethod.Solve and self._options != other._options:
+            raise ValueError("fields must be solved with the same options")
+
+    def _derive(self, values: np.ndarray, terms: List[Tuple['ElectricField', float]]) -> 'ElectricField':
+        field = ElectricField.__new__(ElectricField)
+        field.width = self.width
+        field.height = self.height
+        field._index = self._index
+        field._values = values
+        field._options = self._options
+        field.method = self.method
+        field.radius = self.radius
+        field._terms = terms
+        field._potential = None
+        return field
+
+    def _scale(self) -> float:
+        scale = float(np.abs(self._values).max()) if len(self._values) else 0.0
+        return scale if scale > 0.0 else 1.0
+
+    def _key(self) -> Hashable:
+        # the solution is linear in the potentials, fields differing only in scale share an entry
+        values = (self._values / self._scale()).astype(np.float32).tobytes()
+        if self.method == FieldMethod.FFT:
+            return self.width, self.height, self._index.tobytes(), values, self.method, self.radius
+        max_loop, eps, sor_coef, num_threads, solver = self._options
+        # SOR runs in red-black order with more than one thread, others do not depend on threads
+        red_black = solver == lb.DBMSolver.SOR and num_threads != 1
+        return (self.width, self.height, self._index.tobytes(), values, self.method,
+                max_loop, eps, sor_coef, int(solver), red_black)
+
+    def _solve(self) -> np.ndarray:
+        key = self._key()
+        scale = self._scale()
+        entry = _cache.get(key)
+        if entry is None:
+            if self.method == FieldMethod.FFT:
+                potential = self._convolve()
+            else:
+                max_loop, eps, sor_coef, num_threads, solver = self._options
+                potential = lb.make_electric_field(self.width, self.height, self.points, max_loop=max_loop,
+                                                   eps=eps, sor_coef=sor_coef, num_threads=num_threads,
+                                                   solver=solver, as_array=True)
+            potential = _readonly(potential)
+            _cache.put(key, (potential, scale))
+            return potential
+        potential, solved_scale = entry
+        if scale == solved_scale:
+            return potential
+        return _readonly(potential * np.float32(scale / solved_scale))
+
+    def _convolve(self) -> np.ndarray:
+        h, w = self.height, self.width
+        if len(self._index) == 0:
+            return np.zeros((h, w), dtype=np.float32)
+        # pad so that the periodic convolution does not wrap within radius
+        pad = int(np.ceil(self.radius))
+        shape = (h + pad, w + pad)
+        kernel = np.fft.rfft2(_free_space_kernel(shape, self.radius))
+        ys, xs = self._index // w, self._index % w
+
+        def convolve(charge: np.ndarray) -> np.ndarray:
+            grid = np.zeros(shape)
+            grid[ys, xs] = charge
+            return np.fft.irfft2(np.fft.rfft2(grid) * kernel, s=shape)[:h, :w]
+
+        # the charge of each cell is its potential divided by the potential there by unit charges,
+        # so the potential is about the given one along the cells
+        unit = convolve(np.ones(len(self._index)))[ys, xs]
+        potential = convolve(self._values / unit)
+        # rounding errors of FFT where no charge reaches
+        potential[np.abs(potential) < 1.0e-9 * np.abs(self._values).max()] = 0.0
+        potential = potential.astype(np.float32)
+        potential[ys, xs] = self._values
+        return potential
@@ -1,7 +1,31 @@
 from typing import Tuple, List
-from PIL import Image, ImageDraw, ImageMath, ImageFilter
+from PIL import Image, ImageDraw, ImageFilter
 from random import randint
+import numpy as np
 import lichtenberg as lb
+from lichtenberg.field import CacheInfo, ElectricField, FieldMethod, _LRUCache
+
+
+# paths of get_path with a seed, they do not change
+_path_cache = _LRUCache(256)
+
+
+def set_path_cache_size(size: int) -> None:
+    """
+    Set the number of paths kept by get_path(0 disables the cache)
+    """
+    _path_cache.resize(size)
+
+
+def clear_path_cache() -> None:
+    _path_cache.clear()
+
+
+def path_cache_info() -> CacheInfo:
+    """
+    Statistics of the cache of get_path(hits, misses, maxsize, currsize)
+    """
+    return _path_cache.info()
 
 
 def get_path(start: Tuple[int, int], end: Tuple[int, int], margin: int = 50,
@@ -14,11 +38,19 @@ def get_path(start: Tuple[int, int], end: Tuple[int, int], margin: int = 50,
     :param margin: The margin of the working area[pixel]
     :param randomness: Roughness of the line
     :param seed: The seed value of the internal random number generator
+                 the path with a seed is kept in a cache(see set_path_cache_size)
     :return: The list of points
     """
     if seed is not None and not isinstance(seed, int):
         raise ValueError("seed must be int or None")
 
+    key = None
+    if seed is not None:
+        key = (tuple(start), tuple(end), margin, randomness, seed)
+        points = _path_cache.get(key)
+        if points is not None:
+            return list(points)
+
     x1, y1 = start
     x2, y2 = end
     width = abs(x2 - x1 + 1)
@@ -36,15 +68,18 @@ def get_path(start: Tuple[int, int], end: Tuple[int, int], margin: int = 50,
     if seed is None:
         seed = randint(0, 2**24)
     model = lb.ValueNoiseBreakModel(work_width, work_height, seed=seed, scale=randomness)
+    model.set_seed(seed)
     sim = lb.Simulator(work_width, work_height, model)
     sim.breakdown(x_start+margin, y_start+margin)
-    sim.simulate(max_loop=10**5)
-    # Get Path
-    tree = lb.Tree(sim.cells)
-    points = tree.get_path(x_start+margin, y_start+margin, x_end+margin, y_end+margin)
+    sim.simulate(max_loop=10**5, stop_condition=lb.ReachCell(x_end+margin, y_end+margin))
+    # Get Path(the simulation stops when the end cell is broken, it leads back to the start cell)
+    points = sim.cells.trace(x_end+margin, y_end+margin)[::-1]
     x_offset = x1 - x_start - margin
     y_offset = y1 - y_start - margin
-    return [(x+x_offset, y+y_offset) for x, y in points]
+    points = [(x+x_offset, y+y_offset) for x, y in points]
+    if key is not None:
+        _path_cache.put(key, tuple(points))
+    return points
 
 
 def _linspace(start, stop, num):
@@ -52,9 +87,34 @@ def _linspace(start, stop, num):
     return [start + i * step for i in range(num)]
 
 
+def _color_curves(f: np.ndarray, color: Tuple[float, float, float]) -> np.ndarray:
+    """
+    Luminance of each channel of the intensity *f*, shape is f.shape + (3,)
+    """
+    lum = [np.trunc(f ** (1.0 / c) * 255) for c in color]
+    return np.clip(np.stack(lum, axis=-1), 0, 255).astype(np.int32)
+
+
+def _composite(image: Image, lum: np.ndarray, x_offset: int, y_offset: int) -> None:
+    """
+    Saturated addition of *lum*(height, width, 3) onto *image* at (x_offset, y_offset)
+    """
+    width, height = image.size
+    x1, y1 = max(x_offset, 0), max(y_offset, 0)
+    x2 = min(x_offset + lum.shape[1], width)
+    y2 = min(y_offset + lum.shape[0], height)
+    if x1 >= x2 or y1 >= y2:
+        return
+    box = (x1, y1, x2, y2)
+    dst = np.asarray(image.crop(box), dtype=np.int32)
+    dst = np.minimum(dst + lum[y1 - y_offset:y2 - y_offset, x1 - x_offset:x2 - x_offset], 255)
+    image.paste(Image.fromarray(dst.astype(np.uint8), "RGB"), box)
+
+
 def draw_potential(image: Image, control_points: List[Tuple[Tuple[int, int], float]],
                    margin: int = 50, gamma: float = 1.0, multiply: float = 1.0,
-                   color: Tuple[float, float, float] = None, seed: int = None) -> None:
+                   color: Tuple[float, float, float] = None, seed: int = None,
+                   method: FieldMethod = FieldMethod.Solve) -> None:
     """
     Draw a lightning with potential simulation method(for an intense lightning)
     :param image: Target PIL image(with RGB mode)
@@ -65,8 +125,9 @@ def draw_potential(image: Image, control_points: List[Tuple[Tuple[int, int], flo
     :param multiply: The coefficient to adjust brightness of light
     :param color: Color using exponential notation. (1.0, 1.0, 1.0) is white, (1.x, 1.0, 1.0) is red.
     :param seed: The seed value of the internal random number generator
+    :param method: FieldMethod.FFT approximates the potential with a free-space kernel in O(N log N)
+                   instead of solving it, the light reaches *margin* pixels from the path(margin must be 1 or more)
     """
-    width, height = image.size
     if color is None:
         color = (1.0, 1.0, 1.0)
 
@@ -92,101 +153,114 @@ def draw_potential(image: Image, control_points: List[Tuple[Tuple[int, int], flo
     field_height = path_height + margin * 2
     ox, oy = x_min - margin, y_min - margin
     potentials = [(x - ox, y - oy, siz) for (x, y), siz in zip(path_points, path_sizes)]
-    field = lb.make_electric_field(field_width, field_height, potentials)
+    field = ElectricField(field_width, field_height, potentials, method=method, radius=margin).potential
 
     # Imaging(Saturated Addition)
-    cR, cG, cB = 1.0 / color[0], 1.0 / color[1], 1.0 / color[2]
-    for y in range(field_height):
-        for x in range(field_width):
-            dx = x + x_min - margin
-            dy = y + y_min - margin
-            c = field[y][x]
-            f = c ** gamma * multiply
-            lumR = int(f ** cR * 255)
-            lumG = int(f ** cG * 255)
-            lumB = int(f ** cB * 255)
-            if 0 <= dx < width and 0 <= dy < height:
-                r, g, b = image.getpixel((dx, dy))
-                r = min(255, r + lumR)
-                g = min(255, g + lumG)
-                b = min(255, b + lumB)
-                image.putpixel((dx, dy), (r, g, b))
+    f = field.astype(np.float64) ** gamma * multiply
+    _composite(image, _color_curves(f, color), ox, oy)
 
 
 def extract_points(cells: lb.CellList2D) -> List[Tuple[int, int]]:
-    points = []
-    for y in range(cells.height):
-        for x in range(cells.width):
-            if cells.get_broken(x, y):
-                points.append((x, y))
-    return points
+    ys, xs = np.nonzero(cells.broken)
+    return list(zip(xs.tolist(), ys.tolist()))
 
 
-def draw_blur_with_points(image: Image, path_points: List[Tuple[int, int]],
-                          params: List[Tuple[int, float]], multiply: float,
-                          color: Tuple[float, float, float] = None,
-                          luminance: List[float] = None) -> None:
+def _splat(shape: Tuple[int, int], xs: np.ndarray, ys: np.ndarray, values: np.ndarray,
+           strokes: np.ndarray, weight: int) -> np.ndarray:
     """
-    Draw a lightning with blur effect
+    Draw a disk of radius *weight*(a pixel if 0) for each point onto a zero buffer of *shape*
+    In a stroke a later point overwrites earlier ones as ImageDraw does, strokes are added
+    """
+    height, width = shape
+    if weight:
+        stamp = Image.new("L", (2 * weight + 1, 2 * weight + 1))
+        ImageDraw.Draw(stamp).ellipse((0, 0, 2 * weight, 2 * weight), fill=(255,))
+        dy, dx = np.nonzero(np.asarray(stamp))
+        dx, dy = dx - weight, dy - weight
+    else:
+        dx = dy = np.zeros(1, dtype=np.int64)
+    px = (xs[:, np.newaxis] + dx).ravel()
+    py = (ys[:, np.newaxis] + dy).ravel()
+    order = np.repeat(np.arange(len(xs)), len(dx))
+    inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+    pixel = py[inside] * width + px[inside]
+    order = order[inside]
+
+    # the last point of each (stroke, pixel)
+    key = strokes[order] * (height * width) + pixel
+    sort = np.lexsort((order, key))
+    key = key[sort]
+    last = sort[np.append(key[1:] != key[:-1], True)]
+    buffer = np.bincount(pixel[last], weights=values[order[last]], minlength=height * width)
+    return buffer.astype(np.int64).reshape(shape)
+
+
+def draw_blur_batch(image: Image, strokes: List[List[Tuple[int, int]]],
+                    params: List[Tuple[int, float]], multiply: float,
+                    color: Tuple[float, float, float] = None,
+                    luminance: List[List[float]] = None) -> None:
+    """
+    Draw many lightnings with blur effect at once
+    Each pass of *params* is drawn and blurred once for all strokes, and the result is composited once,
+    so overlapping strokes are summed before the color curves(not saturated stroke by stroke)
     :param image: Target PIL image(with RGB mode)
-    :param path_points: The list of drawing point. [(x, y), ...]
+    :param strokes: The list of drawing points of each stroke. [[(x, y), ...], ...]
     :param params: The list of <line weight> and <blur radius>. [(weight, radius), ...]
     :param multiply: The coefficient to adjust brightness of light
     :param color: Color using exponential notation. (1.0, 1.0, 1.0) is white, (1.x, 1.0, 1.0) is red.
-    :param luminance: Luminance corresponding to each *path_point* value.
+    :param luminance: Luminance corresponding to each point of *strokes*. [[lum, ...], ...]
                       if None is specified, 1.0 is used. The range is [0.0,1.0].
     """
-    width, height = image.size
     if color is None:
         color = (1.0, 1.0, 1.0)
 
-    x_min, x_max = y_min, y_max = 10 ** 8, -10 ** 8
-    for x, y in path_points:
-        x_min, x_max = min(x, x_min), max(x, x_max)
-        y_min, y_max = min(y, y_min), max(y, y_max)
-
+    points = [p for stroke in strokes for p in stroke]
+    if not points:
+        return
+    xs, ys = np.array(points, dtype=np.int64).reshape(-1, 2).T
+    stroke_ids = np.repeat(np.arange(len(strokes)), [len(stroke) for stroke in strokes])
     if luminance is None:
-        luminance = [1.0] * len(path_points)
+        values = np.full(len(points), 255, dtype=np.uint8)
+    else:
+        lum = np.array([v for stroke_lum in luminance for v in stroke_lum], dtype=np.float64)
+        if len(lum) != len(points):
+            raise ValueError("luminance must have a value for each point")
+        values = np.clip(np.trunc(lum * 255), 0, 255).astype(np.uint8)
 
     # Blur Effect
     margin = 20
-    path_width = x_max - x_min + 1
-    path_height = y_max - y_min + 1
-    work_width = path_width + margin * 2
-    work_height = path_height + margin * 2
-    img_work = Image.new("I", (work_width, work_height))
+    x_offset, y_offset = int(xs.min()) - margin, int(ys.min()) - margin
+    work_width = int(xs.max()) - x_offset + 1 + margin
+    work_height = int(ys.max()) - y_offset + 1 + margin
+    work = np.zeros((work_height, work_width), dtype=np.int64)
     for weight, radius in params:
-        img_sub = Image.new("L", (work_width, work_height))
-        draw = ImageDraw.Draw(img_sub)
-        for (x, y), lum in zip(path_points, luminance):
-            w = weight
-            ix = x - x_min + margin
-            iy = y - y_min + margin
-            c = int(lum * 255)
-            if w:
-                draw.ellipse((ix - w, iy - w, ix + w, iy + w), fill=(c,))
-            else:
-                img_sub.putpixel((ix, iy), (c,))
-        img_blur = img_sub.filter(ImageFilter.GaussianBlur(radius))
-        img_work = ImageMath.eval("work+blur", work=img_work, blur=img_blur)
-    x_offset, y_offset = x_min - margin, y_min - margin
-
-    # Imaging
-    cR, cG, cB = 1.0 / color[0], 1.0 / color[1], 1.0 / color[2]
-    for y in range(work_height):
-        for x in range(work_width):
-            dx = x + x_offset
-            dy = y + y_offset
-            if 0 <= dx < width and 0 <= dy < height:
-                f = img_work.getpixel((x, y)) * multiply / 255
-                lumR = int(f ** cR * 255)
-                lumG = int(f ** cG * 255)
-                lumB = int(f ** cB * 255)
-                r, g, b = image.getpixel((dx, dy))
-                r = min(255, r + lumR)
-                g = min(255, g + lumG)
-                b = min(255, b + lumB)
-                image.putpixel((dx, dy), (r, g, b))
+        splat = _splat(work.shape, xs - x_offset, ys - y_offset, values, stroke_ids, weight)
+        # overlapping strokes exceed 255, the blur is linear so they are blurred in layers of "L"
+        for level in range(0, int(splat.max()), 255):
+            img_sub = Image.fromarray(np.clip(splat - level, 0, 255).astype(np.uint8), "L")
+            img_blur = img_sub.filter(ImageFilter.GaussianBlur(radius))
+            work += np.asarray(img_blur)
+
+    # Imaging(the sum takes integer values, so the curves are tables of them)
+    f = np.arange(work.max() + 1) * multiply / 255
+    _composite(image, _color_curves(f, color)[work], x_offset, y_offset)
+
+
+def draw_blur_with_points(image: Image, path_points: List[Tuple[int, int]],
+                          params: List[Tuple[int, float]], multiply: float,
+                          color: Tuple[float, float, float] = None,
+                          luminance: List[float] = None) -> None:
+    """
+    Draw a lightning with blur effect
+    :param image: Target PIL image(with RGB mode)
+    :param path_points: The list of drawing point. [(x, y), ...]
+    :param params: The list of <line weight> and <blur radius>. [(weight, radius), ...]
+    :param multiply: The coefficient to adjust brightness of light
+    :param color: Color using exponential notation. (1.0, 1.0, 1.0) is white, (1.x, 1.0, 1.0) is red.
+    :param luminance: Luminance corresponding to each *path_point* value.
+                      if None is specified, 1.0 is used. The range is [0.0,1.0].
+    """
+    draw_blur_batch(image, [path_points], params, multiply, color, None if luminance is None else [luminance])
 
 
 def draw_blur(image: Image, control_points: List[Tuple[int, int]],
@@ -72,5 +72,5 @@ setup(
     cmdclass=dict(build_ext=CMakeBuild),
     zip_safe=False,
     packages=find_packages(),
-    install_requires=['pillow']
+    install_requires=['pillow', 'numpy']
 )
@@ -14,13 +14,14 @@ namespace lichtenberg {
 
 	//CellList2D
 	CellList2D::CellList2D()
-		: width(0), height(0), cells(nullptr)
+		: width(0), height(0), growing(false), cells(nullptr)
 	{
 	}
 	CellList2D::CellList2D(int width_, int height_)
 	{
 		width = width_;
 		height = height_;
+		growing = false;
 		cells = new CellInfo[width * height];
 		clear();
 	}
@@ -28,6 +29,7 @@ namespace lichtenberg {
 	{
 		this->width = other.width;
 		this->height = other.height;
+		this->growing = false;
 		int n = other.width * other.height;
 		this->cells = new CellInfo[n];
 		memcpy(this->cells, other.cells, n * sizeof(CellInfo));
@@ -123,6 +125,41 @@ namespace lichtenberg {
 		return maxcount;
 	}
 
+	std::vector<Point> CellList2D::trace(int x, int y) const
+	{
+		if (x < 0 || x >= width || y < 0 || y >= height) {
+			throw std::invalid_argument("the cell is out of the field");
+		}
+		std::vector<Point> path;
+		if (!get_broken(x, y) || get_insulated(x, y)) {
+			return path;
+		}
+		const int n = width * height;
+		for (;;) {
+			path.push_back(Point(x, y));
+			switch (get_dir(x, y)) {
+			case Direction::Up: y--; break;
+			case Direction::Down: y++; break;
+			case Direction::Left: x--; break;
+			case Direction::Right: x++; break;
+			default: return path;
+			}
+			//broken data(e.g. loaded file) may point outside or make a cycle
+			if (x < 0 || x >= width || y < 0 || y >= height || (int)path.size() > n) {
+				throw std::runtime_error("the directions of the cells do not lead to a base cell");
+			}
+		}
+	}
+
+	CellInfo* CellList2D::data()
+	{
+		return cells;
+	}
+	const CellInfo* CellList2D::data() const
+	{
+		return cells;
+	}
+
 	bool CellList2D::save(const char* filepath) const
 	{
 		if (!is_valid()) return false;
@@ -1,5 +1,6 @@
 #pragma once
 #include <tuple>
+#include <vector>
 
 namespace lichtenberg {
 
@@ -34,6 +35,9 @@ namespace lichtenberg {
 	public:
 		int width;
 		int height;
+		//a Simulator is growing from these cells(set by the simulator, not copied)
+		//cells must not be broken or insulated directly then, it does not see them
+		bool growing;
 
 		CellList2D();
 		CellList2D(int width, int height);
@@ -57,6 +61,13 @@ namespace lichtenberg {
 
 		int get_max_count() const;
 
+		//cells from (x, y) to its base cell along the directions(empty if (x, y) is not broken or insulated)
+		std::vector<Point> trace(int x, int y) const;
+
+		//raw access to the cell buffer (row-major, width * height)
+		CellInfo* data();
+		const CellInfo* data() const;
+
 		//archiving
 		bool save(const char* filepath) const;
 		bool load(const char* filepath);
@@ -6,35 +6,111 @@
 #include "model/fastdbm.h"
 #include "model/dlamodel.h"
 #include "util/electricfield.h"
+#include "util/random.h"
 #include "tree.h"
 #include <memory>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 #include <pybind11/functional.h>
+#include <pybind11/numpy.h>
+#include <algorithm>
 #include <cstdlib>
+#include <cstddef>
 #include <optional>
+#include <string>
+#include <type_traits>
 
 using namespace lichtenberg;
 using namespace lichtenberg::model;
 
+//decides the seeds of the models created after this call
 void set_random_seed(int seed)
 {
-	srand(seed);
+	util::set_default_seed((uint64_t)seed);
 }
 
 namespace py = pybind11;
+
+//zero-copy view of one member of CellInfo as a (height, width) array
+//the view keeps `self` alive, but it is invalidated by CellList2D.load()
+template <typename T>
+static py::array cell_field_view(py::object self, size_t offset, bool writeable)
+{
+	CellList2D& cells = self.cast<CellList2D&>();
+	std::vector<py::ssize_t> shape = { cells.height, cells.width };
+	std::vector<py::ssize_t> strides = {
+		(py::ssize_t)sizeof(CellInfo) * cells.width, (py::ssize_t)sizeof(CellInfo) };
+	if (!cells.is_valid()) {
+		return py::array(py::dtype::of<T>(), { 0, 0 });
+	}
+	char* ptr = reinterpret_cast<char*>(cells.data()) + offset;
+	py::array view(py::dtype::of<T>(), shape, strides, ptr, self);
+	if (!writeable) {
+		view.attr("flags").attr("writeable") = false;
+	}
+	return view;
+}
+
+//read-only (height, width) view of a row-major buffer owned by `base`
+template <typename T>
+static py::array readonly_view(const T* data, int height, int width, py::object base)
+{
+	py::array view(py::dtype::of<T>(), { (py::ssize_t)height, (py::ssize_t)width },
+		{ (py::ssize_t)sizeof(T) * width, (py::ssize_t)sizeof(T) }, data, base);
+	view.attr("flags").attr("writeable") = false;
+	return view;
+}
+
+//read-only 1-D view of a vector owned by `base`
+static py::array readonly_vector(const std::vector<int>& v, py::object base)
+{
+	py::array view(py::dtype::of<int>(), { (py::ssize_t)v.size() }, { (py::ssize_t)sizeof(int) }, v.data(), base);
+	view.attr("flags").attr("writeable") = false;
+	return view;
+}
+
+//PEP 3118 format of CellInfo (used by np.asarray(cells))
+static std::string cell_info_format()
+{
+	static_assert(sizeof(Direction) == sizeof(int), "unexpected size of Direction");
+	size_t used = offsetof(CellInfo, insulated) + sizeof(bool);
+	std::string format = "T{i:direction:i:count:?:broken:?:insulated:";
+	if (sizeof(CellInfo) > used) {
+		format += std::to_string(sizeof(CellInfo) - used) + "x";
+	}
+	return format + "}";
+}
+
+//runs the simulators without the GIL and returns their cells in order
+static py::list run_simulators(const std::vector<py::object>& objects, int max_loop, int num_threads)
+{
+	std::vector<Simulator*> sims;
+	sims.reserve(objects.size());
+	for (const auto& obj : objects) {
+		sims.push_back(obj.cast<Simulator*>());
+	}
+	{
+		py::gil_scoped_release release;
+		simulate_many(sims, max_loop, num_threads);
+	}
+	py::list result;
+	for (size_t i = 0; i < sims.size(); i++) {
+		result.append(py::cast(&sims[i]->get_cells(), py::return_value_policy::reference_internal, objects[i]));
+	}
+	return result;
+}
+
 PYBIND11_MODULE(_lichtenberg, m) {
 	m.doc() = "lichtenberg: an implementation of lichtenberg figure";
 	m.def("set_random_seed", &set_random_seed);
-	m.def("make_electric_field", &util::make_electric_field,
-		py::arg("width"), py::arg("height"), py::arg("points"),
-		py::arg("max_loop") = 1000, py::arg("eps") = 1.0e-6f, py::arg("sor_coef") = 1.5f);
 
 	py::class_<BreakModel, BreakModelPtr>(m, "BreakModel")
 		.def("test", &BreakModel::test,
 			py::arg("x"), py::arg("y"))
 		.def("update", &BreakModel::update,
-			py::arg("cells"), py::arg("broken_list"));
+			py::arg("cells"), py::arg("broken_list"))
+		.def("set_seed", &BreakModel::set_seed,
+			py::arg("seed"));
 
 	py::class_<DefaultBreakModel, std::shared_ptr<DefaultBreakModel>, BreakModel>(m, "DefaultBreakModel")
 		.def(py::init<>());
@@ -58,16 +134,95 @@ PYBIND11_MODULE(_lichtenberg, m) {
 		.def_readwrite("potential", &DBMCell::potential)
 		.def_readwrite("lock", &DBMCell::lock);
 
+	py::enum_<DBMSolver>(m, "DBMSolver")
+		.value("SOR", DBMSolver::SOR)
+		.value("Multigrid", DBMSolver::Multigrid)
+		.value("RedBlackSOR", DBMSolver::RedBlackSOR);
+
+	m.def("make_electric_field", [](int width, int height, const std::vector<std::tuple<int, int, float>>& points,
+		int max_loop, float eps, float sor_coef, int num_threads, DBMSolver solver, bool as_array) -> py::object {
+			std::vector<float> field;
+			{
+				py::gil_scoped_release release;
+				field = util::make_electric_field(width, height, points, max_loop, eps, sor_coef, num_threads, solver);
+			}
+			if (as_array) {
+				//the array owns the vector
+				auto data = new std::vector<float>(std::move(field));
+				py::capsule owner(data, [](void* p) { delete reinterpret_cast<std::vector<float>*>(p); });
+				return py::array_t<float>({ height, width }, data->data(), owner);
+			}
+			py::list rows(height);
+			for (int y = 0; y < height; y++) {
+				py::list row(width);
+				for (int x = 0; x < width; x++) {
+					row[x] = py::float_(field[(size_t)y * width + x]);
+				}
+				rows[y] = row;
+			}
+			return rows;
+		}, py::arg("width"), py::arg("height"), py::arg("points"),
+		py::arg("max_loop") = 1000, py::arg("eps") = 1.0e-6f, py::arg("sor_coef") = 1.5f, py::arg("num_threads") = 1,
+		py::arg("solver") = DBMSolver::SOR, py::arg("as_array") = false);
+
 	py::class_<DielectricBreakModel, std::shared_ptr<DielectricBreakModel>, BreakModel>(m, "DielectricBreakModel")
-		.def(py::init<int, int, DBMGrid, double, double>(),
+		.def(py::init<int, int, DBMGrid, double, double, DBMSolver, int, bool>(),
 			py::arg("width"), py::arg("height"), py::arg("initial_state"),
-			py::arg("min_guarantee") = 0.0, py::arg("eta") = 1.0)
-		.def("get_potential", &DielectricBreakModel::get_potential);
+			py::arg("min_guarantee") = 0.0, py::arg("eta") = 1.0, py::arg("solver") = DBMSolver::SOR,
+			py::arg("num_threads") = 1, py::arg("incremental") = false)
+		.def(py::init([](int width, int height,
+			py::array_t<double, py::array::c_style | py::array::forcecast> potential,
+			py::array_t<bool, py::array::c_style | py::array::forcecast> lock,
+			double min_guarantee, double eta, DBMSolver solver, int num_threads, bool incremental) {
+				for (const auto& a : { py::array(potential), py::array(lock) }) {
+					if (a.ndim() != 2 || a.shape(0) != height + 2 || a.shape(1) != width + 2) {
+						throw std::invalid_argument("potential and lock must be arrays of shape (height+2, width+2).");
+					}
+				}
+				std::vector<double> p(potential.data(), potential.data() + potential.size());
+				std::vector<uint8_t> l(lock.data(), lock.data() + lock.size());
+				return std::make_shared<DielectricBreakModel>(width, height, p, l,
+					min_guarantee, eta, solver, num_threads, incremental);
+			}),
+			py::arg("width"), py::arg("height"), py::arg("potential"), py::arg("lock"),
+			py::arg("min_guarantee") = 0.0, py::arg("eta") = 1.0, py::arg("solver") = DBMSolver::SOR,
+			py::arg("num_threads") = 1, py::arg("incremental") = false)
+		.def("get_potential", &DielectricBreakModel::get_potential)
+		//zero-copy read-only views of the grid, (height+2, width+2)
+		.def_property_readonly("potentials", [](py::object self) {
+			const auto& v = self.cast<const DielectricBreakModel&>().get_potentials();
+			auto [w, h] = self.cast<const DielectricBreakModel&>().field_size();
+			return readonly_view(v.data(), h, w, self);
+		})
+		.def_property_readonly("lock", [](py::object self) {
+			const auto& v = self.cast<const DielectricBreakModel&>().get_lock();
+			auto [w, h] = self.cast<const DielectricBreakModel&>().field_size();
+			return readonly_view(reinterpret_cast<const bool*>(v.data()), h, w, self);
+		})
+		.def_property_readonly("last_iterations", &DielectricBreakModel::get_last_iterations)
+		.def_property_readonly("last_residual", &DielectricBreakModel::get_last_residual);
 
 	py::class_<FastDBM, std::shared_ptr<FastDBM>, BreakModel>(m, "FastDBM")
-		.def(py::init<int, int, double, double, const std::vector<float>&>(),
+		.def(py::init([](int width, int height, double min_guarantee, double eta,
+			std::optional<py::array_t<float, py::array::c_style | py::array::forcecast>> bias,
+			double theta, int num_threads) {
+				std::shared_ptr<const float> data;
+				if (bias && bias->size() != 0) {
+					if (bias->size() != (py::ssize_t)width * height) {
+						throw std::runtime_error("The size of bias_array must be width*height.");
+					}
+					//a float32 array in C order is shared, the model keeps it alive
+					py::object owner = *bias;
+					data = std::shared_ptr<const float>(bias->data(), [owner](const float*) mutable {
+						py::gil_scoped_acquire gil;
+						owner = py::object();
+					});
+				}
+				return std::make_shared<FastDBM>(width, height, min_guarantee, eta, data, theta, num_threads);
+			}),
 			py::arg("width"), py::arg("height"),
-			py::arg("min_guarantee") = 0.0, py::arg("eta") = 1.0, py::arg("bias") = std::vector<float>());
+			py::arg("min_guarantee") = 0.0, py::arg("eta") = 1.0, py::arg("bias") = py::none(),
+			py::arg("theta") = 0.0, py::arg("num_threads") = 1);
 
 	py::class_<DLABreakModel, std::shared_ptr<DLABreakModel>, BreakModel>(m, "DLABreakModel")
 		.def(py::init<int, int, int>(),
@@ -80,11 +235,34 @@ PYBIND11_MODULE(_lichtenberg, m) {
 		.value("Down", Direction::Down)
 		.value("Right", Direction::Right);
 
-	py::class_<CellList2D>(m, "CellList2D")
+	py::class_<CellList2D>(m, "CellList2D", py::buffer_protocol())
 		.def(py::init<>())
 		.def(py::init<int, int>())
 		.def_readonly("width", &CellList2D::width)
 		.def_readonly("height", &CellList2D::height)
+		.def_buffer([](CellList2D& cells) {
+			static const std::string format = cell_info_format();
+			bool valid = cells.is_valid();
+			return py::buffer_info(
+				cells.data(), sizeof(CellInfo), format, 2,
+				{ valid ? cells.height : 0, valid ? cells.width : 0 },
+				{ sizeof(CellInfo) * cells.width, sizeof(CellInfo) }, true);
+		})
+		//read-only while a simulator grows from the cells, it would not grow the cells written there
+		.def_property_readonly("broken", [](py::object self) {
+			bool writeable = !self.cast<CellList2D&>().growing;
+			return cell_field_view<bool>(self, offsetof(CellInfo, broken), writeable);
+		})
+		.def_property_readonly("insulated", [](py::object self) {
+			bool writeable = !self.cast<CellList2D&>().growing;
+			return cell_field_view<bool>(self, offsetof(CellInfo, insulated), writeable);
+		})
+		.def_property_readonly("count", [](py::object self) {
+			return cell_field_view<int>(self, offsetof(CellInfo, count), true);
+		})
+		.def_property_readonly("direction", [](py::object self) {
+			return cell_field_view<std::underlying_type_t<Direction>>(self, offsetof(CellInfo, direction), false);
+		})
 		.def("is_valid", &CellList2D::is_valid)
 		.def("load", &CellList2D::load)
 		.def("save", &CellList2D::save)
@@ -106,22 +284,177 @@ PYBIND11_MODULE(_lichtenberg, m) {
 			py::arg("x"), py::arg("y"))
 		.def("set_insulated", &CellList2D::set_insulated,
 			py::arg("x"), py::arg("y"))
-		.def("get_max_count", &CellList2D::get_max_count);
+		.def("get_max_count", &CellList2D::get_max_count)
+		.def("trace", &CellList2D::trace,
+			py::arg("x"), py::arg("y"));
+
+	py::class_<StopCondition, StopConditionPtr>(m, "StopCondition")
+		.def("__or__", [](StopConditionPtr self, StopConditionPtr other) -> StopConditionPtr {
+			return std::make_shared<AnyOf>(std::vector<StopConditionPtr>{ self, other });
+		})
+		.def("__and__", [](StopConditionPtr self, StopConditionPtr other) -> StopConditionPtr {
+			return std::make_shared<AllOf>(std::vector<StopConditionPtr>{ self, other });
+		});
+
+	py::class_<ReachRow, std::shared_ptr<ReachRow>, StopCondition>(m, "ReachRow")
+		.def(py::init<int>(), py::arg("y"));
+
+	py::class_<ReachColumn, std::shared_ptr<ReachColumn>, StopCondition>(m, "ReachColumn")
+		.def(py::init<int>(), py::arg("x"));
+
+	py::class_<ReachCell, std::shared_ptr<ReachCell>, StopCondition>(m, "ReachCell")
+		.def(py::init<int, int>(), py::arg("x"), py::arg("y"));
+
+	py::class_<EnterMask, std::shared_ptr<EnterMask>, StopCondition>(m, "EnterMask")
+		.def(py::init([](py::array_t<bool, py::array::c_style | py::array::forcecast> mask) {
+			if (mask.ndim() != 2) {
+				throw std::invalid_argument("mask must be a 2D array (height, width).");
+			}
+			const bool* p = mask.data();
+			std::vector<uint8_t> values(p, p + mask.size());
+			return std::make_shared<EnterMask>((int)mask.shape(1), (int)mask.shape(0), values);
+		}), py::arg("mask"));
+
+	py::class_<MaxBroken, std::shared_ptr<MaxBroken>, StopCondition>(m, "MaxBroken")
+		.def(py::init<int>(), py::arg("limit"));
+
+	py::class_<MaxDepth, std::shared_ptr<MaxDepth>, StopCondition>(m, "MaxDepth")
+		.def(py::init<int>(), py::arg("limit"));
+
+	py::class_<AnyOf, std::shared_ptr<AnyOf>, StopCondition>(m, "AnyOf")
+		.def(py::init<const std::vector<StopConditionPtr>&>(), py::arg("conditions"));
+
+	py::class_<AllOf, std::shared_ptr<AllOf>, StopCondition>(m, "AllOf")
+		.def(py::init<const std::vector<StopConditionPtr>&>(), py::arg("conditions"));
+
+	py::enum_<FrameRecorder::Mode>(m, "FrameMode")
+		.value("Mask", FrameRecorder::Mode::Mask)
+		.value("Delta", FrameRecorder::Mode::Delta)
+		.export_values();
+
+	py::class_<FrameRecorder>(m, "FrameRecorder")
+		.def(py::init<int, int, FrameRecorder::Mode, bool>(),
+			py::arg("interval"), py::arg("capacity"), py::arg("mode") = FrameRecorder::Mode::Mask,
+			py::arg("with_field") = false)
+		.def("__len__", &FrameRecorder::size)
+		.def_property_readonly("interval", &FrameRecorder::get_interval)
+		.def_property_readonly("mode", &FrameRecorder::get_mode)
+		.def_property_readonly("with_field", &FrameRecorder::has_field)
+		.def_property_readonly("dropped", &FrameRecorder::get_dropped)
+		.def("clear", &FrameRecorder::clear)
+		.def("loops", [](const FrameRecorder& rec) {
+			py::array_t<int> result(rec.size());
+			int* dst = result.mutable_data();
+			for (int i = 0; i < rec.size(); i++) {
+				dst[i] = rec.frame_loop(i);
+			}
+			return result;
+		})
+		.def("masks", [](const FrameRecorder& rec) {
+			if (rec.get_mode() != FrameRecorder::Mode::Mask) {
+				throw std::runtime_error("masks() is available only in Mask mode.");
+			}
+			const size_t n = (size_t)rec.get_width() * rec.get_height();
+			py::array_t<bool> result({ (py::ssize_t)rec.size(), (py::ssize_t)rec.get_height(), (py::ssize_t)rec.get_width() });
+			bool* dst = result.mutable_data();
+			for (int i = 0; i < rec.size(); i++) {
+				const uint8_t* src = rec.frame_mask(i);
+				std::transform(src, src + n, dst + i * n, [](uint8_t v) { return v != 0; });
+			}
+			return result;
+		})
+		.def("deltas", [](const FrameRecorder& rec) {
+			if (rec.get_mode() != FrameRecorder::Mode::Delta) {
+				throw std::runtime_error("deltas() is available only in Delta mode.");
+			}
+			py::list result;
+			for (int i = 0; i < rec.size(); i++) {
+				const auto& points = rec.frame_delta(i);
+				py::array_t<int> a({ (py::ssize_t)points.size(), (py::ssize_t)2 });
+				int* dst = a.mutable_data();
+				for (const auto& [x, y] : points) {
+					*dst++ = x;
+					*dst++ = y;
+				}
+				result.append(a);
+			}
+			return result;
+		})
+		.def("fields", [](const FrameRecorder& rec) {
+			if (!rec.has_field()) {
+				throw std::runtime_error("The recorder was created with with_field=False.");
+			}
+			const size_t n = (size_t)rec.get_field_width() * rec.get_field_height();
+			py::array_t<float> result({ (py::ssize_t)rec.size(), (py::ssize_t)rec.get_field_height(), (py::ssize_t)rec.get_field_width() });
+			float* dst = result.mutable_data();
+			for (int i = 0; i < rec.size(); i++) {
+				std::copy(rec.frame_field(i), rec.frame_field(i) + n, dst + i * n);
+			}
+			return result;
+		});
+
+	py::enum_<GrowthMode>(m, "GrowthMode")
+		.value("Test", GrowthMode::Test)
+		.value("Weighted", GrowthMode::Weighted);
 
 	py::class_<Simulator>(m, "Simulator")
-		.def(py::init<int, int, BreakModelPtr, bool, bool, bool, bool>(),
+		.def(py::init<int, int, BreakModelPtr, bool, bool, bool, bool, GrowthMode>(),
 			py::arg("width"), py::arg("height"), py::arg("model") = BreakModelPtr(),
-			py::arg("up") = true, py::arg("down") = true, py::arg("left") = true, py::arg("right") = true)
+			py::arg("up") = true, py::arg("down") = true, py::arg("left") = true, py::arg("right") = true,
+			py::arg("growth") = GrowthMode::Test)
 		.def("breakdown", &Simulator::breakdown,
 			py::arg("x"), py::arg("y"))
+		.def("set_seed", &Simulator::set_seed,
+			py::arg("seed"))
 		.def("insulate", &Simulator::insulate)
 		.def("insulate_square", &Simulator::insulate_square,
 			py::arg("x1"), py::arg("y1"), py::arg("x2"), py::arg("y2"), py::arg("fill") = false)
 		.def("insulate_circle", &Simulator::insulate_circle,
 			py::arg("cx"), py::arg("cy"), py::arg("radius"), py::arg("fill") = false)
-		.def("simulate", &Simulator::simulate, py::arg("max_loop") = Simulator::MAX_LOOP_COUNT,
-			py::arg("callback_on_break") = nullptr, py::arg("callback_on_loop") = nullptr)
-		.def_readwrite("cells", &Simulator::cells);
+		.def("simulate", [](Simulator& sim, int max_loop,
+			Simulator::BreakCallBack callback_on_break, Simulator::LoopCallBack callback_on_loop,
+			StopConditionPtr stop_condition, FrameRecorder* recorder) {
+				if (!callback_on_break && !callback_on_loop) {
+					//no python code is called during the simulation
+					py::gil_scoped_release release;
+					sim.simulate(max_loop, nullptr, nullptr, stop_condition, recorder);
+				}
+				else {
+					sim.simulate(max_loop, callback_on_break, callback_on_loop, stop_condition, recorder);
+				}
+			}, py::arg("max_loop") = Simulator::MAX_LOOP_COUNT,
+			py::arg("callback_on_break") = nullptr, py::arg("callback_on_loop") = nullptr,
+			py::arg("stop_condition") = nullptr, py::arg("recorder") = nullptr)
+		.def("step", &Simulator::step, py::arg("num_loop") = 1, py::arg("recorder") = nullptr,
+			py::call_guard<py::gil_scoped_release>())
+		.def("run_until", [](Simulator& sim, int max_loop,
+			Simulator::BreakCallBack callback_on_break, Simulator::LoopCallBack callback_on_loop,
+			StopConditionPtr stop_condition, FrameRecorder* recorder) {
+				if (!callback_on_break && !callback_on_loop) {
+					py::gil_scoped_release release;
+					return sim.run_until(max_loop, nullptr, nullptr, stop_condition, recorder);
+				}
+				return sim.run_until(max_loop, callback_on_break, callback_on_loop, stop_condition, recorder);
+			}, py::arg("max_loop") = Simulator::MAX_LOOP_COUNT,
+			py::arg("callback_on_break") = nullptr, py::arg("callback_on_loop") = nullptr,
+			py::arg("stop_condition") = nullptr, py::arg("recorder") = nullptr)
+		.def_property_readonly("finished", &Simulator::is_finished)
+		.def_property_readonly("loop_count", &Simulator::get_loop_count)
+		.def_property("cells", &Simulator::get_cells, &Simulator::set_cells,
+			py::return_value_policy::reference_internal);
+
+	m.def("simulate_many", &run_simulators,
+		py::arg("simulators"), py::arg("max_loop") = Simulator::MAX_LOOP_COUNT, py::arg("num_threads") = 0);
+	m.def("simulate_many", [](py::function factory, const std::vector<int>& seeds, int max_loop, int num_threads) {
+			std::vector<py::object> objects;
+			for (int seed : seeds) {
+				py::object obj = factory(seed);
+				obj.cast<Simulator*>();  //type check
+				objects.push_back(obj);
+			}
+			return run_simulators(objects, max_loop, num_threads);
+		}, py::arg("factory"), py::arg("seeds"),
+		py::arg("max_loop") = Simulator::MAX_LOOP_COUNT, py::arg("num_threads") = 0);
 
 	py::class_<TreeNode>(m, "TreeNode")
 		.def(py::init<>())
@@ -147,5 +480,44 @@ PYBIND11_MODULE(_lichtenberg, m) {
 			py::arg("x1"), py::arg("y1"), py::arg("x2"), py::arg("y2"))
 		.def("get_leaves", &Tree::get_leaves);
 
+	py::class_<CompactTree>(m, "CompactTree")
+		.def(py::init<const CellList2D&>(),
+			py::arg("cells"))
+		.def("__len__", &CompactTree::size)
+		.def("find", &CompactTree::find,
+			py::arg("x"), py::arg("y"))
+		.def("leaves", [](const CompactTree& tree) {
+			std::vector<int> leaves = tree.leaves();
+			return py::array_t<int>((py::ssize_t)leaves.size(), leaves.data());
+		})
+		.def("path_to_root", [](const CompactTree& tree, int i) {
+			std::vector<int> path = tree.path_to_root(i);
+			return py::array_t<int>((py::ssize_t)path.size(), path.data());
+		}, py::arg("i"))
+		.def("get_path", &CompactTree::get_path,
+			py::arg("x1"), py::arg("y1"), py::arg("x2"), py::arg("y2"))
+		//zero-copy views of the node arrays
+		.def_property_readonly("x", [](py::object self) {
+			return readonly_vector(self.cast<const CompactTree&>().get_x(), self);
+		})
+		.def_property_readonly("y", [](py::object self) {
+			return readonly_vector(self.cast<const CompactTree&>().get_y(), self);
+		})
+		.def_property_readonly("parent", [](py::object self) {
+			return readonly_vector(self.cast<const CompactTree&>().get_parent(), self);
+		})
+		.def_property_readonly("depth", [](py::object self) {
+			return readonly_vector(self.cast<const CompactTree&>().get_depth(), self);
+		})
+		.def_property_readonly("subtree_size", [](py::object self) {
+			return readonly_vector(self.cast<const CompactTree&>().get_subtree_size(), self);
+		})
+		.def_property_readonly("child_offset", [](py::object self) {
+			return readonly_vector(self.cast<const CompactTree&>().get_child_offset(), self);
+		})
+		.def_property_readonly("children", [](py::object self) {
+			return readonly_vector(self.cast<const CompactTree&>().get_children(), self);
+		});
+
 }
 
@@ -2,43 +2,65 @@
 #include "dbmmodel.h"
 #include <cassert>
 #include <stdexcept>
-#include <cstdlib>
 #include <cmath>
+#include <algorithm>
 #include <set>
 
 
 namespace lichtenberg {
 	namespace model {
+		static const int DBM_MAX_LOOP = 10000;  //SOR sweeps
+		static const int DBM_MAX_CYCLE = 100;  //multigrid V-cycles
+		static const double DBM_EPS = 1.0e-3;
+		static const int DBM_WINDOW_MARGIN = 4;  //initial margin of the window in incremental mode
+		static const double DBM_WINDOW_EPS = 1.0e-4;  //residual per cell around the window
 		DBMCell::DBMCell(double potential, bool lock)
 			: potential(potential), lock(lock)
 		{
 		}
 
-		DielectricBreakModel::DielectricBreakModel(int width, int height, const DBMGrid& initial_state, double min_guarantee, double eta)
-			: init(false), width(width), height(height), min_guarantee(min_guarantee), eta(eta), denominator(0.0)
+		DielectricBreakModel::DielectricBreakModel(int width, int height, const DBMGrid& initial_state, double min_guarantee, double eta,
+			DBMSolver solver, int num_threads, bool incremental)
+			: init(false), width(width), height(height), min_guarantee(min_guarantee), eta(eta), solver(solver),
+			grid_width(width + 2), grid_height(height + 2), num_threads(num_threads),
+			last_stats({ 0, 0.0, false }), denominator(0.0), incremental(incremental), drift(0.0), selection_valid(false)
 		{
-			int grid_height = (int)initial_state.size();
-			if (grid_height == 0) {
+			if ((int)initial_state.size() == 0) {
 				throw std::runtime_error("the height of initial_state is invalid.");
 			}
-			int grid_width = (int)initial_state[0].size();
-			if (grid_width != width + 2 || grid_height != height + 2) {
+			if ((int)initial_state[0].size() != grid_width || (int)initial_state.size() != grid_height) {
 				throw std::runtime_error("the size of initial_state must be (width+2)*(height*2).");
 			}
-			grid.resize(grid_height);
+			potentials.resize((size_t)grid_width * grid_height);
+			lock.resize((size_t)grid_width * grid_height);
 			for (int y = 0; y < grid_height; y++) {
-				grid[y].resize(grid_width);
+				if ((int)initial_state[y].size() != grid_width) {
+					throw std::runtime_error("the size of initial_state must be (width+2)*(height*2).");
+				}
 				for (int x = 0; x < grid_width; x++) {
-					grid[y][x] = initial_state[y][x];
+					potentials[y * grid_width + x] = initial_state[y][x].potential;
+					lock[y * grid_width + x] = initial_state[y][x].lock ? 1 : 0;
 				}
 			}
 		}
 
+		DielectricBreakModel::DielectricBreakModel(int width, int height, const std::vector<double>& potential, const std::vector<uint8_t>& lock,
+			double min_guarantee, double eta, DBMSolver solver, int num_threads, bool incremental)
+			: init(false), width(width), height(height), min_guarantee(min_guarantee), eta(eta), solver(solver),
+			grid_width(width + 2), grid_height(height + 2), potentials(potential), lock(lock), num_threads(num_threads),
+			last_stats({ 0, 0.0, false }), denominator(0.0), incremental(incremental), drift(0.0), selection_valid(false)
+		{
+			const size_t size = (size_t)grid_width * grid_height;
+			if (width <= 0 || height <= 0 || potentials.size() != size || this->lock.size() != size) {
+				throw std::runtime_error("the size of potential and lock must be (width+2)*(height+2).");
+			}
+		}
+
 		bool DielectricBreakModel::test(int x, int y)
 		{
 			double ec = min_guarantee;
-			double threshold = ec + ((double)rand() / RAND_MAX) * (1.0 - ec);
-			double p = grid[y + 1][x + 1].potential;
+			double threshold = ec + rng.uniform() * (1.0 - ec);
+			double p = potentials[(y + 1) * grid_width + x + 1];
 			if (eta == 1.0) {
 				double prob = p / denominator;
 				return prob >= threshold;
@@ -49,29 +71,66 @@ namespace lichtenberg {
 			}
 		}
 
+		bool DielectricBreakModel::select(int& x, int& y)
+		{
+			if (candidates.empty()) return false;
+			if (!selection_valid) {
+				//the incremental mode adds candidates to the free slots
+				selection.build(candidate_weight, incremental ? (size_t)width * height : 0);
+				selection_valid = true;
+			}
+			size_t slot;
+			const double total = selection.total();
+			if (total > 0.0) {
+				slot = selection.find(rng.uniform() * total);
+			}
+			else {
+				//all weights are 0, every candidate is equally likely
+				slot = std::min((size_t)(rng.uniform() * candidates.size()), candidates.size() - 1);
+			}
+			x = candidates[slot] % width;
+			y = candidates[slot] / width;
+			return true;
+		}
+
 		void DielectricBreakModel::update(const CellList2D& cells, const std::vector<Point>& broken_list)
 		{
 			if (!init) {
 				init_grid(cells);
+				update_grid(cells, broken_list);
+				solve_laplace(cells);
+				if (incremental) {
+					init_candidates(cells);
+				}
+				else {
+					denominator = calc_denominator(cells, broken_list);
+				}
 				init = true;
+				return;
 			}
 			update_grid(cells, broken_list);
+			if (incremental) {
+				update_candidates(cells);
+				solve_incremental(cells);
+				return;
+			}
 			// solve laplace equation
 			solve_laplace(cells);
 			// calc denominator of probability
 			denominator = calc_denominator(cells, broken_list);
 		}
 
+		//broken cells are the conductor(potential 0)
 		void DielectricBreakModel::init_grid(const CellList2D& cells)
 		{
 			const int w = width;
 			const int h = height;
 			for (int y = 0; y < h; y++) {
 				for (int x = 0; x < w; x++) {
-					auto c = grid[y + 1][x + 1];
-					if (cells.get_broken(x, y)) {
-						c.potential = DBM_POTENTIAL_VOID;
-						c.lock = true;
+					if (cells.get_broken(x, y) && !cells.get_insulated(x, y)) {
+						const int index = (y + 1) * grid_width + x + 1;
+						potentials[index] = DBM_POTENTIAL_VOID;
+						lock[index] = 1;
 					}
 				}
 			}
@@ -80,14 +139,16 @@ namespace lichtenberg {
 		bool DielectricBreakModel::update_grid(const CellList2D& cells, const std::vector<Point>& broken_list)
 		{
 			bool changed = false;
+			new_locked.clear();
 			for (const Point& p : broken_list) {
 				auto [x, y] = p;
 				bool b = cells.get_broken(x, y);
-				auto& c = grid[y + 1][x + 1];
-				if (c.lock != b) {
+				const int index = (y + 1) * grid_width + x + 1;
+				if ((lock[index] != 0) != b) {
 					changed = true;
-					c.lock = b;
-					c.potential = DBM_POTENTIAL_VOID;
+					lock[index] = b ? 1 : 0;
+					potentials[index] = DBM_POTENTIAL_VOID;
+					if (b) new_locked.push_back(index);
 				}
 			}
 			return changed;
@@ -95,35 +156,23 @@ namespace lichtenberg {
 
 		bool DielectricBreakModel::solve_laplace(const CellList2D& /*cells*/)
 		{
-			const int max_loop = 10000;
-			const double eps = 1.0e-3;
-			const int w = width;
-			const int h = height;
+			const int max_loop = DBM_MAX_LOOP;
+			const int max_cycle = DBM_MAX_CYCLE;
+			const double eps = DBM_EPS;
 
-			//Gauss-Seidel method
-			for (int i = 0; i < max_loop; i++) {
-				double err = 0.0;
-				for (int y = 1; y <= h; y++) {
-					auto& row = grid[y];
-					for (int x = 1; x <= w; x++) {
-						auto& c = row[x];
-						if (!c.lock) {
-							double old_potential = c.potential;
-							const auto& ym = grid[y - 1];
-							const auto& yc = grid[y];
-							const auto& yp = grid[y + 1];
-							double new_potential = (yc[x - 1].potential + yc[x + 1].potential + ym[x].potential + yp[x].potential) / 4;
-							double diff = new_potential - old_potential;
-							c.potential = old_potential + 1.9 * diff;  //SOR method
-							err += fabs(diff);
-						}
-					}
-				}
-				if (err < eps) {
-					return true;
-				}
+			if (solver != DBMSolver::SOR && !pool && num_threads != 1) {
+				pool = std::make_unique<util::ThreadPool>(num_threads);
+			}
+			if (solver == DBMSolver::Multigrid) {
+				last_stats = multigrid.solve(potentials, lock, grid_width, grid_height, eps, max_cycle, pool.get());
 			}
-			return false;
+			else if (solver == DBMSolver::RedBlackSOR) {
+				last_stats = util::solve_laplace_redblack(potentials, lock, grid_width, grid_height, 1.9, eps, max_loop, pool.get());
+			}
+			else {
+				last_stats = util::solve_laplace_sor(potentials, lock, grid_width, grid_height, 1.9, eps, max_loop);
+			}
+			return last_stats.converged;
 		}
 
 		double DielectricBreakModel::calc_denominator(const CellList2D& cells, const std::vector<Point>& broken_list)
@@ -144,28 +193,218 @@ namespace lichtenberg {
 					target_set.insert(Point(x, y + 1));
 				}
 			}
+			//keep the candidates for select()
+			candidates.clear();
+			candidate_weight.clear();
+			selection_valid = false;
 			double denom = 0.0;
-			if (eta == 1.0) {
-				for (const auto& c : target_set) {
-					auto [x, y] = c;
-					double p = grid[y + 1][x + 1].potential;
-					denom += p;
+			for (const auto& c : target_set) {
+				auto [x, y] = c;
+				double w = weight(potentials[(y + 1) * grid_width + x + 1]);
+				candidates.push_back(y * width + x);
+				candidate_weight.push_back(w);
+				denom += w;
+			}
+
+			return denom;
+		}
+
+		double DielectricBreakModel::weight(double potential) const
+		{
+			return eta == 1.0 ? potential : std::pow(potential, eta);
+		}
+
+		//relaxes a window around the newly locked cells, the window is enlarged
+		//while the residual just outside of it is over the tolerance.
+		//the whole grid is solved when the window covers it, or the residual left outside
+		//of the windows is accumulated over the tolerance.
+		void DielectricBreakModel::solve_incremental(const CellList2D& cells)
+		{
+			if (new_locked.empty()) {
+				last_stats = { 0, 0.0, true };
+				return;
+			}
+			int min_x = grid_width, min_y = grid_height, max_x = 0, max_y = 0;
+			for (int index : new_locked) {
+				const int x = index % grid_width;
+				const int y = index / grid_width;
+				min_x = std::min(min_x, x);
+				min_y = std::min(min_y, y);
+				max_x = std::max(max_x, x);
+				max_y = std::max(max_y, y);
+			}
+
+			util::LaplaceStats stats = { 0, 0.0, false };
+			int margin = DBM_WINDOW_MARGIN;
+			while (true) {
+				const int x0 = std::max(1, min_x - margin);
+				const int y0 = std::max(1, min_y - margin);
+				const int x1 = std::min(grid_width - 1, max_x + margin + 1);
+				const int y1 = std::min(grid_height - 1, max_y + margin + 1);
+				//a large window is not cheaper than the whole grid
+				if ((double)(x1 - x0) * (y1 - y0) * 4 > (double)width * height) {
+					break;
+				}
+				//the optimal factor of SOR for the size of the window
+				const double n = std::max(x1 - x0, y1 - y0) + 1;
+				const double omega = 2.0 / (1.0 + std::sin(std::acos(-1.0) / n));
+				util::LaplaceStats s = util::solve_laplace_sor_window(potentials, lock, grid_width,
+					x0, y0, x1, y1, omega, DBM_EPS, DBM_MAX_LOOP);
+				stats.iterations += s.iterations;
+				stats.residual = s.residual;
+				double ring = util::laplace_ring_residual(potentials, lock, grid_width, grid_height, x0, y0, x1, y1);
+				if (ring < DBM_WINDOW_EPS) {
+					if (drift + ring >= DBM_EPS) break;
+					drift += ring;
+					stats.converged = s.converged;
+					last_stats = stats;
+					update_weights(x0 - 1, y0 - 1, x1 - 1, y1 - 1);
+					return;
 				}
+				margin *= 2;
 			}
-			else {
-				for (const auto& c : target_set) {
-					auto [x, y] = c;
-					double p = grid[y + 1][x + 1].potential;
-					denom += std::pow(p, eta);
+
+			//full solve
+			solve_laplace(cells);
+			last_stats.iterations += stats.iterations;
+			drift = 0.0;
+			update_weights(0, 0, width, height);
+		}
+
+		//the cells of [x0, x1) x [y0, y1) in cell coordinates
+		void DielectricBreakModel::update_weights(int x0, int y0, int x1, int y1)
+		{
+			x0 = std::max(x0, 0);
+			y0 = std::max(y0, 0);
+			x1 = std::min(x1, width);
+			y1 = std::min(y1, height);
+			if (x0 == 0 && y0 == 0 && x1 == width && y1 == height) {
+				//recalculate the sum to drop the rounding errors
+				double denom = 0.0;
+				for (size_t slot = 0; slot < candidates.size(); slot++) {
+					const int x = candidates[slot] % width;
+					const int y = candidates[slot] / width;
+					candidate_weight[slot] = weight(potentials[(y + 1) * grid_width + x + 1]);
+					denom += candidate_weight[slot];
+				}
+				denominator = denom;
+				selection_valid = false;
+				return;
+			}
+			for (int y = y0; y < y1; y++) {
+				for (int x = x0; x < x1; x++) {
+					const int slot = candidate_slot[y * width + x];
+					if (slot < 0) continue;
+					double w = weight(potentials[(y + 1) * grid_width + x + 1]);
+					denominator += w - candidate_weight[slot];
+					candidate_weight[slot] = w;
+					if (selection_valid) selection.set(slot, w);
 				}
 			}
+		}
 
-			return denom;
+		void DielectricBreakModel::add_candidate(int index)
+		{
+			if (candidate_slot[index] >= 0) return;
+			const int x = index % width;
+			const int y = index / width;
+			double w = weight(potentials[(y + 1) * grid_width + x + 1]);
+			candidate_slot[index] = (int)candidates.size();
+			candidates.push_back(index);
+			candidate_weight.push_back(w);
+			denominator += w;
+			if (selection_valid) selection.set(candidates.size() - 1, w);
+		}
+
+		void DielectricBreakModel::remove_candidate(int index)
+		{
+			const int slot = candidate_slot[index];
+			if (slot < 0) return;
+			denominator -= candidate_weight[slot];
+			//move the last one into the slot
+			const int last = candidates.back();
+			candidates[slot] = last;
+			candidate_weight[slot] = candidate_weight.back();
+			candidate_slot[last] = slot;
+			candidates.pop_back();
+			candidate_weight.pop_back();
+			candidate_slot[index] = -1;
+			if (selection_valid) {
+				selection.set(candidates.size(), 0.0);
+				if ((size_t)slot < candidates.size()) selection.set(slot, candidate_weight[slot]);
+			}
+		}
+
+		//the candidates are the unbroken cells next to the broken cells
+		void DielectricBreakModel::init_candidates(const CellList2D& cells)
+		{
+			candidate_slot.assign((size_t)width * height, -1);
+			candidates.clear();
+			candidate_weight.clear();
+			selection_valid = false;
+			for (int y = 0; y < height; y++) {
+				for (int x = 0; x < width; x++) {
+					if (cells.get_broken(x, y)) continue;
+					bool next = (x > 0 && cells.get_broken(x - 1, y) && !cells.get_insulated(x - 1, y))
+						|| (x < width - 1 && cells.get_broken(x + 1, y) && !cells.get_insulated(x + 1, y))
+						|| (y > 0 && cells.get_broken(x, y - 1) && !cells.get_insulated(x, y - 1))
+						|| (y < height - 1 && cells.get_broken(x, y + 1) && !cells.get_insulated(x, y + 1));
+					if (next) {
+						add_candidate(y * width + x);
+					}
+				}
+			}
+			drift = 0.0;
+			update_weights(0, 0, width, height);
+		}
+
+		void DielectricBreakModel::update_candidates(const CellList2D& cells)
+		{
+			for (int index : new_locked) {
+				const int x = index % grid_width - 1;
+				const int y = index / grid_width - 1;
+				remove_candidate(y * width + x);
+				if (x > 0 && !cells.get_broken(x - 1, y)) add_candidate(y * width + x - 1);
+				if (x < width - 1 && !cells.get_broken(x + 1, y)) add_candidate(y * width + x + 1);
+				if (y > 0 && !cells.get_broken(x, y - 1)) add_candidate((y - 1) * width + x);
+				if (y < height - 1 && !cells.get_broken(x, y + 1)) add_candidate((y + 1) * width + x);
+			}
 		}
 
 		double DielectricBreakModel::get_potential(int x, int y) const
 		{
-			return grid[y][x].potential;
+			return potentials[y * grid_width + x];
+		}
+
+		const std::vector<double>& DielectricBreakModel::get_potentials() const
+		{
+			return potentials;
+		}
+
+		const std::vector<uint8_t>& DielectricBreakModel::get_lock() const
+		{
+			return lock;
+		}
+
+		int DielectricBreakModel::get_last_iterations() const
+		{
+			return last_stats.iterations;
+		}
+
+		double DielectricBreakModel::get_last_residual() const
+		{
+			return last_stats.residual;
+		}
+
+		//the field includes the border cells
+		std::tuple<int, int> DielectricBreakModel::field_size() const
+		{
+			return { grid_width, grid_height };
+		}
+
+		void DielectricBreakModel::copy_field(float* dst) const
+		{
+			std::transform(potentials.begin(), potentials.end(), dst, [](double p) { return (float)p; });
 		}
 	}
 }
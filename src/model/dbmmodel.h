@@ -2,6 +2,8 @@
 #include "model.h"
 #include <vector>
 #include <memory>
+#include "../util/laplace.h"
+#include "../util/fenwick.h"
 
 /*
 	An implementation of DBM(Dielectric Break Model)
@@ -25,16 +27,32 @@ namespace lichtenberg {
 		};
 		typedef std::vector<std::vector<DBMCell>> DBMGrid;
 
+		typedef util::LaplaceSolver DBMSolver;
+
 		class DielectricBreakModel : public BreakModel {
 		public:
 			/* the size of initial_state must be (width+2)*(height+2) */
-			DielectricBreakModel(int width, int height, const DBMGrid& initial_state, double min_guarantee = 0.0, double eta = 1.0);
+			DielectricBreakModel(int width, int height, const DBMGrid& initial_state, double min_guarantee = 0.0, double eta = 1.0,
+				DBMSolver solver = DBMSolver::SOR, int num_threads = 1, bool incremental = false);
+			/* potential and lock are (width+2)*(height+2) arrays in row-major order */
+			DielectricBreakModel(int width, int height, const std::vector<double>& potential, const std::vector<uint8_t>& lock,
+				double min_guarantee = 0.0, double eta = 1.0,
+				DBMSolver solver = DBMSolver::SOR, int num_threads = 1, bool incremental = false);
 			DielectricBreakModel(const DielectricBreakModel&) = delete;
 			DielectricBreakModel& operator =(const DielectricBreakModel&) = delete;
 
 			bool test(int x, int y);
 			void update(const CellList2D& cells, const std::vector<Point>& broken_list);
+			bool select(int& x, int& y);
 			double get_potential(int x, int y) const;
+			//the whole grid including the border, (width+2)*(height+2) in row-major order
+			const std::vector<double>& get_potentials() const;
+			const std::vector<uint8_t>& get_lock() const;
+			//statistics of the last solve
+			int get_last_iterations() const;
+			double get_last_residual() const;
+			std::tuple<int, int> field_size() const;
+			void copy_field(float* dst) const;
 
 		private:
 			int width;
@@ -42,12 +60,42 @@ namespace lichtenberg {
 			bool init;
 			double min_guarantee;
 			double eta;
-			DBMGrid grid;
+			DBMSolver solver;
+			int grid_width;
+			int grid_height;
+			std::vector<double> potentials;  //(width+2)*(height+2), row-major
+			std::vector<uint8_t> lock;
+			util::MultigridSolver multigrid;
+			int num_threads;  //for Multigrid and RedBlackSOR, 0 means the number of hardware threads
+			std::unique_ptr<util::ThreadPool> pool;
+			util::LaplaceStats last_stats;
 			double denominator;
 			void init_grid(const CellList2D& cells);
 			bool update_grid(const CellList2D& cells, const std::vector<Point>& broken_list);
 			bool solve_laplace(const CellList2D& cells);
 			double calc_denominator(const CellList2D& cells, const std::vector<Point>& broken_list);
+
+			//incremental mode
+			//relaxes only a window around the newly locked cells, and keeps the candidates of breakdown
+			//(unbroken cells next to the broken cells) and their weights between updates
+			bool incremental;
+			std::vector<int> new_locked;  //grid indices locked in this update
+			std::vector<int> candidate_slot;  //index in `candidates` of each cell, -1 if not a candidate
+			std::vector<int> candidates;  //cell indices(y * width + x), also filled by calc_denominator()
+			std::vector<double> candidate_weight;
+			double drift;  //residual left outside of the windows since the last full solve
+			void solve_incremental(const CellList2D& cells);
+			void init_candidates(const CellList2D& cells);
+			void update_candidates(const CellList2D& cells);
+			void add_candidate(int index);
+			void remove_candidate(int index);
+			void update_weights(int x0, int y0, int x1, int y1);
+			double weight(double potential) const;
+
+			//weights of the candidates for select()
+			//built on the first select() after an update, and kept up to date by the incremental mode
+			util::FenwickTree selection;
+			bool selection_valid;
 		};
 	}
 }
\ No newline at end of file
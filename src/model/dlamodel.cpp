@@ -10,22 +10,22 @@ namespace lichtenberg {
 		{
 		}
 
-		static double random()
-		{
-			return (double)rand() / RAND_MAX;
-		}
-
 		DLABreakModel::DLABreakModel(int width, int height, int num_particle)
-			: width(width), height(height)
+			: width(width), height(height), num_particle(num_particle), init(false)
 		{
 			grid.resize(height);
 			for (int y = 0; y < height; y++) {
 				grid[y].resize(width, nullptr);
 			}
+		}
+
+		//particles are placed on the first update, so set_seed() decides the placement too
+		void DLABreakModel::init_particles()
+		{
 			particles.reserve(num_particle);
 			for (int i = 0; i < num_particle; i++) {
-				double x = random() * (width - 1);
-				double y = random() * (height - 1);
+				double x = rng.uniform() * (width - 1);
+				double y = rng.uniform() * (height - 1);
 				//create particles
 				DLAParticle particle(x, y);
 				particles.push_back(std::move(particle));
@@ -54,14 +54,18 @@ namespace lichtenberg {
 
 		void DLABreakModel::update(const CellList2D& /*cells*/, const std::vector<Point>& /*broken_list*/)
 		{
+			if (!init) {
+				init_particles();
+				init = true;
+			}
 			const double pi = 3.141592653589793;
 			for (DLAParticle& p : particles) {
 				if (!p.live) continue;
 				auto& [x, y] = p.position;
 				int old_ix = int(x + 0.5);
 				int old_iy = int(y + 0.5);
-				double r = 1.0 * random();
-				double t = random() * 2 * pi;
+				double r = 1.0 * rng.uniform();
+				double t = rng.uniform() * 2 * pi;
 				double dx = r * std::cos(t);
 				double dy = r * std::sin(t);
 				double new_x = x + dx;
@@ -25,6 +25,9 @@ namespace lichtenberg {
 		private:
 			int width;
 			int height;
+			int num_particle;
+			bool init;
+			void init_particles();
 
 			typedef std::tuple<double, double> PointF;
 
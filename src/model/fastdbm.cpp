@@ -4,72 +4,132 @@
 #include <memory>
 #include <cmath>
 #include <stdexcept>
+#include <algorithm>
 
 
 namespace lichtenberg {
 	namespace model {
+		static const int FDBM_BLOCK_SIZE = 1024;  //candidates per block of the parallel loops
 
-		FastDBM::FDBMCell::FDBMCell(double potential)
-			: potential(potential)
+		//the vector is moved into a buffer shared with the model
+		static std::shared_ptr<const float> share_bias(int width, int height, const std::vector<float>& bias_array)
 		{
+			if (bias_array.empty()) return nullptr;
+			if (bias_array.size() != (size_t)width * height) {
+				throw std::runtime_error("The size of bias_array must be width*height.");
+			}
+			auto buffer = std::make_shared<std::vector<float>>(bias_array);
+			return std::shared_ptr<const float>(buffer, buffer->data());
 		}
 
-		FastDBM::FastDBM(int width, int height, double min_guarantee, double eta, const std::vector<float>& bias_array)
+		FastDBM::FastDBM(int width, int height, double min_guarantee, double eta, const std::vector<float>& bias_array,
+			double theta, int num_threads)
+			: FastDBM(width, height, min_guarantee, eta, share_bias(width, height, bias_array), theta, num_threads)
+		{
+		}
+
+		FastDBM::FastDBM(int width, int height, double min_guarantee, double eta, std::shared_ptr<const float> bias,
+			double theta, int num_threads)
 			: init(false), width(width), height(height), min_guarantee(min_guarantee), eta(eta),
-			min_potential(0.0), max_potential(0.0), denominator(0.0), bias(nullptr)
+			min_potential(0.0), max_potential(0.0), denominator(0.0), bias(bias), serial(0), selection_dirty(true),
+			num_threads(num_threads), theta(theta)
 		{
-			grid.resize(height);
-			for (int y = 0; y < height; y++) {
-				grid[y].resize(width);
+			if (theta < 0.0) {
+				throw std::invalid_argument("theta must not be negative.");
 			}
-
-			if (!bias_array.empty()) {
-				if (bias_array.size() != (size_t)width * height) {
-					throw std::runtime_error("The size of bias_array must be width*height.");
-				}
-				bias = BiasGridPtr(new BiasGrid);
-				for (size_t y = 0; y < height; y++) {
-					const float* src_row = &bias_array[0] + y * (size_t)height;
-					std::vector<float> dst_row(src_row, src_row + width);
-					bias->push_back(dst_row);
+			if (theta > 0.0) {
+				int w = width;
+				int h = height;
+				while (true) {
+					charge_tree.push_back({ w, h,
+						std::vector<int>((size_t)w * h, 0),
+						std::vector<double>((size_t)w * h, 0.0),
+						std::vector<double>((size_t)w * h, 0.0) });
+					if (w == 1 && h == 1) break;
+					w = (w + 1) / 2;
+					h = (h + 1) / 2;
 				}
 			}
+
+			const size_t size = (size_t)width * height;
+			potential.assign(size, FDBM_INITIAL_POTENTIAL);
+			broken.assign(size, 0);
+			candidate_slot.assign(size, -1);
+			visited.assign(size, 0);
 		}
 		bool FastDBM::test(int x, int y)
 		{
 			double ec = min_guarantee;
-			double threshold = ec + ((double)rand() / RAND_MAX) * (1.0 - ec);
-			double p = grid[y][x].potential;
-			double numerator = p;
-			if (max_potential != min_potential) {
-				numerator = (p - min_potential) / (max_potential - min_potential);
+			double threshold = ec + rng.uniform() * (1.0 - ec);
+			const int index = y * width + x;
+			const int slot = candidate_slot[index];
+			double weight;
+			if (slot >= 0) {
+				weight = candidate_weight[slot];
+			}
+			else {
+				double p = potential[index];
+				double numerator = p;
+				if (max_potential != min_potential) {
+					numerator = (p - min_potential) / (max_potential - min_potential);
+				}
+				weight = std::pow(numerator, eta);
 			}
-			double prob = std::pow(numerator, eta) / denominator;
+			double prob = weight / denominator;
 			return prob >= threshold;
 		}
+
+		bool FastDBM::select(int& x, int& y)
+		{
+			if (candidates.empty()) return false;
+			if (selection_dirty) {
+				selection.build(candidate_weight);
+				selection_dirty = false;
+			}
+			size_t slot;
+			const double total = selection.total();
+			if (total > 0.0) {
+				slot = selection.find(rng.uniform() * total);
+			}
+			else {
+				//all weights are 0, every candidate is equally likely
+				slot = std::min((size_t)(rng.uniform() * candidates.size()), candidates.size() - 1);
+			}
+			x = candidates[slot] % width;
+			y = candidates[slot] / width;
+			return true;
+		}
 		void FastDBM::update(const CellList2D& cells, const std::vector<Point>& broken_list)
 		{
 			//update broken cells
-			std::vector<Point> new_broken_cells;
+			new_broken_cells.clear();
 			for (const Point& p : broken_list) {
-				if (broken_set.count(p) == 0) {
-					//add new broken cell to the set
-					broken_set.insert(p);
-					new_broken_cells.push_back(p);
+				auto [x, y] = p;
+				const int index = y * width + x;
+				if (!broken[index]) {
+					//add new point charge
+					broken[index] = 1;
+					new_broken_cells.push_back(index);
+					if (theta > 0.0) add_charge(x, y);
 				}
 			}
+			merge_charges();
 
 			//get candidate cells
-			std::set<Point> old_candidates;
-			std::set<Point> new_candidates;
+			//cells already in the list and cells coming back with a potential are old candidates
+			serial++;
+			new_candidates.clear();
 			auto dispatch = [&](int ix, int iy) {
-				if (!cells.get_broken(ix, iy)) {
-					if (grid[iy][ix].potential == FDBM_INITIAL_POTENTIAL) {
-						new_candidates.insert(Point(ix, iy));
-					}
-					else {
-						old_candidates.insert(Point(ix, iy));
-					}
+				if (cells.get_broken(ix, iy)) return;
+				const int index = iy * width + ix;
+				if (visited[index] == serial) return;
+				visited[index] = serial;
+				if (candidate_slot[index] >= 0) return;
+				if (potential[index] == FDBM_INITIAL_POTENTIAL) {
+					new_candidates.push_back(index);
+				}
+				else {
+					add_candidate(index);
 				}
 			};
 			for (const Point& p : broken_list) {
@@ -79,90 +139,252 @@ namespace lichtenberg {
 				if (y > 0) dispatch(x, y - 1);
 				if (y < height - 1) dispatch(x, y + 1);
 			}
+			//drop the candidates which were not found(broken, or not next to the given cells anymore)
+			for (int i = (int)candidates.size() - 1; i >= 0; i--) {
+				const int index = candidates[i];
+				if (visited[index] != serial) {
+					remove_candidate(index);
+				}
+			}
 
 			//update potential at all old candidate sites
-			for (const Point& p : new_broken_cells) {
-				update_potentials(p, old_candidates);
-			}
+			update_potentials();
 			//initialize potential at all new candidate sites
-			for (const Point& p : new_candidates) {
-				initialize_potentials(p);
+			const int num_new = (int)new_candidates.size();
+			auto initialize = [&](int begin, int end) {
+				for (int i = begin; i < end; i++) {
+					initialize_potentials(new_candidates[i]);
+				}
+			};
+			if (pool && pool->size() > 1 && num_new > 1) {
+				pool->parallel_for(num_new, initialize);
+			}
+			else {
+				initialize(0, num_new);
+			}
+			for (int index : new_candidates) {
+				add_candidate(index);
 			}
-			//merge cancidiate sites
-			auto& candidates = old_candidates;
-			candidates.insert(new_candidates.begin(), new_candidates.end());
+			sort_candidates();
 
 			//calculate some parts of probability expression
-			update_minmax(candidates);
-			update_denominator(candidates);
+			update_minmax();
+			update_denominator();
+		}
+
+		//runs func(block, begin, end) for the blocks of [0, n)
+		template <typename F>
+		void FastDBM::for_blocks(int n, const F& func)
+		{
+			const int num_blocks = (n + FDBM_BLOCK_SIZE - 1) / FDBM_BLOCK_SIZE;
+			auto run = [&](int b0, int b1) {
+				for (int b = b0; b < b1; b++) {
+					func(b, b * FDBM_BLOCK_SIZE, std::min(n, (b + 1) * FDBM_BLOCK_SIZE));
+				}
+			};
+			if (num_blocks > 1 && num_threads != 1 && !pool) {
+				pool = std::make_unique<util::ThreadPool>(num_threads);
+			}
+			if (num_blocks > 1 && pool && pool->size() > 1) {
+				pool->parallel_for(num_blocks, run);
+			}
+			else {
+				run(0, num_blocks);
+			}
 		}
 
-		static double distance(const Point& p1, const Point& p2)
+		void FastDBM::add_candidate(int index)
 		{
-			auto [x1, y1] = p1;
-			auto [x2, y2] = p2;
-			double dx = (double)(x2 - x1);
-			double dy = (double)(y2 - y1);
-			return std::sqrt(dx * dx + dy * dy);
+			added_candidates.push_back((index % width) * height + index / width);
+			candidate_slot[index] = (int)candidates.size();
+			candidates.push_back(index);
+			candidate_x.push_back((double)(index % width));
+			candidate_y.push_back((double)(index / width));
 		}
 
-		double FastDBM::calc_bias_factor(const Point& position)
+		void FastDBM::remove_candidate(int index)
 		{
-			if (bias) {
-				auto [x, y] = position;
-				return (*bias)[y][x];
+			//move the last one into the slot
+			const int slot = candidate_slot[index];
+			const int last = candidates.back();
+			candidates[slot] = last;
+			candidate_x[slot] = candidate_x.back();
+			candidate_y[slot] = candidate_y.back();
+			candidate_slot[last] = slot;
+			candidates.pop_back();
+			candidate_x.pop_back();
+			candidate_y.pop_back();
+			candidate_slot[index] = -1;
+		}
+
+		//the charges are kept in (x, y) order, the order of the std::set used before,
+		//so the potentials are summed in the same order
+		void FastDBM::merge_charges()
+		{
+			if (new_broken_cells.empty()) return;
+			new_charges.clear();
+			for (int index : new_broken_cells) {
+				new_charges.push_back((index % width) * height + index / width);
 			}
-			else {
-				return 1.0;
+			std::sort(new_charges.begin(), new_charges.end());
+			//merge from the back
+			size_t i = charge_x.size();
+			size_t j = new_charges.size();
+			size_t k = i + j;
+			charge_x.resize(k);
+			charge_y.resize(k);
+			while (j > 0) {
+				const double x = (double)(new_charges[j - 1] / height);
+				const double y = (double)(new_charges[j - 1] % height);
+				k--;
+				if (i > 0 && (charge_x[i - 1] > x || (charge_x[i - 1] == x && charge_y[i - 1] > y))) {
+					i--;
+					charge_x[k] = charge_x[i];
+					charge_y[k] = charge_y[i];
+				}
+				else {
+					j--;
+					charge_x[k] = x;
+					charge_y[k] = y;
+				}
 			}
 		}
 
-		double FastDBM::calc_potential(const Point& candidate_site, const Point& point_charge)
+		//merges the candidates added in this update into candidate_order, and drops the removed ones
+		void FastDBM::sort_candidates()
 		{
-			//expression (9)
-			const double R1 = 0.5;
-			const double d = distance(candidate_site, point_charge);
-			const double bias_factor = calc_bias_factor(candidate_site);
-			const double potential = (1.0 - R1 / d);
-			return potential * bias_factor;
+			auto removed = [&](int key) { return candidate_slot[(key % height) * width + key / height] < 0; };
+			candidate_order.erase(std::remove_if(candidate_order.begin(), candidate_order.end(), removed), candidate_order.end());
+			std::sort(added_candidates.begin(), added_candidates.end());
+			const size_t middle = candidate_order.size();
+			candidate_order.insert(candidate_order.end(), added_candidates.begin(), added_candidates.end());
+			std::inplace_merge(candidate_order.begin(), candidate_order.begin() + middle, candidate_order.end());
+			added_candidates.clear();
+		}
+
+		double FastDBM::calc_bias_factor(int index) const
+		{
+			return bias ? (double)bias.get()[index] : 1.0;
 		}
 
-		void FastDBM::initialize_potentials(const Point candidate_site)
+		void FastDBM::initialize_potentials(int candidate)
 		{
 			//expression (10)
-			auto [x, y] = candidate_site;
-			for (const Point& p : broken_set) {
-				grid[y][x].potential += calc_potential(candidate_site, p);
+			const double R1 = 0.5;
+			const double cx = (double)(candidate % width);
+			const double cy = (double)(candidate / width);
+			const double bias_factor = calc_bias_factor(candidate);
+			if (theta > 0.0) {
+				//sum of (1 - R1 / d) * bias = (N - R1 * sum(1 / d)) * bias
+				const double n = (double)charge_x.size();
+				potential[candidate] += (n - R1 * sum_inverse_distance(candidate % width, candidate / width)) * bias_factor;
+				return;
+			}
+			double p = potential[candidate];
+			const size_t n = charge_x.size();
+			for (size_t i = 0; i < n; i++) {
+				const double dx = charge_x[i] - cx;
+				const double dy = charge_y[i] - cy;
+				p += (1.0 - R1 / std::sqrt(dx * dx + dy * dy)) * bias_factor;
+			}
+			potential[candidate] = p;
+		}
+
+		void FastDBM::add_charge(int x, int y)
+		{
+			const double px = (double)x;
+			const double py = (double)y;
+			for (auto& level : charge_tree) {
+				const int index = y * level.width + x;
+				level.count[index]++;
+				level.sum_x[index] += px;
+				level.sum_y[index] += py;
+				x /= 2;
+				y /= 2;
+			}
+		}
+
+		//sum of 1/d from the candidate to all charges
+		//a block of the size s is treated as one charge at its center of mass if s/d < theta
+		double FastDBM::sum_inverse_distance(int cx, int cy) const
+		{
+			double sum = 0.0;
+			struct Node { int level, x, y; };
+			std::vector<Node> stack;
+			stack.push_back({ (int)charge_tree.size() - 1, 0, 0 });
+			while (!stack.empty()) {
+				Node node = stack.back();
+				stack.pop_back();
+				const ChargeLevel& level = charge_tree[node.level];
+				const int index = node.y * level.width + node.x;
+				const int n = level.count[index];
+				if (n == 0) continue;
+				const double dx = level.sum_x[index] / n - cx;
+				const double dy = level.sum_y[index] / n - cy;
+				const double d = std::sqrt(dx * dx + dy * dy);
+				const double size = (double)(1 << node.level);
+				if (node.level == 0 || size < theta * d) {
+					sum += n / d;
+					continue;
+				}
+				const ChargeLevel& child = charge_tree[node.level - 1];
+				for (int iy = node.y * 2; iy < std::min(node.y * 2 + 2, child.height); iy++) {
+					for (int ix = node.x * 2; ix < std::min(node.x * 2 + 2, child.width); ix++) {
+						stack.push_back({ node.level - 1, ix, iy });
+					}
+				}
 			}
+			return sum;
 		}
 
-		void FastDBM::update_potentials(const Point& broken_cell, const std::set<Point>& candidate_set)
+		void FastDBM::update_potentials()
 		{
 			//expression (11)
+			if (new_broken_cells.empty()) return;
 			const double R1 = 0.5;
-			for (const Point& p : candidate_set) {
-				auto [x, y] = p;
-				grid[y][x].potential += calc_potential(p, broken_cell);
-			}
+			for_blocks((int)candidates.size(), [&](int, int begin, int end) {
+				for (int charge : new_broken_cells) {
+					const double qx = (double)(charge % width);
+					const double qy = (double)(charge / width);
+					for (int slot = begin; slot < end; slot++) {
+						const double dx = qx - candidate_x[slot];
+						const double dy = qy - candidate_y[slot];
+						const int index = candidates[slot];
+						potential[index] += (1.0 - R1 / std::sqrt(dx * dx + dy * dy)) * calc_bias_factor(index);
+					}
+				}
+			});
 		}
-		void FastDBM::update_minmax(const std::set<Point>& candidate_set)
+		void FastDBM::update_minmax()
 		{
 			//get maximum/minimum potential
+			const int n = (int)candidates.size();
+			const int num_blocks = (n + FDBM_BLOCK_SIZE - 1) / FDBM_BLOCK_SIZE;
+			block_min.assign(num_blocks, 1.0e10);
+			block_max.assign(num_blocks, 0.0);
+			for_blocks(n, [&](int block, int begin, int end) {
+				double max_p = 0.0;
+				double min_p = 1.0e10;
+				for (int slot = begin; slot < end; slot++) {
+					double p = potential[candidates[slot]];
+					if (p > max_p) max_p = p;
+					if (p < min_p) min_p = p;
+				}
+				block_min[block] = min_p;
+				block_max[block] = max_p;
+			});
 			double max_p = 0.0;
 			double min_p = 1.0e10;
-			for (const Point& c : candidate_set) {
-				auto [x, y] = c;
-				double p = grid[y][x].potential;
-				if (p > max_p) max_p = p;
-				if (p < min_p) min_p = p;
+			for (int block = 0; block < num_blocks; block++) {
+				max_p = std::max(max_p, block_max[block]);
+				min_p = std::min(min_p, block_min[block]);
 			}
 			min_potential = min_p;
 			max_potential = max_p;
 		}
-		void FastDBM::update_denominator(const std::set<Point>& candidate_set)
+		void FastDBM::update_denominator()
 		{
 			//expression (12),(13)
-			double denom = 0.0;
 			double min_p = min_potential;
 			double D = max_potential - min_potential;
 			if (D == 0.0) {
@@ -170,13 +392,33 @@ namespace lichtenberg {
 				D = 1.0;
 				min_p = 0.0;
 			}
-			for (const auto& c : candidate_set) {
-				auto [x, y] = c;
-				double p = grid[y][x].potential;
-				double t = (p - min_p) / D;
-				denom += std::pow(t, eta);
+			const int n = (int)candidates.size();
+			candidate_weight.resize(n);
+			for_blocks(n, [&](int, int begin, int end) {
+				for (int slot = begin; slot < end; slot++) {
+					double t = (potential[candidates[slot]] - min_p) / D;
+					candidate_weight[slot] = std::pow(t, eta);
+				}
+			});
+			//sum in (x, y) order like the std::set used before, the slot order depends on the history
+			double denom = 0.0;
+			for (int key : candidate_order) {
+				denom += candidate_weight[candidate_slot[(key % height) * width + key / height]];
 			}
 			denominator = denom;
+			selection_dirty = true;
+		}
+
+		std::tuple<int, int> FastDBM::field_size() const
+		{
+			return { width, height };
+		}
+
+		void FastDBM::copy_field(float* dst) const
+		{
+			for (double p : potential) {
+				*dst++ = (float)p;
+			}
 		}
 
 	}
@@ -1,9 +1,10 @@
 #pragma once
 #include "model.h"
+#include "../util/fenwick.h"
+#include "../util/threadpool.h"
 #include <vector>
 #include <memory>
-#include <set>
-#include <optional>
+#include <cstdint>
 
 /*
 	An implementation of Fast DBM
@@ -21,12 +22,21 @@ namespace lichtenberg {
 
 		class FastDBM : public BreakModel {
 		public:
-			FastDBM(int width, int height, double min_guarantee = 0.0, double eta = 1.0, const std::vector<float>& bias = {});
+			//theta: accuracy of Barnes-Hut approximation of the potentials(0 means the exact sum)
+			//num_threads: threads for the updates of the candidates, 0 means the number of hardware threads
+			FastDBM(int width, int height, double min_guarantee = 0.0, double eta = 1.0, const std::vector<float>& bias = {},
+				double theta = 0.0, int num_threads = 1);
+			/* bias is a width*height array in row-major order(or null), it is shared without copying */
+			FastDBM(int width, int height, double min_guarantee, double eta, std::shared_ptr<const float> bias,
+				double theta = 0.0, int num_threads = 1);
 			FastDBM(const FastDBM&) = delete;
 			FastDBM& operator =(const FastDBM&) = delete;
 
 			bool test(int x, int y);
 			void update(const CellList2D& cells, const std::vector<Point>& broken_list);
+			bool select(int& x, int& y);
+			std::tuple<int, int> field_size() const;
+			void copy_field(float* dst) const;
 
 		private:
 			int width;
@@ -34,27 +44,72 @@ namespace lichtenberg {
 			bool init;
 			double min_guarantee;
 			double eta;
-			std::set<Point> broken_set;
 			double min_potential;
 			double max_potential;
 			double denominator;
-			void initialize_potentials(const Point candidate_site);
-			void update_potentials(const Point& broken_cell, const std::set<Point>& candidate_set);
-			void update_minmax(const std::set<Point>& candidate_set);
-			void update_denominator(const std::set<Point>& candidate_set);
-
-			struct FDBMCell {
-				double potential;
-				FDBMCell(double potential = FDBM_INITIAL_POTENTIAL);
-			};
-			std::vector<std::vector<FDBMCell>> grid;
 
-			typedef std::vector<std::vector<float>> BiasGrid;
-			typedef std::shared_ptr<BiasGrid> BiasGridPtr;
-			BiasGridPtr bias;
+			//all data is stored in flat arrays indexed by y * width + x
+			std::vector<double> potential;
+			std::vector<uint8_t> broken;  //cells already counted as point charges
+			std::shared_ptr<const float> bias;  //null if no bias is given
+
+			//point charges(structure of arrays), sorted by (x, y)
+			std::vector<double> charge_x;
+			std::vector<double> charge_y;
+
+			//candidate sites are the unbroken neighbors of the cells given to update()
+			//the list is kept between updates, cells which are no longer next to them are removed
+			std::vector<int> candidate_slot;  //index in `candidates` of each cell, -1 if not a candidate
+			std::vector<int> candidates;  //cell indices
+			std::vector<double> candidate_weight;  //pow(normalized potential, eta) of each slot
+			std::vector<double> candidate_x;  //coordinates of each slot
+			std::vector<double> candidate_y;
+			std::vector<int> candidate_order;  //x * height + y of the candidates in sorted order
+			std::vector<uint32_t> visited;  //the serial number of the last update which found the cell
+			uint32_t serial;
+
+			//weights for select(), built on demand after each update
+			util::FenwickTree selection;
+			bool selection_dirty;
+
+			//the candidates are processed in fixed blocks, and the results are reduced in a fixed order,
+			//so they do not depend on the number of threads
+			int num_threads;
+			std::unique_ptr<util::ThreadPool> pool;
+			template <typename F> void for_blocks(int n, const F& func);
 
-			double calc_potential(const Point& candidate_site, const Point& point_charge);
-			double calc_bias_factor(const Point& position);
+			//work buffers, reused in each update
+			std::vector<int> new_broken_cells;
+			std::vector<int> new_candidates;
+			std::vector<int> new_charges;  //x * height + y
+			std::vector<int> added_candidates;  //x * height + y
+			std::vector<double> block_min;
+			std::vector<double> block_max;
+
+			void add_candidate(int index);
+			void remove_candidate(int index);
+			void merge_charges();
+			void sort_candidates();
+			void initialize_potentials(int candidate);
+			void update_potentials();
+			void update_minmax();
+			void update_denominator();
+
+			double calc_bias_factor(int index) const;
+
+			//Barnes-Hut approximation
+			//the point charges are counted in an implicit quadtree, levels[k] has blocks of 2^k x 2^k cells
+			struct ChargeLevel {
+				int width;
+				int height;
+				std::vector<int> count;
+				std::vector<double> sum_x;
+				std::vector<double> sum_y;
+			};
+			double theta;
+			std::vector<ChargeLevel> charge_tree;
+			void add_charge(int x, int y);
+			double sum_inverse_distance(int cx, int cy) const;
 		};
 	}
 }
@@ -1,6 +1,5 @@
 #pragma once
 #include "manualmodel.h"
-#include <cstdlib>
 #include <stdexcept>
 
 namespace lichtenberg {
@@ -37,7 +36,7 @@ namespace lichtenberg {
 		bool ManualBreakModel::test(int x, int y)
 		{
 			float th = map[y * width + x];
-			float r = (float)(rand() % RAND_MAX) / RAND_MAX;
+			float r = (float)rng.uniform();
 			return r < th;
 		}
 	}
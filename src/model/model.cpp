@@ -1,14 +1,23 @@
 #include "model.h"
-#include <cstdlib>
 #include <stdexcept>
 
 namespace lichtenberg {
 	namespace model {
 		//BreakModel
+		BreakModel::BreakModel()
+			: rng(util::next_default_seed())
+		{
+		}
+
 		BreakModel::~BreakModel()
 		{
 		}
 
+		void BreakModel::set_seed(uint64_t seed)
+		{
+			rng.seed(seed);
+		}
+
 		bool BreakModel::test(int /*x*/, int /*y*/)
 		{
 			throw std::runtime_error("not implemented");
@@ -21,6 +30,20 @@ namespace lichtenberg {
 		{
 		}
 
+		bool BreakModel::select(int& /*x*/, int& /*y*/)
+		{
+			throw std::runtime_error("This model does not support the weighted growth.");
+		}
+
+		std::tuple<int, int> BreakModel::field_size() const
+		{
+			return { 0, 0 };
+		}
+
+		void BreakModel::copy_field(float* /*dst*/) const
+		{
+		}
+
 
 		//DefaultBreakModel
 		DefaultBreakModel::DefaultBreakModel()
@@ -31,8 +54,7 @@ namespace lichtenberg {
 		{
 			//uses simple probability model
 			//fifty - fifty
-			int rnd = rand() % RAND_MAX;
-			return rnd < (RAND_MAX >> 1);
+			return rng.uniform() < 0.5;
 		}
 	}
 }
\ No newline at end of file
@@ -1,17 +1,33 @@
 #pragma once
 #include <vector>
 #include <memory>
+#include <tuple>
 #include "../core.h"
+#include "../util/random.h"
 
 namespace lichtenberg {
 	namespace model {
 
 		class BreakModel {
 		public:
+			BreakModel();
 			virtual ~BreakModel();
 			virtual bool test(int x, int y);
 			virtual void update(const CellList2D& cells, const std::vector<Point>& broken_list);
 			virtual void onbreak(int x, int y);
+			//picks the next cell to break with the probability proportional to its weight(GrowthMode::Weighted)
+			//returns false if there is no candidate
+			virtual bool select(int& x, int& y);
+			//the scalar field of the model(e.g. potential) as (width, height), (0, 0) if it has none
+			virtual std::tuple<int, int> field_size() const;
+			//copies the field into dst(row-major, width * height)
+			virtual void copy_field(float* dst) const;
+			void set_seed(uint64_t seed);
+
+		protected:
+			//each model owns its generator, so models can run in parallel
+			//the initial seed is taken from the sequence set by set_random_seed()
+			util::Random rng;
 		};
 		typedef std::shared_ptr<BreakModel> BreakModelPtr;
 
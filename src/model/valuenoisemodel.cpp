@@ -15,14 +15,12 @@ namespace lichtenberg {
 			map = new float[width * height];
 			double max_rate = 1.0 - min_guarantee;
 			util::noise_init(seed);
-			for (int y = 0; y < height; y++) {
-				float* ptr = map + y * width;
-				for (int x = 0; x < width; x++) {
-					double f = util::noise(x / scale, y / scale, persistence, octaves);
-					double n = (f + 1.0) / 2.0; //[-1,+1] -> [0,1]
-					n = n * max_rate + min_guarantee; //[0, 1] -> [min_guarantee, 1.0]
-					*ptr++ = (float)n;
-				}
+			std::vector<double> noise;
+			util::noise_map(width, height, scale, persistence, octaves, noise);
+			for (int i = 0; i < width * height; i++) {
+				double n = (noise[i] + 1.0) / 2.0; //[-1,+1] -> [0,1]
+				n = n * max_rate + min_guarantee; //[0, 1] -> [min_guarantee, 1.0]
+				map[i] = (float)n;
 			}
 		}
 		ValueNoiseBreakModel::~ValueNoiseBreakModel()
@@ -33,7 +31,7 @@ namespace lichtenberg {
 		bool ValueNoiseBreakModel::test(int x, int y)
 		{
 			float th = map[y * width + x];
-			float r = (float)(rand() % RAND_MAX) / RAND_MAX;
+			float r = (float)rng.uniform();
 			return r < th;
 		}
 		float ValueNoiseBreakModel::get(int x, int y) const
@@ -0,0 +1,178 @@
+#include "recorder.h"
+#include <stdexcept>
+#include <tuple>
+
+
+namespace lichtenberg {
+
+	FrameRecorder::FrameRecorder(int interval, int capacity, Mode mode, bool with_field)
+		: interval(interval), capacity(capacity), mode(mode), with_field(with_field),
+		width(0), height(0), field_width(0), field_height(0), head(0), count(0), dropped(0)
+	{
+		if (interval <= 0) {
+			throw std::invalid_argument("interval must be greater than zero.");
+		}
+		if (capacity <= 0) {
+			throw std::invalid_argument("capacity must be greater than zero.");
+		}
+	}
+
+	int FrameRecorder::get_interval() const
+	{
+		return interval;
+	}
+
+	FrameRecorder::Mode FrameRecorder::get_mode() const
+	{
+		return mode;
+	}
+
+	bool FrameRecorder::has_field() const
+	{
+		return with_field;
+	}
+
+	//the buffer is allocated for all frames on the first capture
+	void FrameRecorder::allocate(const CellList2D& cells, const model::BreakModel& model)
+	{
+		width = cells.width;
+		height = cells.height;
+		loops.assign(capacity, 0);
+		if (mode == Mode::Mask) {
+			masks.assign((size_t)capacity * width * height, 0);
+		}
+		else {
+			deltas.assign(capacity, std::vector<Point>());
+		}
+		if (with_field) {
+			std::tie(field_width, field_height) = model.field_size();
+			fields.assign((size_t)capacity * field_width * field_height, 0.0f);
+		}
+	}
+
+	void FrameRecorder::capture(int loop, const CellList2D& cells, const model::BreakModel& model)
+	{
+		bool first = count == 0 && dropped == 0;
+		if (loops.empty()) {
+			allocate(cells, model);
+		}
+		else if (cells.width != width || cells.height != height) {
+			throw std::runtime_error("The size of cells differs from the recorded frames.");
+		}
+
+		const int s = head;
+		const size_t n = (size_t)width * height;
+		loops[s] = loop;
+		if (mode == Mode::Mask) {
+			uint8_t* dst = &masks[s * n];
+			const CellInfo* src = cells.data();
+			for (size_t i = 0; i < n; i++) {
+				dst[i] = src[i].broken && !src[i].insulated;
+			}
+		}
+		else {
+			if (first) {
+				//the first frame has all cells broken so far
+				pending.clear();
+				for (int y = 0; y < height; y++) {
+					for (int x = 0; x < width; x++) {
+						if (cells.get_broken(x, y) && !cells.get_insulated(x, y)) {
+							pending.push_back(Point(x, y));
+						}
+					}
+				}
+			}
+			deltas[s].swap(pending);
+			pending.clear();
+		}
+		if (with_field && field_width > 0 && field_height > 0) {
+			model.copy_field(&fields[(size_t)s * field_width * field_height]);
+		}
+
+		head = (head + 1) % capacity;
+		if (count < capacity) {
+			count++;
+		}
+		else {
+			dropped++;
+		}
+	}
+
+	void FrameRecorder::on_break(int x, int y)
+	{
+		if (mode == Mode::Delta) {
+			pending.push_back(Point(x, y));
+		}
+	}
+
+	int FrameRecorder::size() const
+	{
+		return count;
+	}
+
+	int FrameRecorder::get_dropped() const
+	{
+		return dropped;
+	}
+
+	void FrameRecorder::clear()
+	{
+		head = 0;
+		count = 0;
+		dropped = 0;
+		pending.clear();
+		for (auto& d : deltas) {
+			d.clear();
+		}
+	}
+
+	int FrameRecorder::get_width() const
+	{
+		return width;
+	}
+
+	int FrameRecorder::get_height() const
+	{
+		return height;
+	}
+
+	int FrameRecorder::get_field_width() const
+	{
+		return field_width;
+	}
+
+	int FrameRecorder::get_field_height() const
+	{
+		return field_height;
+	}
+
+	int FrameRecorder::slot(int i) const
+	{
+		if (i < 0 || i >= count) {
+			throw std::out_of_range("frame index out of range");
+		}
+		return (head - count + i + capacity) % capacity;
+	}
+
+	int FrameRecorder::frame_loop(int i) const
+	{
+		return loops[slot(i)];
+	}
+
+	const uint8_t* FrameRecorder::frame_mask(int i) const
+	{
+		if (mode != Mode::Mask) return nullptr;
+		return &masks[(size_t)slot(i) * width * height];
+	}
+
+	const std::vector<Point>& FrameRecorder::frame_delta(int i) const
+	{
+		return deltas[slot(i)];
+	}
+
+	const float* FrameRecorder::frame_field(int i) const
+	{
+		if (!with_field || field_width == 0 || field_height == 0) return nullptr;
+		return &fields[(size_t)slot(i) * field_width * field_height];
+	}
+}
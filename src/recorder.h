@@ -0,0 +1,70 @@
+#pragma once
+#include "core.h"
+#include "model/model.h"
+#include <vector>
+#include <cstdint>
+
+
+namespace lichtenberg {
+
+	/*
+		Captures snapshots of the simulation every `interval` loops.
+		Frames are stored in a ring buffer of `capacity` frames which is allocated at once,
+		when it is full, the oldest frame is overwritten.
+	*/
+	class FrameRecorder
+	{
+	public:
+		enum class Mode
+		{
+			Mask,	//the whole broken mask
+			Delta,	//the cells broken since the previous frame
+		};
+
+		FrameRecorder(int interval, int capacity, Mode mode = Mode::Mask, bool with_field = false);
+		FrameRecorder(const FrameRecorder&) = delete;
+		FrameRecorder& operator =(const FrameRecorder&) = delete;
+
+		int get_interval() const;
+		Mode get_mode() const;
+		bool has_field() const;
+
+		//called by Simulator
+		void capture(int loop, const CellList2D& cells, const model::BreakModel& model);
+		void on_break(int x, int y);
+
+		//frames in chronological order(0 is the oldest)
+		int size() const;
+		int get_dropped() const;  //the number of overwritten frames
+		void clear();
+		int get_width() const;
+		int get_height() const;
+		int get_field_width() const;
+		int get_field_height() const;
+		int frame_loop(int i) const;
+		const uint8_t* frame_mask(int i) const;
+		const std::vector<Point>& frame_delta(int i) const;
+		const float* frame_field(int i) const;
+
+	private:
+		int interval;
+		int capacity;
+		Mode mode;
+		bool with_field;
+		int width;
+		int height;
+		int field_width;
+		int field_height;
+		int head;  //next slot to write
+		int count;
+		int dropped;
+		std::vector<int> loops;
+		std::vector<uint8_t> masks;
+		std::vector<std::vector<Point>> deltas;
+		std::vector<float> fields;
+		std::vector<Point> pending;  //broken cells since the last frame
+
+		void allocate(const CellList2D& cells, const model::BreakModel& model);
+		int slot(int i) const;
+	};
+}
@@ -1,12 +1,17 @@
 #include "simulator.h"
+#include "util/threadpool.h"
+#include <algorithm>
+#include <atomic>
+#include <set>
 #include <stdexcept>
 
 namespace lichtenberg {
 
 	Simulator::Simulator(int width, int height, model::BreakModelPtr model,
-		bool up, bool down, bool left, bool right)
-		: cells(width, height), model(model),
-		def_up(up), def_down(down), def_left(left), def_right(right)
+		bool up, bool down, bool left, bool right, GrowthMode growth)
+		: cells(width, height), model(model ? model : std::make_shared<model::DefaultBreakModel>()),
+		def_up(up), def_down(down), def_left(left), def_right(right), growth(growth),
+		num_complete(0), started(false), count_dirty(false), loop_count(0), num_broken(0), track_depth(false)
 	{
 		if (width <= 0) {
 			throw std::invalid_argument("Width must be greater than zero.");
@@ -14,53 +19,44 @@ namespace lichtenberg {
 		else if (height <= 0) {
 			throw std::invalid_argument("Height must be greater than zero.");
 		}
+		if (growth == GrowthMode::Weighted && !(up && down && left && right)) {
+			throw std::invalid_argument("The weighted growth requires all directions.");
+		}
+		//cells which are not in any tree stay level 1
+		for (int y = 0; y < height; y++) {
+			for (int x = 0; x < width; x++) {
+				cells.set_count(x, y, 1);
+			}
+		}
 	}
 
-	//check whether the cell receive electrons from surrounding cells
-	bool Simulator::check_dir(int x, int y)
+	model::BreakModelPtr Simulator::get_model() const
 	{
-		if (x != 0) {
-			Direction dir_left = cells.get_dir(x - 1, y);
-			if (dir_left == Direction::Right) return true;
-		}
-		if (x != cells.width - 1) {
-			Direction dir_right = cells.get_dir(x + 1, y);
-			if (dir_right == Direction::Left) return true;
-		}
-		if (y != 0) {
-			Direction dir_up = cells.get_dir(x, y - 1);
-			if (dir_up == Direction::Down) return true;
-		}
-		if (y != cells.height - 1) {
-			Direction dir_down = cells.get_dir(x, y + 1);
-			if (dir_down == Direction::Up) return true;
-		}
-		return false;
+		return model;
+	}
+
+	void Simulator::set_seed(uint64_t seed)
+	{
+		model->set_seed(seed);
 	}
 
 	//enlarges the breaking area
 	//points : list of target cells
 	//return true if four adjoining cells are broken already
-	std::tuple<bool, bool> Simulator::breaking(int x, int y, std::vector<Point>& points, BreakCallBack callback)
+	std::tuple<bool, bool> Simulator::breaking(int x, int y, std::vector<Point>& points, BreakCallBack callback,
+		StopCondition* stop, FrameRecorder* recorder)
 	{
 		bool cancel = false;
 		bool complete = false;
 
-		if (!model) {
-			model = model::BreakModelPtr(new model::DefaultBreakModel());
-		}
 		model::BreakModel* m = model.get();
 
 		//Common procedures
 		auto process_broken_cell = [&](int ix, int iy, Direction dir, bool& flag) {
 			//Test breakdown in the cell
 			if (m->test(ix, iy)) {
-				cells.set_broken(ix, iy);	//set 'broken' flag
-				cells.set_dir(ix, iy, dir);	//record direction from me
-				points.push_back(Point(ix, iy));
 				flag = true;
-				m->onbreak(ix, iy); // callback to model
-				if (callback) cancel |= callback(ix, iy); //callback to user
+				cancel |= break_cell(ix, iy, x, y, dir, points, callback, stop, recorder);
 			}
 		};
 
@@ -106,18 +102,105 @@ namespace lichtenberg {
 		return { complete, cancel };
 	}
 
+	//breaks (ix, iy) from the neighbor (x, y)
+	//return true if the simulation is canceled
+	bool Simulator::break_cell(int ix, int iy, int x, int y, Direction dir, std::vector<Point>& points, BreakCallBack callback,
+		StopCondition* stop, FrameRecorder* recorder)
+	{
+		bool cancel = false;
+		cells.set_broken(ix, iy);	//set 'broken' flag
+		cells.set_dir(ix, iy, dir);	//record direction from me
+		points.push_back(Point(ix, iy));
+		model->onbreak(ix, iy); // callback to model
+		num_broken++;
+		if (recorder) recorder->on_break(ix, iy);
+		if (stop) {
+			BreakEvent e = { ix, iy, -1, num_broken };
+			if (track_depth) {
+				e.depth = depth[y * cells.width + x] + 1;
+				depth[iy * cells.width + ix] = e.depth;
+			}
+			cancel |= stop->test(e);
+		}
+		if (callback) cancel |= callback(ix, iy); //callback to user
+		return cancel;
+	}
+
+	//breaks one cell picked by the model(GrowthMode::Weighted)
+	//the frontier is updated in place, and it is cleared if the model has no candidate
+	//return true if the simulation is canceled
+	bool Simulator::selective_breaking(BreakCallBack callback, StopCondition* stop, FrameRecorder* recorder)
+	{
+		const int w = cells.width;
+		const int h = cells.height;
+		auto grown = [&](int x, int y) {
+			return cells.get_broken(x, y) && !cells.get_insulated(x, y);
+		};
+
+		int x, y;
+		if (!model->select(x, y)) {
+			frontier.clear();
+			return false;
+		}
+		if (x < 0 || x >= w || y < 0 || y >= h || cells.get_broken(x, y)) {
+			throw std::runtime_error("The model selected an invalid cell.");
+		}
+		//the direction points to the broken neighbor
+		bool cancel;
+		if (y != 0 && grown(x, y - 1)) cancel = break_cell(x, y, x, y - 1, Direction::Up, frontier, callback, stop, recorder);
+		else if (y != h - 1 && grown(x, y + 1)) cancel = break_cell(x, y, x, y + 1, Direction::Down, frontier, callback, stop, recorder);
+		else if (x != 0 && grown(x - 1, y)) cancel = break_cell(x, y, x - 1, y, Direction::Left, frontier, callback, stop, recorder);
+		else if (x != w - 1 && grown(x + 1, y)) cancel = break_cell(x, y, x + 1, y, Direction::Right, frontier, callback, stop, recorder);
+		else throw std::runtime_error("The model selected a cell which has no broken neighbor.");
+
+		//the cells which have no unbroken neighbor, only the new cell and its neighbors can become so
+		auto complete = [&](int px, int py) {
+			return (py == 0 || cells.get_broken(px, py - 1)) && (py == h - 1 || cells.get_broken(px, py + 1))
+				&& (px == 0 || cells.get_broken(px - 1, py)) && (px == w - 1 || cells.get_broken(px + 1, py));
+		};
+		//the new cell is dropped at once, as the full sweep did
+		if (complete(x, y)) frontier.pop_back();
+		if (y != 0 && grown(x, y - 1) && complete(x, y - 1)) num_complete++;
+		if (y != h - 1 && grown(x, y + 1) && complete(x, y + 1)) num_complete++;
+		if (x != 0 && grown(x - 1, y) && complete(x - 1, y)) num_complete++;
+		if (x != w - 1 && grown(x + 1, y) && complete(x + 1, y)) num_complete++;
+		//the others are swept when they are half of the frontier, the order of the rest is kept
+		if (2 * num_complete >= (int)frontier.size()) {
+			frontier.erase(std::remove_if(frontier.begin(), frontier.end(), [&](const Point& p) {
+				auto [px, py] = p;
+				return complete(px, py);
+			}), frontier.end());
+			num_complete = 0;
+		}
+		return cancel;
+	}
+
 	void Simulator::breakdown(int x, int y)
 	{
 		if (x < 0 || x >= cells.width || y < 0 || y >= cells.height) {
 			throw std::invalid_argument("The specified coordinate is invalid.");
 		}
+		bool grown = cells.get_broken(x, y) && !cells.get_insulated(x, y);
+		bool root = grown && cells.get_dir(x, y) == Direction::None;
 		cells.set_broken(x, y);
 		cells.set_dir(x, y, Direction::None);
+		if (started && !cells.get_insulated(x, y)) {
+			//join the current growth
+			if (!grown) {
+				frontier.push_back(Point(x, y));
+				added.push_back(Point(x, y));
+				num_broken++;
+			}
+			if (!root) roots.push_back(Point(x, y));
+			count_dirty = true;
+		}
 	}
 
 	void Simulator::insulate_cell(int x, int y)
 	{
 		if (x < 0 || x >= cells.width || y < 0 || y >= cells.height) return;
+		started = false;  //the frontier may contain this cell
+		cells.growing = false;
 		cells.set_insulated(x, y);
 		cells.set_broken(x, y);
 		cells.set_dir(x, y, Direction::None);
@@ -216,39 +299,124 @@ namespace lichtenberg {
 	}
 
 	//This is the core of algorithm
-	void Simulator::simulate(int max_loop, BreakCallBack callback_on_break, LoopCallBack callback_on_loop)
+	void Simulator::simulate(int max_loop, BreakCallBack callback_on_break, LoopCallBack callback_on_loop,
+		StopConditionPtr stop, FrameRecorder* recorder)
+	{
+		start();
+		if (stop) stop->reset();
+		grow(max_loop, callback_on_break, callback_on_loop, stop.get(), recorder);
+		//the levels are up to date after simulate(), even in `cells` taken before it
+		calc_count(roots);
+		count_dirty = false;
+	}
+
+	int Simulator::step(int num_loop, FrameRecorder* recorder)
 	{
-		int w = cells.width;
-		int h = cells.height;
+		if (!started) start();
+		return grow(num_loop, nullptr, nullptr, nullptr, recorder);
+	}
 
-		//to accelerate, use two array of points alternately
-		std::vector<Point> points1;
-		std::vector<Point> points2;
-		std::vector<Point>* pF, * pB, * ptmp;
-		points1.reserve(w * h);
-		points2.reserve(w * h);
-		pF = &points1;
-		pB = &points2;
-
-		//rake up all broken cells
+	int Simulator::run_until(int max_loop, BreakCallBack callback_on_break, LoopCallBack callback_on_loop,
+		StopConditionPtr stop, FrameRecorder* recorder)
+	{
+		//the condition keeps its state while the same growth is resumed
+		if (!started) {
+			start();
+			if (stop) stop->reset();
+		}
+		return grow(max_loop, callback_on_break, callback_on_loop, stop.get(), recorder);
+	}
+
+	bool Simulator::is_finished() const
+	{
+		return started && frontier.empty();
+	}
+
+	int Simulator::get_loop_count() const
+	{
+		return loop_count;
+	}
+
+	CellList2D& Simulator::get_cells()
+	{
+		if (count_dirty) {
+			calc_count(roots);
+			count_dirty = false;
+		}
+		return cells;
+	}
+
+	void Simulator::set_cells(const CellList2D& other)
+	{
+		cells = other;
+		started = false;
+		cells.growing = false;
+		count_dirty = false;
+	}
+
+	//rake up all broken cells, and begin a new growth from them
+	void Simulator::start()
+	{
+		const int w = cells.width;
+		const int h = cells.height;
+		frontier.clear();
+		roots.clear();
+		added.clear();
+		num_complete = 0;
 		for (int y = 0; y < h; y++) {
 			for (int x = 0; x < w; x++) {
 				if (cells.get_broken(x, y) && !cells.get_insulated(x, y)) {
-					pF->push_back(Point(x, y));
+					frontier.push_back(Point(x, y));
+					if (cells.get_dir(x, y) == Direction::None) {
+						roots.push_back(Point(x, y));
+					}
 				}
 			}
 		}
 
-		if (pF->size() == 0) {
+		if (frontier.size() == 0) {
 			throw std::runtime_error("No initial break point found.");
 		}
+		started = true;
+		cells.growing = true;
+		loop_count = 0;
+		num_broken = (int)frontier.size();
+	}
+
+	//enlarges broken area from the current frontier
+	//max_loop <= 0 means no limit(until the frontier is empty)
+	//return the number of loops
+	int Simulator::grow(int max_loop, BreakCallBack callback_on_break, LoopCallBack callback_on_loop,
+		StopCondition* stop, FrameRecorder* recorder)
+	{
+		//cells broken by the user since the last call
+		if (recorder) {
+			for (const auto& [x, y] : added) recorder->on_break(x, y);
+		}
+		added.clear();
+		//distance from the base cell, only if the condition requires it
+		track_depth = stop && stop->needs_depth();
+		if (track_depth) {
+			std::vector<int> order;
+			tree_order(roots, order);
+			depth.assign((size_t)cells.width * cells.height, 0);
+			for (int index : order) {
+				int parent = parent_index(index);
+				if (parent >= 0) depth[index] = depth[parent] + 1;
+			}
+		}
+
+		//to accelerate, use two array of points alternately
+		std::vector<Point>& next = next_frontier;
+		next.clear();
 
-		//enlarge broken area
 		int loopcount = 0;
-		while (!pF->empty()) {
+		while (!frontier.empty() && (max_loop <= 0 || loopcount < max_loop)) {
 			//update model
-			if (model) {
-				model->update(cells, *pF);
+			model->update(cells, frontier);
+			//snapshot
+			if (recorder && loop_count % recorder->get_interval() == 0) {
+				recorder->capture(loop_count, cells, *model);
 			}
 			//callback
 			if (callback_on_loop) {
@@ -257,83 +425,143 @@ namespace lichtenberg {
 			}
 
 			bool flag_break = false;
-			for (auto it = pF->begin(); it != pF->end(); ++it) {
+			count_dirty = true;
+			if (growth == GrowthMode::Weighted) {
+				flag_break = selective_breaking(callback_on_break, stop, recorder);
+				loopcount++;
+				loop_count++;
+				if (flag_break) break;
+				continue;
+			}
+			for (auto it = frontier.begin(); it != frontier.end(); ++it) {
 				auto [x, y] = *it;
-				auto [complete, cancel] = breaking(x, y, *pB, callback_on_break);
+				auto [complete, cancel] = breaking(x, y, next, callback_on_break, stop, recorder);
 				if (!complete) {
 					//this cell has non-broken neighbor, then add it in next loop
-					pB->push_back(*it);
+					next.push_back(*it);
 				}
 				if (cancel) {
+					//keep the rest to resume later
+					next.insert(next.end(), it + 1, frontier.end());
 					flag_break = true;
 					break;
 				}
 			}
-			pF->clear();
-			ptmp = pF; pF = pB; pB = ptmp; //swap
+			frontier.swap(next);
+			next.clear();
 			loopcount++;
-			if (loopcount == max_loop) {
-				//Give up...
-				break;
-			}
+			loop_count++;
 			if (flag_break) {
 				//Canceled
 				break;
 			}
 		}
+		return loopcount;
+	}
 
-		//calc cell level
-		//first of all, base point is level 1
-		for (int y = 0; y < h; y++) {
-			for (int x = 0; x < w; x++) {
-				if (!check_dir(x, y)) {
-					cells.set_count(x, y, 1);
-				}
+	//breadth-first order of the trees grown from `roots`: parents come before their children
+	//the result is the flat index(y * width + x) of cells
+	void Simulator::tree_order(const std::vector<Point>& roots, std::vector<int>& order) const
+	{
+		const int w = cells.width;
+		const int h = cells.height;
+		const CellInfo* c = cells.data();
+
+		order.clear();
+		for (const Point& p : roots) {
+			auto [x, y] = p;
+			const CellInfo& root = c[y * w + x];
+			if (root.broken && !root.insulated && root.direction == Direction::None) {
+				order.push_back(y * w + x);
 			}
 		}
-		//the cell which receive the base point's electron is level 2.
-		//and level3, 4 ... similarly.
-		for (int y = 0; y < h; y++) {
-			for (int x = 0; x < w; x++) {
-				int cc = cells.get_count(x, y);
-				if (cc == 1) {
-					int cx = x;
-					int cy = y;
-					while (1) {
-						int tx = cx;
-						int ty = cy;
-						Direction dir = cells.get_dir(cx, cy);
-						if (dir == Direction::Up) {
-							ty = cy - 1;
-						}
-						else if (dir == Direction::Down) {
-							ty = cy + 1;
-						}
-						else if (dir == Direction::Left) {
-							tx = cx - 1;
-						}
-						else if (dir == Direction::Right) {
-							tx = cx + 1;
-						}
-						else if (dir == Direction::None)
-						{
-							break;
-						}
-
-						int tc = cells.get_count(tx, ty);
-						if (tc > cc) {
-							break; //this cell is connected with more long flow
-						}
-						else {
-							cells.set_count(tx, ty, cc + 1);
-						}
-
-						cx = tx;
-						cy = ty;
-						cc = cc + 1;
-					}
+		for (size_t i = 0; i < order.size(); i++) {
+			const int index = order[i];
+			const int x = index % w;
+			const int y = index / w;
+			if (x != 0 && c[index - 1].direction == Direction::Right) order.push_back(index - 1);
+			if (x != w - 1 && c[index + 1].direction == Direction::Left) order.push_back(index + 1);
+			if (y != 0 && c[index - w].direction == Direction::Down) order.push_back(index - w);
+			if (y != h - 1 && c[index + w].direction == Direction::Up) order.push_back(index + w);
+		}
+	}
+
+	//the flat index of the cell which broke `index`(-1 for base cells)
+	int Simulator::parent_index(int index) const
+	{
+		const int w = cells.width;
+		switch (cells.data()[index].direction) {
+		case Direction::Up: return index - w;
+		case Direction::Down: return index + w;
+		case Direction::Left: return index - 1;
+		case Direction::Right: return index + 1;
+		default: return -1;
+		}
+	}
+
+	//calc cell level
+	//a cell which has no child is level 1(leaf), and the others are
+	//(the highest level of their children) + 1.
+	//only the trees grown from `roots` are visited, once each.
+	void Simulator::calc_count(const std::vector<Point>& roots)
+	{
+		CellInfo* c = cells.data();
+		std::vector<int> order;
+		tree_order(roots, order);
+
+		//leaf to root
+		for (int index : order) {
+			c[index].count = 1;
+		}
+		for (auto it = order.rbegin(); it != order.rend(); ++it) {
+			const int index = *it;
+			const int parent = parent_index(index);
+			if (parent >= 0) {
+				c[parent].count = std::max(c[parent].count, c[index].count + 1);
+			}
+		}
+	}
+
+	void simulate_many(const std::vector<Simulator*>& simulators, int max_loop, int num_threads)
+	{
+		std::set<const Simulator*> sim_set;
+		std::set<const model::BreakModel*> model_set;
+		for (const Simulator* sim : simulators) {
+			if (!sim) {
+				throw std::invalid_argument("simulators must not contain None.");
+			}
+			if (!sim_set.insert(sim).second) {
+				throw std::invalid_argument("The same simulator is specified more than once.");
+			}
+			const model::BreakModel* m = sim->get_model().get();
+			if (m && !model_set.insert(m).second) {
+				throw std::invalid_argument("Simulators must not share a model.");
+			}
+		}
+
+		const int n = (int)simulators.size();
+		if (num_threads <= 0) {
+			num_threads = util::default_thread_count();
+		}
+		num_threads = std::min(num_threads, n);
+		if (num_threads == 0) return;
+
+		//each thread picks up the next simulator until all are done
+		std::atomic<int> next(0);
+		std::vector<std::exception_ptr> errors(n);
+		util::ThreadPool pool(num_threads);
+		pool.parallel_for(num_threads, [&](int, int) {
+			for (int i = next++; i < n; i = next++) {
+				try {
+					simulators[i]->simulate(max_loop);
+				}
+				catch (...) {
+					errors[i] = std::current_exception();
 				}
 			}
+		});
+		for (auto& e : errors) {
+			if (e) std::rethrow_exception(e);
 		}
 	}
 }
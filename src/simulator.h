@@ -1,6 +1,8 @@
 #pragma once
 #include "core.h"
 #include "model/model.h"
+#include "stopcondition.h"
+#include "recorder.h"
 #include <functional>
 #include <tuple>
 #include <memory>
@@ -8,18 +10,39 @@
 
 namespace lichtenberg {
 
+	enum class GrowthMode
+	{
+		Test,		//every unbroken neighbor is tested by the model in each loop
+		Weighted,	//the model picks one cell to break in each loop(BreakModel::select)
+	};
+
 	class Simulator
 	{
 	private:
 		model::BreakModelPtr model;
 		bool def_up, def_down, def_left, def_right;
+		GrowthMode growth;
 		std::function<bool(int, int)> callback_broken;
 
+		//state of the growth, kept between calls
+		std::vector<Point> frontier;  //broken cells which may break their neighbors
+		std::vector<Point> next_frontier;
+		int num_complete;  //cells in the frontier with no unbroken neighbor(GrowthMode::Weighted)
+		std::vector<Point> roots;  //base cells of the trees
+		std::vector<Point> added;  //cells of breakdown() during the growth, not reported to a recorder yet
+		bool started;
+		bool count_dirty;  //the level of cells must be recalculated
+		int loop_count;
+		int num_broken;
+		bool track_depth;
+		std::vector<int> depth;  //distance from the base cell(only for StopCondition)
+
 	public:
 		CellList2D cells;
 
 		Simulator(int width, int height, model::BreakModelPtr model,
-			bool up = true, bool down = true, bool left = true, bool right = true);
+			bool up = true, bool down = true, bool left = true, bool right = true,
+			GrowthMode growth = GrowthMode::Test);
 		Simulator(const Simulator&) = delete;
 		Simulator& operator =(const Simulator&) = delete;
 
@@ -29,16 +52,48 @@ namespace lichtenberg {
 		void insulate_square(int x1, int y1, int x2, int y2, bool fill = false);
 		void insulate_circle(int x, int y, int radius, bool fill = false);
 
-		static const int MAX_LOOP_COUNT = 50000;
+		static constexpr int MAX_LOOP_COUNT = 50000;
 		typedef std::function<bool(int, int)> BreakCallBack;
 		typedef std::function<bool(int, int, const CellList2D*)> LoopCallBack;
+		//starts a new growth from all broken cells
+		//maxloopcount <= 0 means no limit(the growth runs until no cell can break)
 		void simulate(int maxloopcount = MAX_LOOP_COUNT, BreakCallBack callback_on_break = nullptr,
-			LoopCallBack callback_on_loop = nullptr);
+			LoopCallBack callback_on_loop = nullptr, StopConditionPtr stop = nullptr,
+			FrameRecorder* recorder = nullptr);
+		//continue the growth where it stopped(or start it), return the number of loops
+		int step(int num_loop = 1, FrameRecorder* recorder = nullptr);
+		int run_until(int maxloopcount = MAX_LOOP_COUNT, BreakCallBack callback_on_break = nullptr,
+			LoopCallBack callback_on_loop = nullptr, StopConditionPtr stop = nullptr,
+			FrameRecorder* recorder = nullptr);
+		bool is_finished() const;
+		int get_loop_count() const;  //loops since the growth started
+
+		//`cells` with up-to-date levels(count), they are calculated on demand
+		CellList2D& get_cells();
+		void set_cells(const CellList2D& cells);
+
+		model::BreakModelPtr get_model() const;
+		void set_seed(uint64_t seed);  //seeds the random generator of the model
 
 	private:
-		bool check_dir(int x, int y);
-		std::tuple<bool, bool> breaking(int x, int y, std::vector<Point>& points, BreakCallBack callback);
+		void start();
+		int grow(int max_loop, BreakCallBack callback_on_break, LoopCallBack callback_on_loop,
+			StopCondition* stop, FrameRecorder* recorder);
+		void tree_order(const std::vector<Point>& roots, std::vector<int>& order) const;
+		int parent_index(int index) const;
+		void calc_count(const std::vector<Point>& roots);
+		std::tuple<bool, bool> breaking(int x, int y, std::vector<Point>& points, BreakCallBack callback,
+			StopCondition* stop, FrameRecorder* recorder);
+		bool selective_breaking(BreakCallBack callback, StopCondition* stop, FrameRecorder* recorder);
+		bool break_cell(int ix, int iy, int x, int y, Direction dir, std::vector<Point>& points, BreakCallBack callback,
+			StopCondition* stop, FrameRecorder* recorder);
 		void insulate_cell(int x, int y);
 	};
 
+	//runs simulate(max_loop) of independent simulators on a thread pool
+	//num_threads <= 0 means the number of hardware threads
+	//simulators must not share a model with each other
+	void simulate_many(const std::vector<Simulator*>& simulators,
+		int max_loop = Simulator::MAX_LOOP_COUNT, int num_threads = 0);
+
 }
\ No newline at end of file
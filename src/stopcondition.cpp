@@ -0,0 +1,163 @@
+#include "stopcondition.h"
+#include <stdexcept>
+
+
+namespace lichtenberg {
+
+	//StopCondition
+	StopCondition::~StopCondition()
+	{
+	}
+
+	bool StopCondition::needs_depth() const
+	{
+		return false;
+	}
+
+	void StopCondition::reset()
+	{
+	}
+
+	//ReachRow
+	ReachRow::ReachRow(int y)
+		: row(y)
+	{
+	}
+
+	bool ReachRow::test(const BreakEvent& e)
+	{
+		return e.y == row;
+	}
+
+	//ReachColumn
+	ReachColumn::ReachColumn(int x)
+		: column(x)
+	{
+	}
+
+	bool ReachColumn::test(const BreakEvent& e)
+	{
+		return e.x == column;
+	}
+
+	//ReachCell
+	ReachCell::ReachCell(int x, int y)
+		: x(x), y(y)
+	{
+	}
+
+	bool ReachCell::test(const BreakEvent& e)
+	{
+		return e.x == x && e.y == y;
+	}
+
+	//EnterMask
+	EnterMask::EnterMask(int width, int height, const std::vector<uint8_t>& mask)
+		: width(width), height(height), mask(mask)
+	{
+		if (width <= 0 || height <= 0) {
+			throw std::invalid_argument("width and height must be positive.");
+		}
+		if (mask.size() != (size_t)width * height) {
+			throw std::invalid_argument("The size of mask must be width*height.");
+		}
+	}
+
+	bool EnterMask::test(const BreakEvent& e)
+	{
+		if (e.x < 0 || e.x >= width || e.y < 0 || e.y >= height) return false;
+		return mask[e.y * width + e.x] != 0;
+	}
+
+	//MaxBroken
+	MaxBroken::MaxBroken(int limit)
+		: limit(limit)
+	{
+	}
+
+	bool MaxBroken::test(const BreakEvent& e)
+	{
+		return e.num_broken > limit;
+	}
+
+	//MaxDepth
+	MaxDepth::MaxDepth(int limit)
+		: limit(limit)
+	{
+	}
+
+	bool MaxDepth::test(const BreakEvent& e)
+	{
+		return e.depth > limit;
+	}
+
+	bool MaxDepth::needs_depth() const
+	{
+		return true;
+	}
+
+	//AnyOf
+	AnyOf::AnyOf(const std::vector<StopConditionPtr>& conditions)
+		: conditions(conditions)
+	{
+		for (const auto& c : conditions) {
+			if (!c) throw std::invalid_argument("conditions must not contain None.");
+		}
+	}
+
+	bool AnyOf::test(const BreakEvent& e)
+	{
+		for (const auto& c : conditions) {
+			if (c->test(e)) return true;
+		}
+		return false;
+	}
+
+	bool AnyOf::needs_depth() const
+	{
+		for (const auto& c : conditions) {
+			if (c->needs_depth()) return true;
+		}
+		return false;
+	}
+
+	void AnyOf::reset()
+	{
+		for (const auto& c : conditions) c->reset();
+	}
+
+	//AllOf
+	AllOf::AllOf(const std::vector<StopConditionPtr>& conditions)
+		: conditions(conditions), satisfied(conditions.size(), false)
+	{
+		for (const auto& c : conditions) {
+			if (!c) throw std::invalid_argument("conditions must not contain None.");
+		}
+	}
+
+	bool AllOf::test(const BreakEvent& e)
+	{
+		if (conditions.empty()) return false;
+		bool all = true;
+		for (size_t i = 0; i < conditions.size(); i++) {
+			//every condition sees the event, so nested conditions keep their state
+			if (conditions[i]->test(e)) satisfied[i] = true;
+			all = all && satisfied[i];
+		}
+		return all;
+	}
+
+	bool AllOf::needs_depth() const
+	{
+		for (const auto& c : conditions) {
+			if (c->needs_depth()) return true;
+		}
+		return false;
+	}
+
+	void AllOf::reset()
+	{
+		satisfied.assign(conditions.size(), false);
+		for (const auto& c : conditions) c->reset();
+	}
+}
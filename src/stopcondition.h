@@ -0,0 +1,122 @@
+#pragma once
+#include "core.h"
+#include <vector>
+#include <memory>
+#include <cstdint>
+
+
+namespace lichtenberg {
+
+	//what the simulator knows when a cell is broken
+	struct BreakEvent
+	{
+		int x;
+		int y;
+		int depth;  //distance from the base cell(-1 if no condition needs it)
+		int num_broken;  //the number of broken cells(without insulated cells)
+	};
+
+	/*
+		Native termination conditions for Simulator.
+		test() is called every time a cell is broken, and returns true to stop the simulation.
+		reset() is called when a new growth starts(conditions keep state while run_until() resumes it).
+	*/
+	class StopCondition
+	{
+	public:
+		virtual ~StopCondition();
+		virtual bool test(const BreakEvent& e) = 0;
+		virtual bool needs_depth() const;
+		virtual void reset();
+	};
+	typedef std::shared_ptr<StopCondition> StopConditionPtr;
+
+	//a cell on the row y is broken
+	class ReachRow : public StopCondition
+	{
+	public:
+		ReachRow(int y);
+		bool test(const BreakEvent& e);
+	private:
+		int row;
+	};
+
+	//a cell on the column x is broken
+	class ReachColumn : public StopCondition
+	{
+	public:
+		ReachColumn(int x);
+		bool test(const BreakEvent& e);
+	private:
+		int column;
+	};
+
+	//the cell (x, y) is broken
+	class ReachCell : public StopCondition
+	{
+	public:
+		ReachCell(int x, int y);
+		bool test(const BreakEvent& e);
+	private:
+		int x;
+		int y;
+	};
+
+	//a cell in the region(mask != 0) is broken
+	class EnterMask : public StopCondition
+	{
+	public:
+		EnterMask(int width, int height, const std::vector<uint8_t>& mask);  //mask: width*height
+		bool test(const BreakEvent& e);
+	private:
+		int width;
+		int height;
+		std::vector<uint8_t> mask;
+	};
+
+	//the number of broken cells exceeds the limit
+	class MaxBroken : public StopCondition
+	{
+	public:
+		MaxBroken(int limit);
+		bool test(const BreakEvent& e);
+	private:
+		int limit;
+	};
+
+	//a cell farther than the limit from the base cell is broken
+	class MaxDepth : public StopCondition
+	{
+	public:
+		MaxDepth(int limit);
+		bool test(const BreakEvent& e);
+		bool needs_depth() const;
+	private:
+		int limit;
+	};
+
+	//combinations
+	class AnyOf : public StopCondition
+	{
+	public:
+		AnyOf(const std::vector<StopConditionPtr>& conditions);
+		bool test(const BreakEvent& e);
+		bool needs_depth() const;
+		void reset();
+	private:
+		std::vector<StopConditionPtr> conditions;
+	};
+
+	//each condition may be satisfied by a different cell, it is remembered until reset()
+	class AllOf : public StopCondition
+	{
+	public:
+		AllOf(const std::vector<StopConditionPtr>& conditions);
+		bool test(const BreakEvent& e);
+		bool needs_depth() const;
+		void reset();
+	private:
+		std::vector<StopConditionPtr> conditions;
+		std::vector<bool> satisfied;
+	};
+}
@@ -2,6 +2,7 @@
 #include <stack>
 #include <set>
 #include <algorithm>
+#include <stdexcept>
 
 
 namespace lichtenberg {
@@ -214,4 +215,170 @@ namespace lichtenberg {
 		}
 		return leaves;
 	}
-}
\ No newline at end of file
+
+	CompactTree::CompactTree(const CellList2D& cells)
+		: width(cells.width), height(cells.height)
+	{
+		const int w = width;
+		const int h = height;
+		const CellInfo* c = cells.data();
+
+		//broken cells in row-major order, it is sorted by the cell index
+		//insulated cells are broken without a direction, they are not a part of the tree
+		std::vector<int> cell_list;
+		for (int i = 0; i < w * h; i++) {
+			if (c[i].broken && !c[i].insulated) cell_list.push_back(i);
+		}
+		const int n = (int)cell_list.size();
+		//a neighbor cell is within `w` entries from k in cell_list
+		auto find_near = [&](int k, int index) {
+			auto first = cell_list.begin() + std::max(k - w, 0);
+			auto last = cell_list.begin() + std::min(k + w + 1, n);
+			auto it = std::lower_bound(first, last, index);
+			return (it != last && *it == index) ? int(it - cell_list.begin()) : -1;
+		};
+
+		//parent in the row-major numbering(a cell whose parent is not broken is a root)
+		std::vector<int> parent_rm(n, -1);
+		std::vector<int> offset_rm(n + 1, 0);
+		for (int k = 0; k < n; k++) {
+			int i = cell_list[k];
+			int x = i % w, y = i / w;
+			int p = -1;
+			switch (c[i].direction) {
+			case Direction::Up: if (y > 0) p = find_near(k, i - w); break;
+			case Direction::Down: if (y < h - 1) p = find_near(k, i + w); break;
+			case Direction::Left: if (x > 0 && k > 0 && cell_list[k - 1] == i - 1) p = k - 1; break;
+			case Direction::Right: if (x < w - 1 && k < n - 1 && cell_list[k + 1] == i + 1) p = k + 1; break;
+			default: break;
+			}
+			parent_rm[k] = p;
+			if (p >= 0) offset_rm[p + 1]++;
+		}
+		for (int k = 0; k < n; k++) offset_rm[k + 1] += offset_rm[k];
+		std::vector<int> children_rm(offset_rm[n]);
+		std::vector<int> fill(offset_rm.begin(), offset_rm.end() - 1);
+		for (int k = 0; k < n; k++) {
+			if (parent_rm[k] >= 0) children_rm[fill[parent_rm[k]]++] = k;
+		}
+
+		//breadth-first order from the roots
+		std::vector<int> order;
+		order.reserve(n);
+		for (int k = 0; k < n; k++) {
+			if (parent_rm[k] < 0) order.push_back(k);
+		}
+		for (size_t head = 0; head < order.size(); head++) {
+			int k = order[head];
+			for (int j = offset_rm[k]; j < offset_rm[k + 1]; j++) order.push_back(children_rm[j]);
+		}
+		if ((int)order.size() != n) {
+			throw std::runtime_error("the directions of the cells do not lead to a base cell");
+		}
+
+		std::vector<int> node_of(n);
+		for (int i = 0; i < n; i++) node_of[order[i]] = i;
+		xs.resize(n);
+		ys.resize(n);
+		parents.resize(n);
+		depths.resize(n);
+		child_offsets.assign(n + 1, 0);
+		children.resize(offset_rm[n]);
+		sorted_cells = cell_list;
+		sorted_nodes.resize(n);
+		for (int i = 0; i < n; i++) {
+			int k = order[i];
+			xs[i] = cell_list[k] % w;
+			ys[i] = cell_list[k] / w;
+			int p = parent_rm[k] >= 0 ? node_of[parent_rm[k]] : -1;
+			parents[i] = p;
+			depths[i] = p >= 0 ? depths[p] + 1 : 0;
+			sorted_nodes[k] = i;
+			//children of a node are contiguous in the breadth-first order
+			int count = offset_rm[k + 1] - offset_rm[k];
+			child_offsets[i + 1] = child_offsets[i] + count;
+		}
+		for (int i = 0; i < n; i++) {
+			if (parents[i] >= 0) children[child_offsets[parents[i]]++] = i;
+		}
+		for (int i = n; i > 0; i--) child_offsets[i] = child_offsets[i - 1];
+		child_offsets[0] = 0;
+
+		subtree_sizes.assign(n, 1);
+		for (int i = n - 1; i >= 0; i--) {
+			if (parents[i] >= 0) subtree_sizes[parents[i]] += subtree_sizes[i];
+		}
+	}
+
+	int CompactTree::size() const
+	{
+		return (int)xs.size();
+	}
+
+	int CompactTree::find(int x, int y) const
+	{
+		if (x < 0 || x >= width || y < 0 || y >= height) {
+			return -1;
+		}
+		int index = y * width + x;
+		auto it = std::lower_bound(sorted_cells.begin(), sorted_cells.end(), index);
+		if (it == sorted_cells.end() || *it != index) {
+			return -1;
+		}
+		return sorted_nodes[it - sorted_cells.begin()];
+	}
+
+	std::vector<int> CompactTree::leaves() const
+	{
+		std::vector<int> result;
+		for (int i = 0; i < size(); i++) {
+			if (child_offsets[i] == child_offsets[i + 1]) result.push_back(i);
+		}
+		return result;
+	}
+
+	std::vector<int> CompactTree::path_to_root(int i) const
+	{
+		if (i < 0 || i >= size()) {
+			throw std::invalid_argument("the node is out of the tree");
+		}
+		std::vector<int> path;
+		path.reserve(depths[i] + 1);
+		for (; i >= 0; i = parents[i]) path.push_back(i);
+		return path;
+	}
+
+	std::vector<Point> CompactTree::get_path(int x1, int y1, int x2, int y2) const
+	{
+		std::vector<Point> path;
+		int a = find(x1, y1);
+		int b = find(x2, y2);
+		if (a < 0 || b < 0) {
+			return path;
+		}
+		//climb up to the common ancestor
+		std::vector<int> from, to;
+		while (depths[a] > depths[b]) { from.push_back(a); a = parents[a]; }
+		while (depths[b] > depths[a]) { to.push_back(b); b = parents[b]; }
+		while (a != b) {
+			if (parents[a] < 0) {
+				return path;  //different roots
+			}
+			from.push_back(a); a = parents[a];
+			to.push_back(b); b = parents[b];
+		}
+		from.push_back(a);
+		path.reserve(from.size() + to.size());
+		for (int i : from) path.push_back(Point(xs[i], ys[i]));
+		for (auto it = to.rbegin(); it != to.rend(); ++it) path.push_back(Point(xs[*it], ys[*it]));
+		return path;
+	}
+
+	const std::vector<int>& CompactTree::get_x() const { return xs; }
+	const std::vector<int>& CompactTree::get_y() const { return ys; }
+	const std::vector<int>& CompactTree::get_parent() const { return parents; }
+	const std::vector<int>& CompactTree::get_depth() const { return depths; }
+	const std::vector<int>& CompactTree::get_subtree_size() const { return subtree_sizes; }
+	const std::vector<int>& CompactTree::get_child_offset() const { return child_offsets; }
+	const std::vector<int>& CompactTree::get_children() const { return children; }
+}
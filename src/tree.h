@@ -22,4 +22,40 @@ namespace lichtenberg {
 		std::vector<Leaf> get_leaves() const;
 	};
 
+	//tree of the broken cells in flat arrays, memory is proportional to the number of broken cells
+	//nodes are in breadth-first order(roots first, a parent comes before its children)
+	class CompactTree
+	{
+	private:
+		int width;
+		int height;
+		std::vector<int> xs, ys;
+		std::vector<int> parents;  //-1 for roots
+		std::vector<int> depths;  //0 for roots
+		std::vector<int> subtree_sizes;  //number of nodes under the node(including itself)
+		std::vector<int> child_offsets;  //children of node i are children[child_offsets[i]:child_offsets[i + 1]]
+		std::vector<int> children;
+		std::vector<int> sorted_cells;  //y * width + x of nodes, sorted(to find a node)
+		std::vector<int> sorted_nodes;  //the node of each sorted_cells
+
+	public:
+		CompactTree(const CellList2D& cells);
+
+		int size() const;
+		int find(int x, int y) const;  //index of the node of (x, y), -1 if it is not broken or insulated
+		std::vector<int> leaves() const;
+		//nodes from i up to its root
+		std::vector<int> path_to_root(int i) const;
+		//cells from (x1, y1) to (x2, y2) through their common ancestor, empty if they are not connected
+		std::vector<Point> get_path(int x1, int y1, int x2, int y2) const;
+
+		const std::vector<int>& get_x() const;
+		const std::vector<int>& get_y() const;
+		const std::vector<int>& get_parent() const;
+		const std::vector<int>& get_depth() const;
+		const std::vector<int>& get_subtree_size() const;
+		const std::vector<int>& get_child_offset() const;
+		const std::vector<int>& get_children() const;
+	};
+
 }
@@ -1,41 +1,60 @@
 #include "electricfield.h"
-#include <set>
+#include "threadpool.h"
+#include <algorithm>
+#include <cmath>
+#include <cstdint>
+#include <memory>
+#include <stdexcept>
 #include <tuple>
 
 
-std::vector<std::vector<float>> lichtenberg::util::make_electric_field(
+std::vector<float> lichtenberg::util::make_electric_field(
 	int width, int height, const std::vector<std::tuple<int, int, float>>& points,
-	int max_loop, float eps, float sor_coef)
+	int max_loop, float eps, float sor_coef, int num_threads, LaplaceSolver solver, LaplaceStats* stats)
 {
-	std::vector<std::vector<float>> cells;
-	std::set<std::tuple<int, int>> locked;
-	for (int y = 0; y < height; y++) {
-		std::vector<float> row(width, 0.0f);
-		cells.push_back(row);
+	if (width <= 0 || height <= 0) {
+		throw std::invalid_argument("The size of the field is invalid.");
 	}
+	const int w = width;
+	std::vector<double> cells((size_t)width * height, 0.0);
+	std::vector<uint8_t> locked((size_t)width * height, 0);
 	for (auto& p : points) {
 		auto [x, y, potential] = p;
-		std::tuple<int, int> xy = { x, y };
-		locked.insert(xy);
-		cells[y][x] = potential;
+		if (x < 0 || x >= width || y < 0 || y >= height) {
+			throw std::invalid_argument("The specified coordinate is invalid.");
+		}
+		locked[y * w + x] = 1;
+		cells[y * w + x] = potential;
+	}
+
+	//eps is relative to the largest fixed potential, so a scaled field runs the same iterations
+	double scale = 0.0;
+	for (auto& p : points) {
+		scale = std::max(scale, (double)std::fabs(std::get<2>(p)));
 	}
-	for (int i = 0; i < max_loop; i++) {
-		float err = 0.0f;
-		for (int y = 1; y < height - 1; y++) {
-			auto& yc = cells[y];
-			const auto& yp = cells[y + 1];
-			const auto& ym = cells[y - 1];
-			for (int x = 1; x < width - 1; x++) {
-				std::tuple<int, int> xy = { x, y };
-				if (locked.count(xy) == 1) continue;
-				float old_pot = yc[x];
-				float new_pot = (yc[x - 1] + yc[x + 1] + ym[x] + yp[x]) / 4.0f;
-				float diff = new_pot - old_pot;
-				yc[x] = old_pot + diff * sor_coef;
-				err += diff;
-			}
+	//nothing to solve if all potentials are 0, the free cells stay 0
+	LaplaceStats result = { 0, 0.0, true };
+	if (scale > 0.0) {
+		std::unique_ptr<ThreadPool> pool;
+		if (num_threads != 1) {
+			pool = std::make_unique<ThreadPool>(num_threads);
 		}
-		if (err < eps) break;
+		if (solver == LaplaceSolver::Multigrid) {
+			MultigridSolver multigrid;
+			result = multigrid.solve(cells, locked, width, height, eps * scale, max_loop, pool.get());
+		}
+		else if (solver == LaplaceSolver::RedBlackSOR || pool) {
+			//the rows of one color are independent
+			result = solve_laplace_redblack(cells, locked, width, height, sor_coef, eps * scale, max_loop, pool.get());
+		}
+		else {
+			result = solve_laplace_sor(cells, locked, width, height, sor_coef, eps * scale, max_loop);
+		}
+		result.residual /= scale;
 	}
-	return cells;
+	if (stats) *stats = result;
+
+	std::vector<float> field(cells.size());
+	std::transform(cells.begin(), cells.end(), field.begin(), [](double p) { return (float)p; });
+	return field;
 }
@@ -1,13 +1,22 @@
 #pragma once
 #include <vector>
+#include <tuple>
+#include "laplace.h"
 
 
 namespace lichtenberg
 {
 	namespace util
 	{
-		std::vector<std::vector<float>> make_electric_field(
+		//returns the potential of (width, height) cells in row-major order
+		//the points and the border cells keep their potential(the border is 0)
+		//eps: tolerance of the sum of |change| of a sweep(the residual for Multigrid)
+		//divided by the largest |potential| of the points, so it does not depend on the scale
+		//num_threads: threads of RedBlackSOR and Multigrid(0 means the number of hardware threads),
+		//SOR relaxes in lexicographic order with 1 thread, and in red-black order with the others
+		std::vector<float> make_electric_field(
 			int width, int height, const std::vector<std::tuple<int, int, float>>& points,
-			int max_loop = 1000, float eps = 1.0e-6, float sor_coef = 1.5);
+			int max_loop = 1000, float eps = 1.0e-6, float sor_coef = 1.5, int num_threads = 1,
+			LaplaceSolver solver = LaplaceSolver::SOR, LaplaceStats* stats = nullptr);
 	}
 }
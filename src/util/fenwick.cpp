@@ -0,0 +1,85 @@
+#include "fenwick.h"
+#include <algorithm>
+
+
+namespace lichtenberg {
+	namespace util {
+
+		FenwickTree::FenwickTree(size_t size)
+		{
+			reset(size);
+		}
+
+		void FenwickTree::reset(size_t size)
+		{
+			tree.assign(size + 1, 0.0);
+			values.assign(size, 0.0);
+		}
+
+		void FenwickTree::build(const std::vector<double>& weights, size_t size)
+		{
+			size = std::max(size, weights.size());
+			reset(size);
+			std::copy(weights.begin(), weights.end(), values.begin());
+			for (size_t i = 1; i <= size; i++) {
+				tree[i] += values[i - 1];
+				const size_t parent = i + (i & (~i + 1));
+				if (parent <= size) tree[parent] += tree[i];
+			}
+		}
+
+		void FenwickTree::set(size_t index, double weight)
+		{
+			const double delta = weight - values[index];
+			values[index] = weight;
+			const size_t n = values.size();
+			for (size_t i = index + 1; i <= n; i += i & (~i + 1)) {
+				tree[i] += delta;
+			}
+		}
+
+		double FenwickTree::get(size_t index) const
+		{
+			return values[index];
+		}
+
+		double FenwickTree::total() const
+		{
+			double sum = 0.0;
+			for (size_t i = values.size(); i > 0; i -= i & (~i + 1)) {
+				sum += tree[i];
+			}
+			return sum;
+		}
+
+		size_t FenwickTree::size() const
+		{
+			return values.size();
+		}
+
+		size_t FenwickTree::find(double u) const
+		{
+			const size_t n = values.size();
+			if (n == 0) return 0;
+			size_t step = 1;
+			while (step * 2 <= n) step *= 2;
+			size_t position = 0;
+			for (; step > 0; step /= 2) {
+				if (position + step <= n && tree[position + step] <= u) {
+					position += step;
+					u -= tree[position];
+				}
+			}
+			//the rounding errors of the sums may point out of the range or a zero weight
+			size_t index = std::min(position, n - 1);
+			if (values[index] > 0.0) return index;
+			for (size_t i = index; i > 0; i--) {
+				if (values[i - 1] > 0.0) return i - 1;
+			}
+			for (size_t i = index + 1; i < n; i++) {
+				if (values[i] > 0.0) return i;
+			}
+			return index;
+		}
+	}
+}
@@ -0,0 +1,35 @@
+#pragma once
+#include <vector>
+#include <cstddef>
+
+
+namespace lichtenberg {
+	namespace util {
+
+		/*
+			Fenwick tree(binary indexed tree) of non-negative weights
+			An index is picked with the probability proportional to its weight in O(log n),
+			and a weight is changed in O(log n).
+		*/
+		class FenwickTree
+		{
+		public:
+			explicit FenwickTree(size_t size = 0);
+			//all weights are 0
+			void reset(size_t size);
+			//weights[i] for i < weights.size(), and 0 for the rest(in O(n))
+			void build(const std::vector<double>& weights, size_t size = 0);
+			void set(size_t index, double weight);
+			double get(size_t index) const;
+			double total() const;
+			size_t size() const;
+			//the index i where sum(weights[0..i)) <= u < sum(weights[0..i])
+			//always returns an index of positive weight if there is one
+			size_t find(double u) const;
+
+		private:
+			std::vector<double> tree;  //1-based partial sums
+			std::vector<double> values;
+		};
+	}
+}
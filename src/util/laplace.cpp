@@ -0,0 +1,325 @@
+#include "laplace.h"
+#include <algorithm>
+#include <cmath>
+#include <stdexcept>
+
+
+namespace lichtenberg {
+	namespace util {
+
+		//grids with fewer rows are not worth waking up the threads
+		static const int MIN_PARALLEL_ROWS = 64;
+
+		//calls func(begin, end) for the rows [begin, end), in parallel if possible
+		template <typename F>
+		static void for_rows(ThreadPool* pool, int begin, int end, const F& func)
+		{
+			if (!pool || pool->size() == 1 || end - begin < MIN_PARALLEL_ROWS) {
+				func(begin, end);
+			}
+			else {
+				pool->parallel_for(end - begin, [&](int b, int e) { func(begin + b, begin + e); });
+			}
+		}
+
+		//sums per row in a fixed order, so the total is deterministic
+		static double sum_rows(const std::vector<double>& row_sum, int begin, int end)
+		{
+			double sum = 0.0;
+			for (int y = begin; y < end; y++) {
+				sum += row_sum[y];
+			}
+			return sum;
+		}
+
+		LaplaceStats solve_laplace_sor(std::vector<double>& phi, const std::vector<uint8_t>& lock,
+			int width, int height, double omega, double eps, int max_iteration)
+		{
+			return solve_laplace_sor_window(phi, lock, width, 1, 1, width - 1, height - 1, omega, eps, max_iteration);
+		}
+
+		LaplaceStats solve_laplace_sor_window(std::vector<double>& phi, const std::vector<uint8_t>& lock,
+			int width, int x0, int y0, int x1, int y1, double omega, double eps, int max_iteration)
+		{
+			const int w = width;
+			double* p = phi.data();
+			const uint8_t* l = lock.data();
+			LaplaceStats stats = { 0, 0.0, false };
+			for (int i = 0; i < max_iteration; i++) {
+				double err = 0.0;
+				for (int y = y0; y < y1; y++) {
+					for (int x = x0; x < x1; x++) {
+						const int index = y * w + x;
+						if (l[index]) continue;
+						double old_potential = p[index];
+						double new_potential = (p[index - 1] + p[index + 1] + p[index - w] + p[index + w]) / 4;
+						double diff = new_potential - old_potential;
+						p[index] = old_potential + omega * diff;
+						err += std::fabs(diff);
+					}
+				}
+				stats.iterations = i + 1;
+				stats.residual = err;
+				if (err < eps) {
+					stats.converged = true;
+					break;
+				}
+			}
+			return stats;
+		}
+
+		double laplace_ring_residual(const std::vector<double>& phi, const std::vector<uint8_t>& lock,
+			int width, int height, int x0, int y0, int x1, int y1)
+		{
+			const int w = width;
+			const double* p = phi.data();
+			const uint8_t* l = lock.data();
+			double result = 0.0;
+			auto check = [&](int x, int y) {
+				if (x < 1 || y < 1 || x >= width - 1 || y >= height - 1) return;
+				const int index = y * w + x;
+				if (l[index]) return;
+				double r = std::fabs(p[index - 1] + p[index + 1] + p[index - w] + p[index + w] - 4 * p[index]);
+				result = std::max(result, r);
+			};
+			for (int x = x0 - 1; x <= x1; x++) {
+				check(x, y0 - 1);
+				check(x, y1);
+			}
+			for (int y = y0; y < y1; y++) {
+				check(x0 - 1, y);
+				check(x1, y);
+			}
+			return result / 4;
+		}
+
+		LaplaceStats solve_laplace_redblack(std::vector<double>& phi, const std::vector<uint8_t>& lock,
+			int width, int height, double omega, double eps, int max_iteration, ThreadPool* pool)
+		{
+			const int w = width;
+			double* p = phi.data();
+			const uint8_t* l = lock.data();
+			std::vector<double> row_err(height, 0.0);
+			LaplaceStats stats = { 0, 0.0, false };
+			for (int i = 0; i < max_iteration; i++) {
+				std::fill(row_err.begin(), row_err.end(), 0.0);
+				//the cells of one color depend only on the other color
+				for (int color = 0; color < 2; color++) {
+					for_rows(pool, 1, height - 1, [&](int y0, int y1) {
+						for (int y = y0; y < y1; y++) {
+							double err = 0.0;
+							for (int x = 1 + ((y + color) & 1); x < w - 1; x += 2) {
+								const int index = y * w + x;
+								if (l[index]) continue;
+								double old_potential = p[index];
+								double new_potential = (p[index - 1] + p[index + 1] + p[index - w] + p[index + w]) / 4;
+								double diff = new_potential - old_potential;
+								p[index] = old_potential + omega * diff;
+								err += std::fabs(diff);
+							}
+							row_err[y] += err;
+						}
+					});
+				}
+				double err = sum_rows(row_err, 1, height - 1);
+				stats.iterations = i + 1;
+				stats.residual = err;
+				if (err < eps) {
+					stats.converged = true;
+					break;
+				}
+			}
+			return stats;
+		}
+
+		//the operator of all levels is the 5-point laplacian without the 1/h^2 factor
+		//solves (sum of neighbors) - 4x = f on the free cells
+
+		//red-black Gauss-Seidel
+		static void smooth(double* x, const double* f, const uint8_t* lock, int w, int h, int sweeps, ThreadPool* pool)
+		{
+			for (int s = 0; s < sweeps; s++) {
+				for (int color = 0; color < 2; color++) {
+					for_rows(pool, 1, h - 1, [&](int y0, int y1) {
+						for (int iy = y0; iy < y1; iy++) {
+							for (int ix = 1 + ((iy + color) & 1); ix < w - 1; ix += 2) {
+								const int index = iy * w + ix;
+								if (lock[index]) continue;
+								x[index] = (x[index - 1] + x[index + 1] + x[index - w] + x[index + w] - f[index]) / 4;
+							}
+						}
+					});
+				}
+			}
+		}
+
+		MultigridSolver::MultigridSolver()
+			: pool(nullptr)
+		{
+		}
+
+		//r = f - Ax, returns sum(|r|)
+		double MultigridSolver::residual(int n, const double* x)
+		{
+			Level& level = levels[n];
+			const int w = level.width;
+			const int h = level.height;
+			const double* f = level.f.data();
+			const uint8_t* lock = level.lock.data();
+			double* r = level.r.data();
+			row_sum.assign(h, 0.0);
+			for_rows(pool, 0, h, [&](int y0, int y1) {
+				for (int iy = y0; iy < y1; iy++) {
+					double sum = 0.0;
+					for (int ix = 0; ix < w; ix++) {
+						const int index = iy * w + ix;
+						if (iy == 0 || iy == h - 1 || ix == 0 || ix == w - 1 || lock[index]) {
+							r[index] = 0.0;
+							continue;
+						}
+						double v = f[index] - (x[index - 1] + x[index + 1] + x[index - w] + x[index + w] - 4 * x[index]);
+						r[index] = v;
+						sum += std::fabs(v);
+					}
+					row_sum[iy] = sum;
+				}
+			});
+			return sum_rows(row_sum, 0, h);
+		}
+
+		//the coarse cell (i, j) is placed on the fine cell (2i, 2j)
+		//it is fixed if the fine cell or its neighbors are fixed(or outside of the grid)
+		void MultigridSolver::build(const std::vector<uint8_t>& lock, int width, int height)
+		{
+			int w = width;
+			int h = height;
+			int n = 0;
+			while (true) {
+				if ((int)levels.size() <= n) levels.emplace_back();
+				Level& level = levels[n];
+				const size_t size = (size_t)w * h;
+				if (level.width != w || level.height != h || level.r.size() != size) {
+					level.width = w;
+					level.height = h;
+					level.x.assign(n == 0 ? 0 : size, 0.0);
+					level.f.assign(size, 0.0);
+					level.r.assign(size, 0.0);
+					level.lock.assign(size, 0);
+				}
+				if (n == 0) {
+					level.lock = lock;
+				}
+				else {
+					const Level& fine = levels[n - 1];
+					for (int iy = 0; iy < h; iy++) {
+						for (int ix = 0; ix < w; ix++) {
+							const int fx = ix * 2;
+							const int fy = iy * 2;
+							bool fixed = ix == 0 || iy == 0 || ix == w - 1 || iy == h - 1
+								|| fx >= fine.width - 1 || fy >= fine.height - 1;
+							//also fixed next to a fixed cell of the fine grid, a thin conductor
+							//vanishes on the coarse grid otherwise and the cycle diverges.
+							//this includes the border: the boundary of an even-sized grid lies between two coarse cells
+							for (int sy = fy - 1; sy <= fy + 1 && !fixed; sy++) {
+								for (int sx = fx - 1; sx <= fx + 1 && !fixed; sx++) {
+									fixed = fine.lock[sy * fine.width + sx] != 0;
+								}
+							}
+							level.lock[iy * w + ix] = fixed ? 1 : 0;
+						}
+					}
+				}
+				n++;
+				//the coarsest grid has one or two interior rows(or columns)
+				if (std::min(w, h) <= 4) break;
+				w = w / 2 + 1;
+				h = h / 2 + 1;
+			}
+			levels.resize(n);
+		}
+
+		void MultigridSolver::vcycle(int n, double* x)
+		{
+			Level& level = levels[n];
+			const int w = level.width;
+			const int h = level.height;
+			const uint8_t* lock = level.lock.data();
+			const double* f = level.f.data();
+
+			if (n == (int)levels.size() - 1) {
+				smooth(x, f, lock, w, h, 2 * std::max(w, h), pool);
+				return;
+			}
+
+			smooth(x, f, lock, w, h, 2, pool);
+			residual(n, x);
+
+			//full weighting, scaled by 4 for the doubled spacing
+			Level& coarse = levels[n + 1];
+			const int cw = coarse.width;
+			const int ch = coarse.height;
+			const double* r = level.r.data();
+			auto fine_r = [&](int fx, int fy) {
+				return (fx < w && fy < h) ? r[fy * w + fx] : 0.0;
+			};
+			for_rows(pool, 0, ch, [&](int y0, int y1) {
+				for (int iy = y0; iy < y1; iy++) {
+					for (int ix = 0; ix < cw; ix++) {
+						const int index = iy * cw + ix;
+						coarse.x[index] = 0.0;
+						if (coarse.lock[index]) {
+							coarse.f[index] = 0.0;
+							continue;
+						}
+						const int fx = ix * 2;
+						const int fy = iy * 2;
+						double v = 4 * fine_r(fx, fy)
+							+ 2 * (fine_r(fx - 1, fy) + fine_r(fx + 1, fy) + fine_r(fx, fy - 1) + fine_r(fx, fy + 1))
+							+ fine_r(fx - 1, fy - 1) + fine_r(fx + 1, fy - 1) + fine_r(fx - 1, fy + 1) + fine_r(fx + 1, fy + 1);
+						coarse.f[index] = v / 4;
+					}
+				}
+			});
+
+			vcycle(n + 1, coarse.x.data());
+
+			//bilinear interpolation of the correction
+			const double* e = coarse.x.data();
+			for_rows(pool, 1, h - 1, [&](int y0, int y1) {
+				for (int iy = y0; iy < y1; iy++) {
+					const int cy0 = iy / 2;
+					const int cy1 = (iy + 1) / 2;
+					for (int ix = 1; ix < w - 1; ix++) {
+						const int index = iy * w + ix;
+						if (lock[index]) continue;
+						const int cx0 = ix / 2;
+						const int cx1 = (ix + 1) / 2;
+						x[index] += (e[cy0 * cw + cx0] + e[cy0 * cw + cx1] + e[cy1 * cw + cx0] + e[cy1 * cw + cx1]) / 4;
+					}
+				}
+			});
+
+			smooth(x, f, lock, w, h, 2, pool);
+		}
+
+		LaplaceStats MultigridSolver::solve(std::vector<double>& phi, const std::vector<uint8_t>& lock,
+			int width, int height, double eps, int max_cycle, ThreadPool* pool_)
+		{
+			if (phi.size() != (size_t)width * height || lock.size() != phi.size()) {
+				throw std::invalid_argument("The size of the grid is invalid.");
+			}
+			pool = pool_;
+			build(lock, width, height);
+			LaplaceStats stats = { 0, 0.0, false };
+			stats.residual = residual(0, phi.data()) / 4;
+			while (stats.residual >= eps && stats.iterations < max_cycle) {
+				vcycle(0, phi.data());
+				stats.iterations++;
+				stats.residual = residual(0, phi.data()) / 4;
+			}
+			stats.converged = stats.residual < eps;
+			pool = nullptr;
+			return stats;
+		}
+	}
+}
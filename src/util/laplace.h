@@ -0,0 +1,74 @@
+#pragma once
+#include <vector>
+#include <cstdint>
+#include "threadpool.h"
+
+
+namespace lichtenberg {
+	namespace util {
+
+		enum class LaplaceSolver
+		{
+			SOR,			//successive over-relaxation
+			Multigrid,		//geometric multigrid(V-cycle), much faster on large grids
+			RedBlackSOR,	//successive over-relaxation in red-black order, runs in parallel
+		};
+
+		struct LaplaceStats {
+			int iterations;   //sweeps(SOR) or V-cycles(multigrid)
+			double residual;  //the convergence measure of the last iteration
+			bool converged;
+		};
+
+		/*
+			Solvers of the Laplace equation on a (width, height) grid in row-major order.
+			The border cells and the cells where lock != 0 keep their values(Dirichlet conditions).
+			phi is used as the initial guess.
+		*/
+
+		//successive over-relaxation in lexicographic order
+		//the residual is the sum of |update| in a sweep(before the relaxation factor is applied)
+		LaplaceStats solve_laplace_sor(std::vector<double>& phi, const std::vector<uint8_t>& lock,
+			int width, int height, double omega, double eps, int max_iteration);
+
+		//the same as above, but only the cells in [x0, x1) x [y0, y1) are relaxed
+		LaplaceStats solve_laplace_sor_window(std::vector<double>& phi, const std::vector<uint8_t>& lock,
+			int width, int x0, int y0, int x1, int y1, double omega, double eps, int max_iteration);
+
+		//max(|laplacian|) / 4 over the free cells just outside of [x0, x1) x [y0, y1)
+		double laplace_ring_residual(const std::vector<double>& phi, const std::vector<uint8_t>& lock,
+			int width, int height, int x0, int y0, int x1, int y1);
+
+		//successive over-relaxation in red-black order, rows are split across `pool`(nullptr: single thread)
+		//the result does not depend on the number of threads
+		LaplaceStats solve_laplace_redblack(std::vector<double>& phi, const std::vector<uint8_t>& lock,
+			int width, int height, double omega, double eps, int max_iteration, ThreadPool* pool = nullptr);
+
+		//geometric multigrid(V-cycles)
+		//the residual is sum(|laplacian|) / 4 over the free cells, the same scale as the SOR measure
+		class MultigridSolver
+		{
+		public:
+			MultigridSolver();
+			LaplaceStats solve(std::vector<double>& phi, const std::vector<uint8_t>& lock,
+				int width, int height, double eps, int max_cycle, ThreadPool* pool = nullptr);
+
+		private:
+			struct Level {
+				int width;
+				int height;
+				std::vector<double> x;  //correction(unused on the finest level)
+				std::vector<double> f;  //right hand side
+				std::vector<double> r;  //residual
+				std::vector<uint8_t> lock;
+			};
+			std::vector<Level> levels;
+			std::vector<double> row_sum;
+			ThreadPool* pool;
+
+			void build(const std::vector<uint8_t>& lock, int width, int height);
+			void vcycle(int level, double* x);
+			double residual(int level, const double* x);
+		};
+	}
+}
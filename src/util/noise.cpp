@@ -7,6 +7,7 @@
 
 #include "noise.h"
 #include <math.h>
+#include <algorithm>
 
 namespace lichtenberg {
 	namespace util {
@@ -68,5 +69,84 @@ namespace lichtenberg {
 			return total;
 		}
 
+		//weight of b in cosine_interpolate(a, b, x)
+		static double cosine_weight(double x)
+		{
+			double ft = x * 3.141592653589793;
+			return (1 - cos(ft)) * 0.5;
+		}
+
+		static double mix(double a, double b, double f)
+		{
+			return a * (1 - f) + b * f;
+		}
+
+		//lattice coordinate and weight of each cell on an axis(the same values as interpolate())
+		static void make_axis(int n, float scale, int frequency, std::vector<int>& lattice, std::vector<double>& weight)
+		{
+			lattice.resize(n);
+			weight.resize(n);
+			for (int i = 0; i < n; i++) {
+				double c = (double)(i / scale) * frequency;
+				int ci = int(c);
+				lattice[i] = ci;
+				weight[i] = cosine_weight(ci - c);
+			}
+		}
+
+		void noise_map(int width, int height, float scale, double persistence, int octaves,
+			std::vector<double>& dst)
+		{
+			dst.assign((size_t)width * height, 0.0);
+			std::vector<int> xi, yi, nodes, index;
+			std::vector<double> fx, fy, row0, row1;
+			for (int i = 0; i < octaves; i++) {
+				int frequency = 1 << i;
+				double amplitude = pow(persistence, i);
+				make_axis(width, scale, frequency, xi, fx);
+				make_axis(height, scale, frequency, yi, fy);
+
+				//lattice columns used by the cells(xi and xi + 1, sorted), xi + 1 follows xi in them
+				nodes.clear();
+				for (int x = 0; x < width; x++) {
+					nodes.push_back(xi[x]);
+					nodes.push_back(xi[x] + 1);
+				}
+				std::sort(nodes.begin(), nodes.end());
+				nodes.erase(std::unique(nodes.begin(), nodes.end()), nodes.end());
+				index.resize(width);
+				for (int x = 0; x < width; x++) {
+					index[x] = int(std::lower_bound(nodes.begin(), nodes.end(), xi[x]) - nodes.begin());
+				}
+
+				//smooth() on the lattice rows yi and yi + 1 of the current cell row
+				const int n = (int)nodes.size();
+				row0.resize(n);
+				row1.resize(n);
+				bool valid = false;
+				int current = 0;
+				for (int y = 0; y < height; y++) {
+					if (!valid || yi[y] != current) {
+						if (valid && yi[y] == current + 1) {
+							row0.swap(row1);
+						}
+						else {
+							for (int j = 0; j < n; j++) row0[j] = smooth(nodes[j], yi[y]);
+						}
+						for (int j = 0; j < n; j++) row1[j] = smooth(nodes[j], yi[y] + 1);
+						current = yi[y];
+						valid = true;
+					}
+					double* ptr = dst.data() + (size_t)y * width;
+					for (int x = 0; x < width; x++) {
+						int k = index[x];
+						double u1 = mix(row0[k], row0[k + 1], fx[x]);
+						double u2 = mix(row1[k], row1[k + 1], fx[x]);
+						ptr[x] = ptr[x] + mix(u1, u2, fy[y]) * amplitude;
+					}
+				}
+			}
+		}
+
 	}
-}
\ No newline at end of file
+}
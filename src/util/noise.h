@@ -6,10 +6,15 @@
 */
 
 #pragma once
+#include <vector>
 
 namespace lichtenberg {
 	namespace util {
 		void noise_init(int seed);
 		extern double noise(double x, double y, double persistence, int octaves);
+		//noise(x / scale, y / scale, persistence, octaves) of all cells(row-major, width * height)
+		//the values on the lattice are shared by neighbor cells, so it is much faster than noise() of each cell
+		void noise_map(int width, int height, float scale, double persistence, int octaves,
+			std::vector<double>& dst);
 	}
 }
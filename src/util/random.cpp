@@ -0,0 +1,82 @@
+#include "random.h"
+#include <mutex>
+
+
+namespace lichtenberg {
+	namespace util {
+
+		static inline uint64_t rotl(uint64_t x, int k)
+		{
+			return (x << k) | (x >> (64 - k));
+		}
+
+		static uint64_t splitmix64(uint64_t& x)
+		{
+			uint64_t z = (x += 0x9e3779b97f4a7c15ULL);
+			z = (z ^ (z >> 30)) * 0xbf58476d1ce4e5b9ULL;
+			z = (z ^ (z >> 27)) * 0x94d049bb133111ebULL;
+			return z ^ (z >> 31);
+		}
+
+		Random::Random(uint64_t seed_)
+		{
+			seed(seed_);
+		}
+
+		void Random::seed(uint64_t seed_)
+		{
+			uint64_t x = seed_;
+			for (int i = 0; i < 4; i++) {
+				state[i] = splitmix64(x);
+			}
+			position = BLOCK_SIZE;
+		}
+
+		uint64_t Random::next()
+		{
+			uint64_t* s = state;
+			const uint64_t result = rotl(s[1] * 5, 7) * 9;
+			const uint64_t t = s[1] << 17;
+			s[2] ^= s[0];
+			s[3] ^= s[1];
+			s[1] ^= s[2];
+			s[0] ^= s[3];
+			s[2] ^= t;
+			s[3] = rotl(s[3], 45);
+			return result;
+		}
+
+		double Random::uniform()
+		{
+			if (position == BLOCK_SIZE) {
+				refill();
+			}
+			return block[position++];
+		}
+
+		void Random::refill()
+		{
+			//53 bits -> [0.0, 1.0)
+			const double scale = 1.0 / 9007199254740992.0;
+			for (int i = 0; i < BLOCK_SIZE; i++) {
+				block[i] = (double)(next() >> 11) * scale;
+			}
+			position = 0;
+		}
+
+		static std::mutex default_seed_mutex;
+		static Random default_seed_source(0);
+
+		void set_default_seed(uint64_t seed)
+		{
+			std::lock_guard<std::mutex> lock(default_seed_mutex);
+			default_seed_source.seed(seed);
+		}
+
+		uint64_t next_default_seed()
+		{
+			std::lock_guard<std::mutex> lock(default_seed_mutex);
+			return default_seed_source.next();
+		}
+	}
+}
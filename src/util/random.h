@@ -0,0 +1,33 @@
+#pragma once
+#include <cstdint>
+
+
+namespace lichtenberg {
+	namespace util {
+
+		/*
+			xoshiro256** generator
+			http://prng.di.unimi.it/
+			Uniform numbers are generated in blocks and handed out one by one.
+		*/
+		class Random
+		{
+		public:
+			explicit Random(uint64_t seed = 0);
+			void seed(uint64_t seed);
+			uint64_t next();
+			double uniform();  //[0.0, 1.0)
+
+		private:
+			static const int BLOCK_SIZE = 64;
+			uint64_t state[4];
+			double block[BLOCK_SIZE];
+			int position;
+			void refill();
+		};
+
+		//seed sequence for instances which are not seeded explicitly (thread-safe)
+		void set_default_seed(uint64_t seed);
+		uint64_t next_default_seed();
+	}
+}
@@ -0,0 +1,104 @@
+#include "threadpool.h"
+#include <algorithm>
+
+
+namespace lichtenberg {
+	namespace util {
+
+		int default_thread_count()
+		{
+			unsigned int n = std::thread::hardware_concurrency();
+			return n == 0 ? 1 : (int)n;
+		}
+
+		ThreadPool::ThreadPool(int num_threads_)
+			: num_threads(num_threads_ > 0 ? num_threads_ : default_thread_count()),
+			generation(0), stop(false), task(nullptr), task_n(0), task_chunks(0), pending(0)
+		{
+			//worker 0 is the calling thread
+			for (int i = 1; i < num_threads; i++) {
+				workers.emplace_back(&ThreadPool::worker_loop, this, i);
+			}
+		}
+
+		ThreadPool::~ThreadPool()
+		{
+			{
+				std::lock_guard<std::mutex> lock(mutex);
+				stop = true;
+			}
+			cv_start.notify_all();
+			for (auto& t : workers) {
+				t.join();
+			}
+		}
+
+		int ThreadPool::size() const
+		{
+			return num_threads;
+		}
+
+		void ThreadPool::parallel_for(int n, const Task& task_)
+		{
+			if (n <= 0) return;
+			int chunks = std::min(n, num_threads);
+			if (chunks == 1) {
+				task_(0, n);
+				return;
+			}
+			{
+				std::lock_guard<std::mutex> lock(mutex);
+				task = &task_;
+				task_n = n;
+				task_chunks = chunks;
+				pending = chunks - 1;
+				error = nullptr;
+				generation++;
+			}
+			cv_start.notify_all();
+			run_chunk(0);
+			std::exception_ptr e;
+			{
+				std::unique_lock<std::mutex> lock(mutex);
+				cv_done.wait(lock, [this] { return pending == 0; });
+				task = nullptr;
+				e = error;
+				error = nullptr;
+			}
+			if (e) {
+				std::rethrow_exception(e);
+			}
+		}
+
+		void ThreadPool::worker_loop(int index)
+		{
+			unsigned long long seen = 0;
+			std::unique_lock<std::mutex> lock(mutex);
+			while (true) {
+				cv_start.wait(lock, [&] { return stop || generation != seen; });
+				if (stop) return;
+				seen = generation;
+				if (index >= task_chunks) continue;  //not needed for this task
+				lock.unlock();
+				run_chunk(index);
+				lock.lock();
+				if (--pending == 0) {
+					cv_done.notify_one();
+				}
+			}
+		}
+
+		void ThreadPool::run_chunk(int index)
+		{
+			int begin = (int)((long long)task_n * index / task_chunks);
+			int end = (int)((long long)task_n * (index + 1) / task_chunks);
+			try {
+				(*task)(begin, end);
+			}
+			catch (...) {
+				std::lock_guard<std::mutex> lock(mutex);
+				if (!error) error = std::current_exception();
+			}
+		}
+	}
+}
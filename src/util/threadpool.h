@@ -0,0 +1,54 @@
+#pragma once
+#include <condition_variable>
+#include <exception>
+#include <functional>
+#include <mutex>
+#include <thread>
+#include <vector>
+
+
+namespace lichtenberg {
+	namespace util {
+
+		//returns the number of hardware threads (at least 1)
+		int default_thread_count();
+
+		/*
+			A minimal fork-join thread pool.
+			parallel_for() splits [0, n) into contiguous chunks, one chunk per thread,
+			and blocks until all chunks are done. The calling thread runs the first chunk.
+			The chunk boundaries depend only on n and size(), so the work partition is deterministic.
+			A pool must not be used from several threads at the same time.
+		*/
+		class ThreadPool
+		{
+		public:
+			typedef std::function<void(int, int)> Task;  //(begin, end)
+
+			explicit ThreadPool(int num_threads = 0);  //0 means default_thread_count()
+			ThreadPool(const ThreadPool&) = delete;
+			ThreadPool& operator =(const ThreadPool&) = delete;
+			~ThreadPool();
+
+			int size() const;
+			void parallel_for(int n, const Task& task);
+
+		private:
+			int num_threads;
+			std::vector<std::thread> workers;
+			std::mutex mutex;
+			std::condition_variable cv_start;
+			std::condition_variable cv_done;
+			unsigned long long generation;
+			bool stop;
+			const Task* task;
+			int task_n;
+			int task_chunks;
+			int pending;
+			std::exception_ptr error;
+
+			void worker_loop(int index);
+			void run_chunk(int index);
+		};
+	}
+}
@@ -0,0 +1,37 @@
+import unittest
+import numpy as np
+import lichtenberg as lb
+from lichtenberg.archive import gray, mono
+
+
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        lb.set_random_seed(0)
+        self.sim = lb.Simulator(30, 20)
+        self.sim.breakdown(15, 10)
+        self.sim.simulate(max_loop=8)
+
+    def test_mono(self):
+        cells = self.sim.cells
+        image = np.asarray(mono(cells))
+        self.assertEqual(image.shape, (20, 30))
+        self.assertTrue(np.array_equal(image == 255, cells.broken))
+
+    def test_gray(self):
+        cells = self.sim.cells
+        gamma, scale = 0.5, 1.2
+        image = np.asarray(gray(cells, gamma=gamma, scale=scale))
+        c_max = cells.get_max_count()
+        for y in range(cells.height):
+            for x in range(cells.width):
+                expected = 0
+                if cells.get_broken(x, y):
+                    k = (cells.get_count(x, y) / c_max) ** gamma * scale
+                    expected = min(int(255 * k), 255)
+                self.assertEqual(image[y, x], expected)
+
+    def test_gray_without_simulation(self):
+        cells = lb.CellList2D(4, 4)
+        cells.set_broken(1, 1)
+        image = np.asarray(gray(cells))
+        self.assertEqual(image.max(), 0)
@@ -0,0 +1,92 @@
+import unittest
+import numpy as np
+import lichtenberg as lb
+
+
+class TestCellList2D(unittest.TestCase):
+    def setUp(self):
+        lb.set_random_seed(0)
+        self.sim = lb.Simulator(20, 10)
+        self.sim.breakdown(10, 5)
+        self.sim.simulate(max_loop=5)
+
+    def test_views_match_accessors(self):
+        cells = self.sim.cells
+        broken, count, direction = cells.broken, cells.count, cells.direction
+        self.assertEqual(broken.shape, (10, 20))
+        for y in range(cells.height):
+            for x in range(cells.width):
+                self.assertEqual(broken[y, x], cells.get_broken(x, y))
+                self.assertEqual(count[y, x], cells.get_count(x, y))
+                self.assertEqual(direction[y, x], int(cells.get_dir(x, y)))
+
+    def test_structured_array(self):
+        cells = self.sim.cells
+        records = np.asarray(cells)
+        self.assertEqual(records.shape, (10, 20))
+        self.assertTrue(np.array_equal(records['broken'], cells.broken))
+        self.assertTrue(np.array_equal(records['count'], cells.count))
+        self.assertFalse(records.flags.writeable)
+
+    def test_write_through(self):
+        sim = lb.Simulator(20, 10)
+        cells = sim.cells
+        cells.insulated[0, 1] = True
+        cells.broken[0, 1] = True
+        self.assertTrue(cells.get_insulated(1, 0))
+        self.assertTrue(cells.get_broken(1, 0))
+        with self.assertRaises(ValueError):
+            cells.direction[0, 0] = 1
+
+    def test_read_only_while_growing(self):
+        # the simulator would not grow the cells written through the views
+        sim = lb.Simulator(20, 10)
+        sim.breakdown(10, 5)
+        sim.step(3)
+        cells = sim.cells
+        for view in (cells.broken, cells.insulated):
+            self.assertFalse(view.flags.writeable)
+            with self.assertRaises(ValueError):
+                view[0, 0] = True
+        self.assertTrue(cells.count.flags.writeable)
+        sim.breakdown(0, 0)
+        sim.step(20)
+        self.assertTrue(cells.get_broken(1, 0) or cells.get_broken(0, 1))
+        # the growth is reset by insulate()
+        sim.insulate(19, 9)
+        self.assertTrue(sim.cells.broken.flags.writeable)
+        sim.cells.broken[0, 19] = True
+        sim.step(20)
+        self.assertTrue(sim.cells.get_broken(18, 0) or sim.cells.get_broken(19, 1))
+        self.assertFalse(sim.cells.broken.flags.writeable)
+
+    def test_view_keeps_owner_alive(self):
+        broken = self.sim.cells.broken
+        expected = broken.copy()
+        del self.sim
+        self.assertTrue(np.array_equal(broken, expected))
+
+    def test_trace(self):
+        cells = self.sim.cells
+        tree = lb.Tree(cells)
+        for y, x in zip(*np.nonzero(cells.broken)):
+            path = cells.trace(int(x), int(y))
+            self.assertEqual(path[0], (x, y))
+            self.assertEqual(path[-1], (10, 5))
+            if len(path) > 1:
+                self.assertEqual(path[::-1], tree.get_path(10, 5, int(x), int(y)))
+        self.assertEqual(cells.trace(0, 0), [])
+        with self.assertRaises(ValueError):
+            cells.trace(20, 0)
+        # directions which never reach a base cell
+        cells.set_broken(0, 0)
+        cells.set_broken(1, 0)
+        cells.set_dir(0, 0, lb.Direction.Right)
+        cells.set_dir(1, 0, lb.Direction.Left)
+        with self.assertRaises(RuntimeError):
+            cells.trace(0, 0)
+
+    def test_empty(self):
+        cells = lb.CellList2D()
+        self.assertEqual(cells.broken.shape, (0, 0))
+        self.assertEqual(np.asarray(cells).shape, (0, 0))
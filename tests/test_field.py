@@ -0,0 +1,124 @@
+import unittest
+import numpy as np
+import lichtenberg as lb
+from lichtenberg import field as lbf
+from lichtenberg.field import ElectricField
+
+
+class TestElectricFieldObject(unittest.TestCase):
+    def setUp(self):
+        lbf.clear_cache()
+        self.points = [(10, 10, 1.0), (60, 50, -1.0), (20, 40, 0.5)]
+        self.options = dict(max_loop=10000, eps=-1.0, solver=lb.DBMSolver.Multigrid)
+
+    def test_potential(self):
+        field = ElectricField(80, 70, self.points)
+        expected = lb.make_electric_field(80, 70, self.points, solver=lb.DBMSolver.Multigrid, as_array=True)
+        self.assertTrue(np.array_equal(field.potential, expected))
+        self.assertFalse(field.potential.flags.writeable)
+        self.assertEqual(np.asarray(field).shape, (70, 80))
+        # a cell given twice takes the last potential
+        field = ElectricField(80, 70, [(5, 5, 1.0), (5, 5, 0.25)])
+        self.assertEqual(field.points, [(5, 5, 0.25)])
+        self.assertEqual(field.potential[5, 5], 0.25)
+        with self.assertRaises(ValueError):
+            ElectricField(80, 70, [(80, 0, 1.0)])
+
+    def test_cache(self):
+        field = ElectricField(80, 70, self.points)
+        other = ElectricField(80, 70, list(reversed(self.points)))
+        self.assertIs(field.potential, other.potential)
+        self.assertIsNot(field.potential, ElectricField(80, 70, self.points, sor_coef=1.8).potential)
+        lbf.set_cache_size(1)
+        ElectricField(80, 70, self.points[:2]).potential
+        self.assertIsNot(field.potential, ElectricField(80, 70, self.points).potential)
+        lbf.set_cache_size(16)
+
+    def test_cache_scaled(self):
+        field = ElectricField(80, 70, self.points)
+        potential = field.potential
+        # a field with the potentials scaled rescales the cached solution
+        info = lbf.cache_info()
+        scaled = ElectricField(80, 70, [(x, y, p * 2.5) for x, y, p in self.points]).potential
+        self.assertEqual(lbf.cache_info().hits, info.hits + 1)
+        self.assertEqual(lbf.cache_info().misses, info.misses)
+        self.assertTrue(np.allclose(scaled, potential * 2.5))
+        self.assertFalse(scaled.flags.writeable)
+        self.assertIs(ElectricField(80, 70, self.points).potential, potential)
+        # the sign or the ratio of the potentials changes the key
+        ElectricField(80, 70, [(x, y, -p) for x, y, p in self.points]).potential
+        ElectricField(80, 70, self.points[:2] + [(20, 40, 0.25)]).potential
+        self.assertEqual(lbf.cache_info().misses, info.misses + 2)
+        # the same as solving the scaled field, the tolerance of the solver is relative
+        points = [(x, y, p * 2.5) for x, y, p in self.points]
+        for options in (dict(), dict(solver=lb.DBMSolver.SOR, max_loop=5000, eps=1.0e-4)):
+            lbf.clear_cache()
+            ElectricField(80, 70, self.points, **options).potential
+            rescaled = ElectricField(80, 70, points, **options).potential
+            lbf.clear_cache()
+            solved = ElectricField(80, 70, points, **options).potential
+            self.assertLess(np.abs(rescaled - solved).max(), 1.0e-6)
+
+    def test_superposition(self):
+        field = ElectricField(80, 70, self.points, **self.options)
+        scaled = ElectricField(80, 70, [(x, y, p * 0.3) for x, y, p in self.points], **self.options)
+        self.assertLess(np.abs((field * 0.3).potential - scaled.potential).max(), 1.0e-5)
+        self.assertEqual((0.3 * field).points, scaled.points)
+
+        other = ElectricField(80, 70, [(10, 10, 0.0), (60, 50, 2.0), (20, 40, 1.0)], **self.options)
+        total = ElectricField(80, 70, [(10, 10, 1.0), (60, 50, 1.0), (20, 40, 1.5)], **self.options)
+        self.assertEqual((field + other).points, total.points)
+        self.assertLess(np.abs((field + other).potential - total.potential).max(), 1.0e-5)
+        self.assertLess(np.abs((field - field).potential).max(), 1.0e-6)
+        # the sum is not a solution for different fixed cells
+        with self.assertRaises(ValueError):
+            field + ElectricField(80, 70, self.points[:2], **self.options)
+        with self.assertRaises(ValueError):
+            field + ElectricField(81, 70, self.points, **self.options)
+        # nor for other options
+        with self.assertRaises(ValueError):
+            field + ElectricField(80, 70, self.points, **dict(self.options, max_loop=10))
+        with self.assertRaises(ValueError):
+            field - ElectricField(80, 70, self.points, **dict(self.options, solver=lb.DBMSolver.SOR))
+
+    def test_fft(self):
+        method = lbf.FieldMethod.FFT
+        points = [(x, 30 + x // 4, 1.0 - x / 100) for x in range(10, 70)]
+        field = ElectricField(80, 70, points, method=method, radius=20.0)
+        potential = field.potential
+        self.assertEqual(potential.shape, (70, 80))
+        self.assertEqual(potential.dtype, np.float32)
+        for x, y, p in points:
+            self.assertEqual(potential[y, x], np.float32(p))
+        # about the given potential next to the cells, 0 beyond radius
+        for x, y, p in points[5:-5]:
+            self.assertLess(abs(potential[y - 1, x] - p), 0.1)
+        self.assertTrue((potential[:8] == 0.0).all())
+        self.assertTrue((potential[:, 70 + 20:] == 0.0).all())
+        # convolution of the charges equals the direct sum
+        xs = np.array([x for x, _, _ in points])
+        ys = np.array([y for _, y, _ in points])
+        values = np.array([p for _, _, p in points])
+
+        def kernel(dx, dy):
+            return np.maximum(np.log(20.0 / np.maximum(np.hypot(dx, dy), 0.5)), 0.0)
+        unit = kernel(xs[:, None] - xs, ys[:, None] - ys).sum(axis=1)
+        gy, gx = np.mgrid[0:70, 0:80]
+        direct = sum(v / u * kernel(gx - x, gy - y) for x, y, v, u in zip(xs, ys, values, unit))
+        direct[ys, xs] = values
+        self.assertLess(np.abs(potential - direct).max(), 1.0e-5)
+        # linear as the solved field
+        self.assertLess(np.abs((field * 2.0).potential
+                               - ElectricField(80, 70, (field * 2.0).points, method=method, radius=20.0).potential
+                               ).max(), 1.0e-5)
+        with self.assertRaises(ValueError):
+            field + ElectricField(80, 70, points)
+        with self.assertRaises(ValueError):
+            ElectricField(80, 70, points, method=method, radius=0.0)
+        with self.assertRaises(ValueError):
+            ElectricField(80, 70, points, method=method, radius=0.5)
+        self.assertTrue(np.isfinite(ElectricField(80, 70, points, method=method, radius=0.6).potential).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
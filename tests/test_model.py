@@ -1,7 +1,47 @@
+import math
 import unittest
+import numpy as np
 import lichtenberg as lb
 
 
+def make_dbm_grid(width: int, height: int):
+    # attracted to the bottom row
+    grid = [[lb.DBMCell() for _ in range(width + 2)] for _ in range(height + 2)]
+    for y in range(height + 2):
+        grid[y][0].lock = grid[y][width + 1].lock = True
+    for x in range(width + 2):
+        grid[0][x].lock = grid[height + 1][x].lock = True
+        grid[height + 1][x].potential = 1.0
+    return grid
+
+
+def value_noise(x: float, y: float, seed: int, persistence: float, octaves: int) -> float:
+    # port of util::noise() in src/util/noise.cpp, evaluated cell by cell
+    def rand(ix, iy):
+        n = (ix + iy * 57 + seed) & 0xffffffff
+        n = ((n << 13) & 0xffffffff) ^ n
+        n = n - (1 << 32) if n & 0x80000000 else n
+        return 1.0 - ((n * (n * n * 15731 + 789221) + 1376312589) & 0x7fffffff) / 1073741824.0
+
+    def smooth(ix, iy):
+        corners = (rand(ix - 1, iy - 1) + rand(ix + 1, iy - 1) + rand(ix - 1, iy + 1) + rand(ix + 1, iy + 1)) / 16
+        sides = (rand(ix - 1, iy) + rand(ix + 1, iy) + rand(ix, iy - 1) + rand(ix, iy + 1)) / 8
+        return corners + sides + rand(ix, iy) / 4
+
+    def cosine_interpolate(a, b, t):
+        f = (1 - math.cos(t * 3.141592653589793)) * 0.5
+        return a * (1 - f) + b * f
+
+    total = 0.0
+    for i in range(octaves):
+        fx, fy = x * (1 << i), y * (1 << i)
+        xi, yi = int(fx), int(fy)
+        u1 = cosine_interpolate(smooth(xi, yi), smooth(xi + 1, yi), xi - fx)
+        u2 = cosine_interpolate(smooth(xi, yi + 1), smooth(xi + 1, yi + 1), xi - fx)
+        total += cosine_interpolate(u1, u2, yi - fy) * persistence ** i
+    return total
+
+
 class TestForImport(unittest.TestCase):
     def setUp(self):
         pass
@@ -18,6 +58,21 @@ class TestForImport(unittest.TestCase):
         sim.breakdown(0, 0)
         sim.simulate()
 
+    def test_value_noise_map(self):
+        # the map built by util::noise_map equals noise() of each cell
+        width, height, seed = 23, 17, 7
+        for scale, persistence, octaves in ((1.0, 0.5, 5), (6.5, 0.5, 5), (0.7, 0.8, 3)):
+            model = lb.ValueNoiseBreakModel(width, height, min_guarantee=0.05, seed=seed,
+                                            scale=scale, persistence=persistence, octaves=octaves)
+            min_guarantee = float(np.float32(0.05))
+            for y in range(height):
+                for x in range(width):
+                    # x / scale is divided in float
+                    f = value_noise(float(np.float32(x) / np.float32(scale)), float(np.float32(y) / np.float32(scale)),
+                                    seed, float(np.float32(persistence)), octaves)
+                    expected = np.float32((f + 1.0) / 2.0 * (1.0 - min_guarantee) + min_guarantee)
+                    self.assertAlmostEqual(model.get(x, y), float(expected), places=6)
+
     def test_value_noise_model_invalid(self):
         with self.assertRaises(ValueError):
             lb.ValueNoiseBreakModel(0, 0)
@@ -33,6 +88,191 @@ class TestForImport(unittest.TestCase):
         sim.breakdown(0, 0)
         sim.simulate()
 
+    def test_seed(self):
+        def run(seed):
+            model = lb.ValueNoiseBreakModel(20, 20)
+            model.set_seed(seed)
+            sim = lb.Simulator(20, 20, model)
+            sim.breakdown(10, 10)
+            sim.simulate(max_loop=5)
+            return sim.cells.broken.copy()
+        self.assertTrue((run(1) == run(1)).all())
+        self.assertFalse((run(1) == run(2)).all())
+
+    def test_dbm_solver(self):
+        width, height = 30, 20
+
+        def run(solver):
+            model = lb.DielectricBreakModel(width, height, make_dbm_grid(width, height), solver=solver)
+            sim = lb.Simulator(width, height, model)
+            sim.breakdown(width // 2, 0)
+            sim.simulate(max_loop=1)
+            return model
+
+        sor = run(lb.DBMSolver.SOR)
+        multigrid = run(lb.DBMSolver.Multigrid)
+        self.assertLess(multigrid.last_residual, 1.0e-3)
+        self.assertGreater(multigrid.last_iterations, 0)
+        self.assertLess(multigrid.last_iterations, sor.last_iterations)
+        for y in range(height + 2):
+            for x in range(width + 2):
+                self.assertAlmostEqual(sor.get_potential(x, y), multigrid.get_potential(x, y), delta=0.01)
+
+    def test_dbm_multigrid_sizes(self):
+        # the boundary of even-sized grids is not on a coarse cell
+        for width in (62, 64, 80):
+            for x, y in ((width // 2, 0), (width // 2, width // 2), (1, width - 1)):
+                model = lb.DielectricBreakModel(width, width, make_dbm_grid(width, width),
+                                                solver=lb.DBMSolver.Multigrid)
+                sim = lb.Simulator(width, width, model)
+                sim.breakdown(x, y)
+                sim.simulate(max_loop=1)
+                self.assertLess(model.last_residual, 1.0e-3)
+
+    def test_dbm_threads(self):
+        # the result does not depend on the number of threads
+        width, height = 80, 80
+
+        def run(solver, num_threads):
+            model = lb.DielectricBreakModel(width, height, make_dbm_grid(width, height),
+                                            solver=solver, num_threads=num_threads)
+            model.set_seed(1)
+            sim = lb.Simulator(width, height, model)
+            sim.breakdown(width // 2, 0)
+            sim.simulate(max_loop=10)
+            potentials = [model.get_potential(x, y) for y in range(height + 2) for x in range(width + 2)]
+            return potentials, sim.cells.broken.copy()
+
+        for solver in [lb.DBMSolver.RedBlackSOR, lb.DBMSolver.Multigrid]:
+            p1, b1 = run(solver, 1)
+            p3, b3 = run(solver, 3)
+            self.assertEqual(p1, p3)
+            self.assertTrue((b1 == b3).all())
+
+    def test_dbm_incremental(self):
+        width, height = 60, 60
+        model = lb.DielectricBreakModel(width, height, make_dbm_grid(width, height),
+                                        solver=lb.DBMSolver.Multigrid, incremental=True)
+        sim = lb.Simulator(width, height, model)
+        sim.breakdown(width // 2, 0)
+
+        # stop right after the model is updated
+        def loop(current_loop, max_loop, cells):
+            return current_loop >= 100
+        sim.simulate(max_loop=1000, callback_on_loop=loop)
+        cells = sim.cells
+
+        # the same cells solved on the whole grid
+        reference = lb.DielectricBreakModel(width, height, make_dbm_grid(width, height),
+                                            solver=lb.DBMSolver.Multigrid)
+        sim = lb.Simulator(width, height, reference)
+        sim.cells = cells
+        sim.simulate(max_loop=1)
+        for y in range(height + 2):
+            for x in range(width + 2):
+                self.assertAlmostEqual(model.get_potential(x, y), reference.get_potential(x, y), delta=0.01)
+
+    def test_dbm_array(self):
+        width, height = 30, 20
+        potential = np.zeros((height + 2, width + 2))
+        lock = np.zeros((height + 2, width + 2), dtype=bool)
+        lock[0, :] = lock[-1, :] = lock[:, 0] = lock[:, -1] = True
+        potential[-1, :] = 1.0
+
+        def run(model):
+            model.set_seed(1)
+            sim = lb.Simulator(width, height, model)
+            sim.breakdown(width // 2, 0)
+            sim.simulate(max_loop=5)
+            return model
+
+        a = run(lb.DielectricBreakModel(width, height, potential, lock))
+        b = run(lb.DielectricBreakModel(width, height, make_dbm_grid(width, height)))
+        self.assertEqual(a.potentials.shape, (height + 2, width + 2))
+        self.assertEqual(a.lock.dtype, bool)
+        self.assertTrue(np.array_equal(a.potentials, b.potentials))
+        self.assertTrue(np.array_equal(a.lock, b.lock))
+        self.assertEqual(a.potentials[5, 7], a.get_potential(7, 5))
+        self.assertTrue(a.lock[1, width // 2 + 1])  # the broken cell
+        with self.assertRaises(ValueError):
+            a.potentials[0, 0] = 1.0
+        with self.assertRaises(ValueError):
+            lb.DielectricBreakModel(width, height, potential[:, 1:], lock)
+
+    def test_fastdbm_theta(self):
+        def first_field(theta):
+            n = 40
+            model = lb.FastDBM(n, n, theta=theta)
+            sim = lb.Simulator(n, n, model)
+            for x in range(n):
+                sim.breakdown(x, n - 1)
+            for x, y in [(5, 5), (30, 8), (12, 20), (25, 30)]:
+                sim.breakdown(x, y)
+            recorder = lb.FrameRecorder(1, 1, with_field=True)
+            sim.step(1, recorder=recorder)
+            return recorder.fields()[0]
+        exact = first_field(0.0)
+        approx = first_field(0.5)
+        self.assertGreater(np.abs(exact).max(), 0.0)
+        self.assertLess(np.abs(approx - exact).max(), 1e-3 * np.abs(exact).max())
+        with self.assertRaises(ValueError):
+            lb.FastDBM(10, 10, theta=-1.0)
+
+    def test_fastdbm_bias_array(self):
+        from lichtenberg.fastdbm import BiasDirection, make_bias
+        width, height = 20, 10
+        bias = make_bias(BiasDirection.Down, width, height)
+        self.assertEqual(bias.shape, (height, width))
+        self.assertEqual(bias.dtype, np.float32)
+        self.assertTrue((np.diff(bias, axis=0) > 0).all())
+        self.assertTrue((np.diff(bias, axis=1) == 0).all())
+
+        def first_field(b):
+            sim = lb.Simulator(width, height, lb.FastDBM(width, height, bias=b))
+            sim.breakdown(width // 2, 0)
+            recorder = lb.FrameRecorder(1, 1, with_field=True)
+            sim.step(1, recorder=recorder)
+            return recorder.fields()[0]
+        field = first_field(bias)
+        self.assertTrue((first_field(bias.astype(np.float64)) == field).all())
+        self.assertTrue((first_field(bias.ravel().tolist()) == field).all())
+        with self.assertRaises(RuntimeError):
+            lb.FastDBM(width, height, bias=bias[1:])
+
+    def test_fastdbm_threads(self):
+        # the result does not depend on the number of threads
+        n = 120
+
+        def run(num_threads):
+            model = lb.FastDBM(n, n, eta=2.0, num_threads=num_threads)
+            model.set_seed(1)
+            sim = lb.Simulator(n, n, model)
+            for y in range(0, n, 4):
+                for x in range(0, n, 4):
+                    sim.breakdown(x, y)  # many candidates
+            recorder = lb.FrameRecorder(1, 3, with_field=True)
+            sim.step(3, recorder=recorder)
+            return recorder.fields(), sim.cells.broken.copy()
+
+        f1, b1 = run(1)
+        f3, b3 = run(3)
+        self.assertTrue((f1 == f3).all())
+        self.assertTrue((b1 == b3).all())
+
+    def test_fastdbm_bias(self):
+        # non-square, no attraction in the left half
+        width, height = 30, 10
+        bias = [0.0 if x < width // 2 else 1.0 for y in range(height) for x in range(width)]
+        model = lb.FastDBM(width, height, bias=bias)
+        sim = lb.Simulator(width, height, model)
+        for y in range(height):
+            sim.breakdown(width // 2, y)
+        recorder = lb.FrameRecorder(1, 1, with_field=True)
+        sim.step(1, recorder=recorder)
+        field = recorder.fields()[0]
+        self.assertEqual(np.abs(field[:, :width // 2]).max(), 0.0)
+        self.assertGreater(field[:, width // 2 + 1].min(), 0.0)
+
     def test_manual_model_invalid(self):
         with self.assertRaises(ValueError):
             values = [[]]
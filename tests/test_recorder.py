@@ -0,0 +1,111 @@
+import unittest
+import numpy as np
+import lichtenberg as lb
+
+
+def make_simulator(seed: int) -> lb.Simulator:
+    sim = lb.Simulator(30, 30)
+    sim.set_seed(seed)
+    sim.breakdown(15, 15)
+    return sim
+
+
+class TestFrameRecorder(unittest.TestCase):
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            lb.FrameRecorder(0, 10)
+        with self.assertRaises(ValueError):
+            lb.FrameRecorder(1, 0)
+
+    def test_masks(self):
+        sim = make_simulator(1)
+        recorder = lb.FrameRecorder(interval=3, capacity=1000)
+        sim.simulate(recorder=recorder)
+        loops = recorder.loops()
+        masks = recorder.masks()
+        self.assertEqual(len(recorder), len(loops))
+        self.assertEqual(masks.shape, (len(recorder), 30, 30))
+        self.assertTrue(np.all(loops % 3 == 0))
+        self.assertEqual(loops[0], 0)
+        self.assertEqual(int(masks[0].sum()), 1)
+        # broken cells only increase
+        for a, b in zip(masks[:-1], masks[1:]):
+            self.assertTrue(np.all(b >= a))
+        self.assertTrue(np.all(sim.cells.broken >= masks[-1]))
+
+    def test_ring_buffer(self):
+        sim = make_simulator(2)
+        full = lb.FrameRecorder(interval=1, capacity=1000)
+        sim.simulate(recorder=full)
+        sim = make_simulator(2)
+        ring = lb.FrameRecorder(interval=1, capacity=4)
+        sim.simulate(recorder=ring)
+        self.assertEqual(len(ring), 4)
+        self.assertEqual(ring.dropped, len(full) - 4)
+        self.assertTrue(np.array_equal(ring.loops(), full.loops()[-4:]))
+        self.assertTrue(np.array_equal(ring.masks(), full.masks()[-4:]))
+        ring.clear()
+        self.assertEqual(len(ring), 0)
+        self.assertEqual(ring.dropped, 0)
+
+    def test_deltas(self):
+        sim = make_simulator(3)
+        masks = lb.FrameRecorder(interval=2, capacity=1000)
+        sim.simulate(recorder=masks)
+        sim = make_simulator(3)
+        deltas = lb.FrameRecorder(interval=2, capacity=1000, mode=lb.FrameMode.Delta)
+        sim.simulate(recorder=deltas)
+        with self.assertRaises(RuntimeError):
+            deltas.masks()
+        # accumulating the deltas reproduces the masks
+        mask = np.zeros((30, 30), dtype=bool)
+        for expected, delta in zip(masks.masks(), deltas.deltas()):
+            mask[delta[:, 1], delta[:, 0]] = True
+            self.assertTrue(np.array_equal(mask, expected))
+
+    def test_step(self):
+        sim = make_simulator(4)
+        recorder = lb.FrameRecorder(interval=5, capacity=100)
+        while not sim.finished:
+            sim.step(7, recorder=recorder)
+        self.assertTrue(np.all(recorder.loops() % 5 == 0))
+        self.assertEqual(len(recorder), (sim.loop_count - 1) // 5 + 1)
+
+    def test_breakdown_while_paused(self):
+        sim = make_simulator(5)
+        recorder = lb.FrameRecorder(interval=1, capacity=100, mode=lb.FrameMode.Delta)
+        sim.step(3, recorder=recorder)
+        sim.breakdown(25, 25)
+        sim.step(3, recorder=recorder)
+        broken = sim.cells.broken.copy()
+        sim.step(1, recorder=recorder)
+        # the last frame has the cells broken before it, including the one by the user
+        mask = np.zeros((30, 30), dtype=bool)
+        for delta in recorder.deltas():
+            mask[delta[:, 1], delta[:, 0]] = True
+        self.assertTrue(mask[25, 25])
+        self.assertTrue(np.array_equal(mask, broken))
+
+    def test_field(self):
+        width, height = 20, 10
+        grid = [[lb.DBMCell() for _ in range(width + 2)] for _ in range(height + 2)]
+        for x in range(width + 2):
+            grid[height + 1][x].lock = True
+            grid[height + 1][x].potential = 1.0
+        model = lb.DielectricBreakModel(width, height, grid)
+        sim = lb.Simulator(width, height, model)
+        sim.breakdown(width // 2, 0)
+        recorder = lb.FrameRecorder(interval=1, capacity=5, with_field=True)
+        sim.simulate(max_loop=3, recorder=recorder)
+        fields = recorder.fields()
+        self.assertEqual(fields.shape, (3, height + 2, width + 2))
+        self.assertEqual(fields.dtype, np.float32)
+        self.assertAlmostEqual(float(fields[-1][5, 7]), model.get_potential(7, 5), places=5)
+
+        recorder = lb.FrameRecorder(interval=1, capacity=5)
+        with self.assertRaises(RuntimeError):
+            recorder.fields()
+
+
+if __name__ == '__main__':
+    unittest.main()
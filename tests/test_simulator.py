@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 import lichtenberg as lb
 
 
@@ -29,6 +30,30 @@ class TestSimulator(unittest.TestCase):
         sim.breakdown(0, 0)
         sim.simulate()
 
+    def test_unlimited_loop(self):
+        # max_loop <= 0 runs until no cell can break
+        for max_loop in [0, -1]:
+            sim = lb.Simulator(20, 10)
+            sim.breakdown(10, 5)
+            sim.simulate(max_loop=max_loop)
+            self.assertTrue(sim.cells.broken.all())
+            self.assertTrue(sim.finished)
+
+    def test_cells_before_simulate(self):
+        # a reference taken before simulate() has the final levels
+        sim = lb.Simulator(60, 60)
+        sim.set_seed(0)
+        sim.breakdown(30, 30)
+        cells = sim.cells
+        sim.simulate(max_loop=30)
+        fresh = lb.Simulator(60, 60)
+        fresh.set_seed(0)
+        fresh.breakdown(30, 30)
+        fresh.simulate(max_loop=30)
+        self.assertGreater(cells.get_max_count(), 1)
+        self.assertEqual(cells.get_max_count(), fresh.cells.get_max_count())
+        self.assertTrue(np.array_equal(cells.count, fresh.cells.count))
+
     def test_breakdown(self):
         sim = lb.Simulator(1, 1)
         sim.breakdown(0, 0)
@@ -68,3 +93,207 @@ class TestSimulator(unittest.TestCase):
         sim.breakdown(1, 1)  # invalid
         with self.assertRaises(RuntimeError):
             sim.simulate()
+
+    def test_count(self):
+        # all cells are broken in a row: 0 <- 1 <- 2 <- 3, 4 is insulated, 5 is not reached
+        model = lb.ManualBreakModel(6, 1, [[1.0] * 6])
+        sim = lb.Simulator(6, 1, model)
+        sim.insulate(4, 0)
+        sim.breakdown(0, 0)
+        sim.simulate()
+        counts = [sim.cells.get_count(x, 0) for x in range(6)]
+        self.assertEqual(counts, [4, 3, 2, 1, 1, 1])
+        self.assertFalse(sim.cells.get_broken(5, 0))
+
+    def test_count_branches(self):
+        lb.set_random_seed(0)
+        sim = lb.Simulator(30, 30)
+        sim.breakdown(15, 15)
+        sim.simulate(max_loop=20)
+        cells = sim.cells
+        offsets = {lb.Direction.Up: (0, -1), lb.Direction.Down: (0, 1),
+                   lb.Direction.Left: (-1, 0), lb.Direction.Right: (1, 0)}
+        levels = {}
+        for y in range(30):
+            for x in range(30):
+                d = cells.get_dir(x, y)
+                if cells.get_broken(x, y) and d in offsets:
+                    dx, dy = offsets[d]
+                    parent = (x + dx, y + dy)
+                    levels[parent] = max(levels.get(parent, 1), cells.get_count(x, y) + 1)
+        for y in range(30):
+            for x in range(30):
+                self.assertEqual(cells.get_count(x, y), levels.get((x, y), 1))
+
+    def test_step(self):
+        def make():
+            sim = lb.Simulator(40, 40)
+            sim.set_seed(3)
+            sim.breakdown(20, 20)
+            return sim
+        sim1 = make()
+        sim1.simulate(max_loop=30)
+        sim2 = make()
+        for n in (1, 4, 10, 15):
+            self.assertEqual(sim2.step(n), n)
+        self.assertEqual(sim2.loop_count, 30)
+        self.assertTrue((sim1.cells.direction == sim2.cells.direction).all())
+        self.assertTrue((sim1.cells.count == sim2.cells.count).all())
+
+    def test_run_until_finished(self):
+        sim = lb.Simulator(5, 5)
+        sim.breakdown(2, 2)
+        self.assertFalse(sim.finished)
+        sim.run_until()
+        self.assertTrue(sim.finished)
+        self.assertTrue(sim.cells.broken.all())
+        self.assertEqual(sim.step(10), 0)
+
+    def test_step_after_breakdown(self):
+        model = lb.ManualBreakModel(8, 1, [[1.0] * 8])
+        sim = lb.Simulator(8, 1, model)
+        sim.breakdown(0, 0)
+        sim.step(2)
+        self.assertEqual(sim.cells.get_count(0, 0), 3)
+        sim.breakdown(7, 0)
+        sim.step(1)
+        counts = [sim.cells.get_count(x, 0) for x in range(8)]
+        self.assertEqual(counts, [4, 3, 2, 1, 1, 1, 1, 2])
+
+    def test_stop_condition(self):
+        def run(stop):
+            sim = lb.Simulator(30, 30)
+            sim.set_seed(0)
+            sim.breakdown(15, 0)
+            sim.simulate(stop_condition=stop)
+            return sim.cells
+        cells = run(lb.ReachRow(29))
+        self.assertEqual(cells.broken[29].sum(), 1)
+        cells = run(lb.ReachCell(0, 0))
+        self.assertTrue(cells.get_broken(0, 0))
+        self.assertFalse(cells.broken.all())
+        cells = run(lb.MaxBroken(50))
+        self.assertEqual(cells.broken.sum(), 51)
+        cells = run(lb.MaxDepth(5))
+        self.assertEqual(cells.get_max_count(), 7)
+        cells = run(lb.ReachColumn(0) | lb.ReachColumn(29))
+        self.assertEqual(cells.broken[:, 0].sum() + cells.broken[:, 29].sum(), 1)
+        cells = run(lb.ReachRow(20) & lb.MaxBroken(300))
+        self.assertGreater(cells.broken.sum(), 300)
+        self.assertTrue(cells.broken[20].any())
+
+    def test_stop_condition_all_of(self):
+        # each condition may be satisfied by a different cell
+        def run(stop, max_loop=0):
+            sim = lb.Simulator(40, 40)
+            sim.set_seed(0)
+            sim.breakdown(20, 20)
+            sim.simulate(max_loop=max_loop, stop_condition=stop)
+            return sim.cells
+        cells = run(lb.ReachCell(5, 5) & lb.ReachCell(35, 35))
+        self.assertTrue(cells.get_broken(5, 5))
+        self.assertTrue(cells.get_broken(35, 35))
+        self.assertFalse(cells.broken.all())
+        # row 18 is reached before 300 cells are broken, then it stops at once
+        cells = run(lb.AllOf([lb.ReachRow(18), lb.MaxBroken(300)]))
+        self.assertEqual(cells.broken.sum(), 301)
+        # the state is reset for each run(otherwise the first break would stop it)
+        stop = lb.ReachCell(5, 5) & lb.ReachCell(35, 35)
+        run(stop)
+        cells = run(stop, max_loop=3)
+        self.assertGreater(cells.broken.sum(), 2)
+        self.assertFalse(cells.get_broken(5, 5))
+
+    def test_stop_condition_resume(self):
+        # the state of a condition is kept while run_until() resumes the growth
+        def make():
+            sim = lb.Simulator(41, 41)
+            sim.set_seed(0)
+            sim.breakdown(20, 20)
+            return sim
+        once = make()
+        once.run_until(max_loop=0, stop_condition=lb.ReachCell(20, 16) & lb.ReachCell(40, 40))
+        self.assertFalse(once.finished)
+        sim = make()
+        stop = lb.ReachCell(20, 16) & lb.ReachCell(40, 40)
+        while not sim.cells.get_broken(40, 40):
+            sim.run_until(max_loop=3, stop_condition=stop)
+        self.assertFalse(sim.finished)
+        self.assertEqual(sim.loop_count, once.loop_count)
+        self.assertTrue(np.array_equal(sim.cells.broken, once.cells.broken))
+
+    def test_simulate_many(self):
+        sims = []
+        for i in range(4):
+            sim = lb.Simulator(10, 10)
+            sim.breakdown(i, i)
+            sims.append(sim)
+        results = lb.simulate_many(sims, max_loop=100, num_threads=2)
+        self.assertEqual(len(results), 4)
+        for i, cells in enumerate(results):
+            self.assertTrue(cells.get_broken(i, i))
+            self.assertEqual(cells.get_dir(i, i), lb.Direction.Nim)
+
+    def test_simulate_many_factory(self):
+        def factory(seed):
+            sim = lb.Simulator(8, 8, lb.ValueNoiseBreakModel(8, 8, seed=seed))
+            sim.breakdown(4, 4)
+            return sim
+        results = lb.simulate_many(factory, [1, 2, 3])
+        self.assertEqual(len(results), 3)
+
+    def test_simulate_many_invalid(self):
+        sim = lb.Simulator(2, 2)
+        sim.breakdown(0, 0)
+        with self.assertRaises(ValueError):
+            lb.simulate_many([sim, sim])
+        with self.assertRaises(RuntimeError):
+            lb.simulate_many([lb.Simulator(2, 2)])
+
+    def test_weighted_growth(self):
+        width, height = 30, 10
+        # no attraction in the left half
+        bias = [0.0 if x < width // 2 else 1.0 for y in range(height) for x in range(width)]
+        sim = lb.Simulator(width, height, lb.FastDBM(width, height, eta=2.0, bias=bias),
+                           growth=lb.GrowthMode.Weighted)
+        for y in range(height):
+            sim.breakdown(width // 2, y)
+        self.assertEqual(sim.step(40), 40)
+        cells = sim.cells
+        self.assertEqual(cells.broken.sum(), height + 40)  # one cell in each loop
+        self.assertFalse(cells.broken[:, :width // 2].any())
+
+        grid = [[lb.DBMCell() for _ in range(width + 2)] for _ in range(height + 2)]
+        for x in range(width + 2):
+            grid[height + 1][x].potential = 1.0
+            grid[0][x].lock = grid[height + 1][x].lock = True
+        for y in range(height + 2):
+            grid[y][0].lock = grid[y][width + 1].lock = True
+        for incremental in (False, True):
+            model = lb.DielectricBreakModel(width, height, grid, incremental=incremental)
+            sim = lb.Simulator(width, height, model, growth=lb.GrowthMode.Weighted)
+            sim.breakdown(width // 2, 0)
+            sim.simulate(max_loop=1000, stop_condition=lb.ReachRow(height - 1))
+            cells = sim.cells
+            self.assertTrue(cells.broken[height - 1].any())
+            self.assertEqual(cells.broken.sum(), sim.loop_count + 1)
+            roots = [(x, y) for y in range(height) for x in range(width)
+                     if cells.get_broken(x, y) and cells.get_dir(x, y) == lb.Direction.Nim]
+            self.assertEqual(roots, [(width // 2, 0)])
+
+        # flooding around an insulated region, the frontier runs out at the end
+        sim = lb.Simulator(12, 12, lb.FastDBM(12, 12), growth=lb.GrowthMode.Weighted)
+        sim.breakdown(3, 3)
+        sim.insulate_square(6, 6, 8, 8, True)
+        while not sim.finished:
+            sim.step(10)
+        self.assertTrue(sim.cells.broken.all())
+        self.assertEqual(sim.step(10), 0)
+
+    def test_weighted_growth_invalid(self):
+        with self.assertRaises(ValueError):
+            lb.Simulator(10, 10, lb.FastDBM(10, 10), up=False, growth=lb.GrowthMode.Weighted)
+        sim = lb.Simulator(10, 10, growth=lb.GrowthMode.Weighted)
+        sim.breakdown(5, 5)
+        with self.assertRaises(RuntimeError):
+            sim.simulate()
@@ -0,0 +1,90 @@
+import unittest
+import numpy as np
+import lichtenberg as lb
+
+
+class TestCompactTree(unittest.TestCase):
+    def setUp(self):
+        lb.set_random_seed(0)
+        self.sim = lb.Simulator(40, 30)
+        self.sim.breakdown(5, 5)
+        self.sim.breakdown(35, 25)
+        self.sim.simulate(max_loop=12)
+        self.cells = self.sim.cells
+        self.tree = lb.CompactTree(self.cells)
+
+    def test_arrays(self):
+        tree, cells = self.tree, self.cells
+        n = len(tree)
+        self.assertEqual(n, (cells.broken & ~cells.insulated).sum())
+        self.assertTrue(cells.broken[tree.y, tree.x].all())
+        self.assertFalse(tree.parent.flags.writeable)
+        # roots first, a parent comes before its children
+        roots = np.nonzero(tree.parent < 0)[0]
+        self.assertEqual(roots.tolist(), [0, 1])
+        self.assertEqual(sorted(zip(tree.x[roots], tree.y[roots])), [(5, 5), (35, 25)])
+        child = np.arange(2, n)
+        self.assertTrue((tree.parent[child] < child).all())
+        self.assertTrue((tree.depth[child] == tree.depth[tree.parent[child]] + 1).all())
+        # parents are the neighbors in the direction of the cells
+        step = {lb.Direction.Up: (0, -1), lb.Direction.Down: (0, 1),
+                lb.Direction.Left: (-1, 0), lb.Direction.Right: (1, 0)}
+        for i in child:
+            dx, dy = step[cells.get_dir(int(tree.x[i]), int(tree.y[i]))]
+            p = tree.parent[i]
+            self.assertEqual((tree.x[p], tree.y[p]), (tree.x[i] + dx, tree.y[i] + dy))
+        # CSR children and subtree sizes
+        self.assertEqual(tree.child_offset[-1], len(tree.children))
+        for i in range(n):
+            kids = tree.children[tree.child_offset[i]:tree.child_offset[i + 1]]
+            self.assertTrue((tree.parent[kids] == i).all())
+            self.assertEqual(tree.subtree_size[i], 1 + tree.subtree_size[kids].sum())
+        self.assertEqual(tree.subtree_size[roots].sum(), n)
+        leaves = tree.leaves()
+        self.assertTrue((np.diff(tree.child_offset)[leaves] == 0).all())
+
+    def test_path(self):
+        tree, cells = self.tree, self.cells
+        i = int(np.argmax(tree.depth))
+        x, y = int(tree.x[i]), int(tree.y[i])
+        self.assertEqual(tree.find(x, y), i)
+        self.assertEqual(tree.find(0, 29), -1)
+        path = tree.path_to_root(i)
+        self.assertEqual(len(path), tree.depth[i] + 1)
+        self.assertEqual(list(zip(tree.x[path].tolist(), tree.y[path].tolist())), cells.trace(x, y))
+        # the same path as Tree
+        old = lb.Tree(cells)
+        for j in range(2, len(tree), 7):
+            for k in range(3, len(tree), 11):
+                args = (int(tree.x[j]), int(tree.y[j]), int(tree.x[k]), int(tree.y[k]))
+                self.assertEqual(tree.get_path(*args), old.get_path(*args))
+        self.assertEqual(tree.get_path(0, 29, x, y), [])
+        with self.assertRaises(ValueError):
+            tree.path_to_root(len(tree))
+
+    def test_insulated(self):
+        lb.set_random_seed(0)
+        sim = lb.Simulator(30, 30)
+        sim.insulate_square(0, 0, 10, 10, True)
+        sim.breakdown(20, 20)
+        sim.simulate(max_loop=8)
+        cells = sim.cells
+        tree = lb.CompactTree(cells)
+        # insulated cells are broken, but they are not nodes
+        self.assertEqual(len(tree), (cells.broken & ~cells.insulated).sum())
+        self.assertEqual((tree.parent < 0).sum(), 1)
+        self.assertEqual((tree.x[0], tree.y[0]), (20, 20))
+        self.assertFalse(cells.insulated[tree.y, tree.x].any())
+        self.assertEqual(tree.find(0, 0), -1)
+        self.assertEqual(cells.trace(0, 0), [])
+        self.assertEqual(tree.get_path(0, 0, 20, 20), [])
+
+    def test_empty(self):
+        tree = lb.CompactTree(lb.Simulator(10, 10).cells)
+        self.assertEqual(len(tree), 0)
+        self.assertEqual(tree.parent.shape, (0,))
+        self.assertEqual(tree.child_offset.tolist(), [0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+import numpy as np
+import lichtenberg as lb
+from PIL import Image
+from lichtenberg import util
+from lichtenberg.util import draw_blur_with_points, draw_blur_batch
+
+
+class TestElectricField(unittest.TestCase):
+    def test_electric_field(self):
+        points = [(10, 10, 1.0), (60, 50, -1.0)]
+        field = np.array(lb.make_electric_field(80, 70, points))
+        self.assertEqual(field.shape, (70, 80))
+        self.assertEqual(field[10, 10], 1.0)
+        self.assertEqual(field[50, 60], -1.0)
+        with self.assertRaises(ValueError):
+            lb.make_electric_field(80, 70, [(80, 0, 1.0)])
+
+    def test_electric_field_threads(self):
+        points = [(10, 10, 1.0), (60, 50, -1.0)]
+        f1 = np.array(lb.make_electric_field(80, 70, points, max_loop=3000, eps=-1.0))
+        f2 = np.array(lb.make_electric_field(80, 70, points, max_loop=3000, eps=-1.0, num_threads=2))
+        f3 = np.array(lb.make_electric_field(80, 70, points, max_loop=3000, eps=-1.0, num_threads=3))
+        # red-black order converges to the same field
+        self.assertLess(np.abs(f1 - f2).max(), 1.0e-3)
+        # and it does not depend on the number of threads
+        self.assertTrue((f2 == f3).all())
+
+
+    def test_electric_field_solver(self):
+        points = [(10, 10, 1.0), (60, 50, -1.0), (20, 40, 0.5)]
+        field = lb.make_electric_field(80, 70, points, as_array=True)
+        self.assertIsInstance(field, np.ndarray)
+        self.assertEqual(field.dtype, np.float32)
+        self.assertEqual(field.shape, (70, 80))
+        self.assertIsInstance(lb.make_electric_field(80, 70, points), list)
+        # the same solution by all solvers
+        sor = lb.make_electric_field(80, 70, points, max_loop=10000, eps=1.0e-5, sor_coef=1.9, as_array=True)
+        for solver in [lb.DBMSolver.RedBlackSOR, lb.DBMSolver.Multigrid]:
+            other = lb.make_electric_field(80, 70, points, max_loop=10000, eps=1.0e-5, sor_coef=1.9,
+                                           solver=solver, as_array=True)
+            self.assertLess(np.abs(sor - other).max(), 1.0e-3)
+        # stops when the sum of |change| is below eps
+        rough = lb.make_electric_field(80, 70, points, eps=1.0e9, as_array=True)
+        self.assertGreater(np.abs(sor - rough).max(), 0.1)
+
+    def test_electric_field_scale(self):
+        # eps is relative to the largest potential, a scaled field runs the same iterations
+        points = [(5, 5, 1.0), (20, 12, -0.5)]
+        scaled = [(x, y, p * 4.0) for x, y, p in points]
+        for solver in [lb.DBMSolver.SOR, lb.DBMSolver.Multigrid]:
+            field = lb.make_electric_field(30, 20, points, solver=solver, as_array=True)
+            self.assertTrue(np.array_equal(lb.make_electric_field(30, 20, scaled, solver=solver, as_array=True),
+                                           field * 4.0))
+        self.assertFalse(lb.make_electric_field(30, 20, [(5, 5, 0.0)], as_array=True).any())
+
+
+class TestPath(unittest.TestCase):
+    def test_path_cache(self):
+        util.clear_path_cache()
+        path = util.get_path((10, 10), (60, 40), seed=5)
+        self.assertEqual(path[0], (10, 10))
+        self.assertEqual(path[-1], (60, 40))
+        self.assertEqual(tuple(util.path_cache_info()), (0, 1, 256, 1))
+        cached = util.get_path((10, 10), (60, 40), seed=5)
+        self.assertEqual(cached, path)
+        cached.clear()  # a copy is returned
+        self.assertEqual(util.get_path((10, 10), (60, 40), seed=5), path)
+        self.assertEqual(util.path_cache_info().hits, 2)
+        # other arguments are other paths
+        util.get_path((10, 10), (60, 40), seed=6)
+        util.get_path((10, 10), (60, 40), randomness=20.0, seed=5)
+        self.assertEqual(tuple(util.path_cache_info()), (2, 3, 256, 3))
+        # paths without a seed are not kept
+        util.get_path((10, 10), (60, 40))
+        self.assertEqual(util.path_cache_info().currsize, 3)
+        # the same path without the cache
+        util.set_path_cache_size(0)
+        self.assertEqual(util.path_cache_info().currsize, 0)
+        self.assertEqual(util.get_path((10, 10), (60, 40), seed=5), path)
+        util.set_path_cache_size(256)
+
+
+class TestDrawing(unittest.TestCase):
+    def test_draw_blur_with_points(self):
+        # the stroke runs off the image
+        points = [(x, 20 + x // 4) for x in range(-10, 70)]
+        params = [(0, 1.0), (2, 3.0)]
+        image = Image.new("RGB", (60, 40), (0, 10, 250))
+        draw_blur_with_points(image, points, params, 0.5, color=(1.2, 1.0, 0.8))
+        rgb = np.asarray(image).astype(int)
+        self.assertTrue((rgb[:5] == [0, 10, 250]).all())  # far from the stroke
+        self.assertTrue((rgb[rgb[..., 0] > 0] >= [0, 10, 250]).all())
+        self.assertTrue((rgb[22, 8] > [0, 10, 250]).any())
+        self.assertEqual(rgb[..., 2].max(), 255)
+        # the same stroke twice adds up
+        image2 = Image.new("RGB", (60, 40))
+        draw_blur_with_points(image2, points, params, 0.5)
+        once = np.asarray(image2).astype(int)
+        draw_blur_with_points(image2, points, params, 0.5)
+        twice = np.asarray(image2).astype(int)
+        self.assertTrue((twice == np.minimum(once * 2, 255)).all())
+
+    def test_draw_blur_batch(self):
+        params = [(0, 1.0), (2, 3.0)]
+        color = (1.2, 1.0, 0.8)
+        strokes = [[(x, 10 + x // 4) for x in range(0, 40)], [(x, 70) for x in range(10, 50)]]
+        luminance = [[0.5] * 40, [i / 40 for i in range(40)]]
+        # strokes apart are the same as drawn one by one
+        separate = Image.new("RGB", (60, 90), (0, 10, 250))
+        for stroke, lum in zip(strokes, luminance):
+            draw_blur_with_points(separate, stroke, params, 0.7, color, lum)
+        batch = Image.new("RGB", (60, 90), (0, 10, 250))
+        draw_blur_batch(batch, strokes, params, 0.7, color, luminance)
+        self.assertTrue(np.array_equal(np.asarray(separate), np.asarray(batch)))
+        # overlapping strokes add up before the blur
+        one = Image.new("RGB", (60, 90))
+        draw_blur_batch(one, strokes[:1], params, 0.5)
+        two = Image.new("RGB", (60, 90))
+        draw_blur_batch(two, strokes[:1] * 2, params, 0.5)
+        one, two = np.asarray(one).astype(int), np.asarray(two).astype(int)
+        self.assertLessEqual(np.abs(two - np.minimum(one * 2, 255)).max(), 2)
+        self.assertTrue((two[one > 0] > one[one > 0]).all())
+        with self.assertRaises(ValueError):
+            draw_blur_batch(batch, strokes, params, 0.7, color, luminance[:1])
+        draw_blur_batch(batch, [], params, 0.7)
+
+
+if __name__ == '__main__':
+    unittest.main()